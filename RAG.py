@@ -1,35 +1,61 @@
 import os
 from llama_index.core import VectorStoreIndex,Settings
+from llama_index.core.node_parser import SentenceSplitter
 from llama_index.readers.file import PyMuPDFReader
-from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core import StorageContext
-from llama_index.embeddings.openai import OpenAIEmbedding
-import chromadb
 
-Settings.embed_model = OpenAIEmbedding(api_key=os.getenv("OPENAI_API_KEY"))
-
-loader = PyMuPDFReader()
-docs = []
-for file_path in [
+COMPLIANCE_DOCS = [
     "docs/NIST.SP.800-53r5.pdf",
     "docs/PCI-DSS-v4_0_1.pdf",
     "docs/NIST_ISO_MAPPING.pdf",
     "docs/CIS_AWS_Foundations.pdf",
-]:
-    print(f"Loading {file_path}")
-    docs.extend(loader.load(file_path=file_path))
+]
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
+
+def load_compliance_docs(file_paths=COMPLIANCE_DOCS):
+    """Load the compliance framework PDFs, skipping any that are not on disk"""
+    loader = PyMuPDFReader()
+    docs = []
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            print(f"Skipping {file_path}: file not found")
+            continue
+        print(f"Loading {file_path}")
+        docs.extend(loader.load(file_path=file_path))
+    return docs
+
+
+def build_compliance_index(docs, vector_store=None, chunk_size=CHUNK_SIZE,
+                           chunk_overlap=CHUNK_OVERLAP, embed_model=None):
+    """
+    Chunk and embed the compliance docs into a vector index
+    Uses the in-memory SimpleVectorStore when no vector_store is given
+    """
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    return VectorStoreIndex.from_documents(
+        docs,
+        storage_context=storage_context,
+        transformations=[SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)],
+        embed_model=embed_model or Settings.embed_model,
+    )
+
+
+if __name__ == "__main__":
+    # Chroma and OpenAI are only needed to build the persistent knowledge base, not to import this module
+    import chromadb
+    from llama_index.embeddings.openai import OpenAIEmbedding
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
+    Settings.embed_model = OpenAIEmbedding(api_key=os.getenv("OPENAI_API_KEY"))
 
-chroma_client = chromadb.PersistentClient(path="./compliance_db1")
-chroma_collection = chroma_client.create_collection("compliance")
-vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+    docs = load_compliance_docs()
 
-storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    chroma_client = chromadb.PersistentClient(path="./compliance_db1")
+    chroma_collection = chroma_client.create_collection("compliance")
+    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
-index = VectorStoreIndex.from_documents(
-    docs,
-    storage_context=storage_context,
-    chunk_size=1000,
-    chunk_overlap=100,
-)
+    index = build_compliance_index(docs, vector_store=vector_store)
 
-print("Compliance Knowledge Base Created!")   
\ No newline at end of file
+    print("Compliance Knowledge Base Created!")
@@ -0,0 +1,214 @@
+import argparse
+import glob
+import json
+import os
+from typing import Dict, List, Any, Tuple
+
+from generate_terraform_code import OUTPUT_DIR as EXTRACTED_DIR, MANIFEST_FILE
+from hcl_parser import HCLParseError, parse_hcl
+
+CONSOLIDATED_DIR = "consolidated_remediations"
+PLAN_INPUT_FILE = "plan_input.json"
+REPORT_FILE = "consolidation_report.json"
+
+# Resource type prefixes whose service name spans more than one token
+SERVICE_PREFIXES = {
+    "aws_db_": "rds",
+    "aws_cloudwatch_log_": "cloudwatch",
+    "azurerm_key_vault": "keyvault",
+    "azurerm_data_factory": "datafactory",
+    "azurerm_log_analytics": "loganalytics",
+    "azurerm_mssql": "mssql",
+    "azurerm_storage": "storage",
+}
+SHARED_BLOCK_TYPES = ("variable", "output", "module")
+
+
+def resource_group(resource_type: str) -> Tuple[str, str]:
+    """Map a Terraform resource type to its (cloud, service) file group"""
+    for prefix, service in SERVICE_PREFIXES.items():
+        if resource_type.startswith(prefix):
+            return resource_type.split("_")[0], service
+    parts = resource_type.split("_")
+    return parts[0], parts[1] if len(parts) > 1 else "misc"
+
+
+def _canonical(body: Any) -> str:
+    return json.dumps(body, sort_keys=True)
+
+
+class TerraformConsolidator:
+    """
+    Merges parsed remediation fragments into one de-duplicated Terraform JSON configuration
+    First writer wins on a resource address; differing redefinitions are reported as conflicts
+    """
+
+    def __init__(self):
+        self.terraform = {}
+        self.providers: Dict[Tuple[str, str], Dict] = {}
+        self.shared: Dict[str, Dict[str, Dict]] = {t: {} for t in SHARED_BLOCK_TYPES}
+        self.locals: Dict[str, Any] = {}
+        self.groups: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+        self.sources: Dict[str, str] = {}
+        self.conflicts: List[Dict[str, Any]] = []
+        self.duplicates = 0
+
+    def _claim(self, address: str, existing: Any, body: Any, digest: str) -> bool:
+        """True if body should be stored under address"""
+        if existing is None:
+            self.sources[address] = digest
+            return True
+        if _canonical(existing) == _canonical(body):
+            self.duplicates += 1
+        else:
+            self.conflicts.append({
+                "address": address,
+                "kept_from": self.sources.get(address),
+                "dropped_from": digest,
+            })
+        return False
+
+    def add_block(self, block: Dict[str, Any], digest: str):
+        block_type, labels, body = block["type"], block["labels"], block["body"]
+
+        if block_type in ("resource", "data"):
+            r_type, r_name = labels[0], labels[1]
+            address = f"{r_type}.{r_name}" if block_type == "resource" else f"data.{r_type}.{r_name}"
+            section = self.groups.setdefault(resource_group(r_type), {}).setdefault(block_type, {})
+            existing = section.get(r_type, {}).get(r_name)
+            if self._claim(address, existing, body, digest):
+                section.setdefault(r_type, {})[r_name] = body
+
+        elif block_type == "provider":
+            key = (labels[0], body.get("alias", ""))
+            address = f"provider.{labels[0]}" + (f".{key[1]}" if key[1] else "")
+            if self._claim(address, self.providers.get(key), body, digest):
+                self.providers[key] = body
+
+        elif block_type == "terraform":
+            self._merge_terraform(body, digest)
+
+        elif block_type == "locals":
+            for name, value in body.items():
+                if self._claim(f"local.{name}", self.locals.get(name), value, digest):
+                    self.locals[name] = value
+
+        elif block_type in SHARED_BLOCK_TYPES:
+            name = labels[0]
+            if self._claim(f"{block_type}.{name}", self.shared[block_type].get(name), body, digest):
+                self.shared[block_type][name] = body
+
+    def _merge_terraform(self, body: Dict[str, Any], digest: str):
+        for key, value in body.items():
+            if key == "required_providers":
+                merged = self.terraform.setdefault("required_providers", [{}])[0]
+                for providers in value:
+                    for name, spec in providers.items():
+                        if self._claim(f"terraform.required_providers.{name}", merged.get(name), spec, digest):
+                            merged[name] = spec
+            elif self._claim(f"terraform.{key}", self.terraform.get(key), value, digest):
+                self.terraform[key] = value
+
+    def provider_doc(self) -> Dict[str, Any]:
+        doc = {}
+        if self.terraform:
+            doc["terraform"] = [self.terraform]
+        for (name, _), body in self.providers.items():
+            doc.setdefault("provider", {}).setdefault(name, []).append(body)
+        return doc
+
+    def shared_doc(self) -> Dict[str, Any]:
+        doc = {t: blocks for t, blocks in self.shared.items() if blocks}
+        if self.locals:
+            doc["locals"] = self.locals
+        return doc
+
+    def plan_input(self) -> Dict[str, Any]:
+        """Single Terraform JSON document with every consolidated block"""
+        doc = {**self.provider_doc(), **self.shared_doc()}
+        for sections in self.groups.values():
+            for block_type, by_type in sections.items():
+                target = doc.setdefault(block_type, {})
+                for r_type, by_name in by_type.items():
+                    target.setdefault(r_type, {}).update(by_name)
+        return doc
+
+
+def consolidate_remediations(extracted_dir: str = EXTRACTED_DIR,
+                             output_dir: str = CONSOLIDATED_DIR) -> Dict[str, Any]:
+    """
+    Parse the content-addressed fragments listed in the extraction manifest and write
+    providers.tf.json, shared.tf.json, one <cloud>_<service>.tf.json per group and plan_input.json
+    The .tf.json files are one Terraform root module split by service (a single plan covers them all);
+    plan_input.json is the same configuration as one document, the input of the policy check
+    """
+    with open(os.path.join(extracted_dir, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+
+    consolidator = TerraformConsolidator()
+    parse_errors = []
+
+    ordered = sorted(manifest["blocks"].items(), key=lambda kv: min(kv[1]["items"] or [0]))
+    for digest, entry in ordered:
+        try:
+            with open(os.path.join(extracted_dir, entry["file"]), 'r') as f:
+                blocks = parse_hcl(f.read())
+        except (OSError, HCLParseError) as e:
+            parse_errors.append({"digest": digest, "error": str(e)})
+            continue
+        for block in blocks:
+            consolidator.add_block(block, digest)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(output_dir, "*.tf.json")):
+        os.remove(stale)
+
+    files = {}
+    for name, doc in [("providers", consolidator.provider_doc()), ("shared", consolidator.shared_doc())]:
+        if doc:
+            files[f"{name}.tf.json"] = doc
+    for (cloud, service), sections in sorted(consolidator.groups.items()):
+        files[f"{cloud}_{service}.tf.json"] = sections
+
+    for filename, doc in files.items():
+        with open(os.path.join(output_dir, filename), "w") as f:
+            json.dump(doc, f, indent=2)
+
+    with open(os.path.join(output_dir, PLAN_INPUT_FILE), "w") as f:
+        json.dump(consolidator.plan_input(), f, indent=2)
+
+    report = {
+        "stats": {
+            "fragments": len(manifest["blocks"]),
+            "files": len(files),
+            "addresses": len(consolidator.sources),
+            "duplicates_dropped": consolidator.duplicates,
+            "conflicts": len(consolidator.conflicts),
+            "parse_errors": len(parse_errors),
+        },
+        "files": sorted(files),
+        "conflicts": consolidator.conflicts,
+        "parse_errors": parse_errors,
+        "sources": consolidator.sources,
+    }
+    with open(os.path.join(output_dir, REPORT_FILE), "w") as f:
+        json.dump(report, f, indent=2)
+
+    stats = report["stats"]
+    print(f"Consolidated {stats['fragments']} fragments into {stats['files']} files "
+          f"({stats['addresses']} addresses, {stats['duplicates_dropped']} duplicates dropped)")
+    if consolidator.conflicts:
+        print(f"Warning: {len(consolidator.conflicts)} conflicting definitions, see {REPORT_FILE}")
+    if parse_errors:
+        print(f"Warning: {len(parse_errors)} fragments could not be parsed, see {REPORT_FILE}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge extracted Terraform fixes into one root module, "
+                                                 "split into per-cloud/service .tf.json files")
+    parser.add_argument("--extracted-dir", default=EXTRACTED_DIR)
+    parser.add_argument("--output-dir", default=CONSOLIDATED_DIR)
+    args = parser.parse_args()
+
+    consolidate_remediations(args.extracted_dir, args.output_dir)
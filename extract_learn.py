@@ -1,38 +1,48 @@
 import json
 import os
 from llama_index.core import VectorStoreIndex, StorageContext
-from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
-import chromadb
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from normalize_findings import FINDINGS_FILE, load_findings
 
 COMPLIANCE_DB_PATH = "./compliance_db1"
+REMEDIATION_COLUMNS = ["finding_id", "status_code", "status", "severity", "title", "description",
+                       "resource_uid", "risk_details", "remediation"]
 LLM_MODEL = "gpt-4o"
 
-llm = OpenAI(model=LLM_MODEL, temperature=0,api_key=os.getenv("OPENAI_API_KEY"))
-embed_model = OpenAIEmbedding(api_key=os.getenv("OPENAI_API_KEY"))
+def build_qa_engine(similarity_top_k=3):
+    """Open the persisted compliance knowledge base as a GPT-4o query engine"""
+    # Imported here so the prompt helpers (used by rag_benchmark.py) load without chromadb installed
+    import chromadb
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
+    llm = OpenAI(model=LLM_MODEL, temperature=0,api_key=os.getenv("OPENAI_API_KEY"))
+    embed_model = OpenAIEmbedding(api_key=os.getenv("OPENAI_API_KEY"))
 
-chroma_client = chromadb.PersistentClient(path=COMPLIANCE_DB_PATH)
-chroma_collection = chroma_client.get_or_create_collection("compliance")
+    chroma_client = chromadb.PersistentClient(path=COMPLIANCE_DB_PATH)
+    chroma_collection = chroma_client.get_or_create_collection("compliance")
 
-vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
 
-index = VectorStoreIndex.from_vector_store(
-    vector_store, 
-    storage_context=storage_context,
-    embed_model=embed_model
-)
+    index = VectorStoreIndex.from_vector_store(
+        vector_store,
+        storage_context=storage_context,
+        embed_model=embed_model
+    )
 
-qa_engine = index.as_query_engine(
-    llm=llm,
-    similarity_top_k=3,
-    response_mode="compact"
-)
+    return index.as_query_engine(
+        llm=llm,
+        similarity_top_k=similarity_top_k,
+        response_mode="compact"
+    )
 
 def build_grc_prompt(finding_summary):
     return f"""
-You are a Senior GRC Cloud Architect. 
+You are a Senior GRC Cloud Architect.
 Below is a Prowler security finding and relevant compliance context (NIST, ISO, CIS).
 
 INSTRUCTIONS:
@@ -49,41 +59,53 @@ RESPONSE:
 """
 SEVERITY=["Critical","High"]
 
-def run_grc_analysis(json_files):
+def select_remediation_candidates(findings):
+    """status_code == FAIL, Critical/High, status == New – column predicates over the findings table"""
+    mask = pc.and_(
+        pc.and_(pc.equal(findings["status_code"], "FAIL"),
+                pc.is_in(findings["severity"], value_set=pa.array(SEVERITY))),
+        pc.equal(findings["status"], "New"),
+    )
+    return findings.filter(mask)
+
+def summarize_finding(finding):
+    """Prompt summary of one normalized findings-table row (see normalize_findings.py)"""
+    return {
+        "Title": finding.get("title"),
+        "Resource": finding.get("resource_uid"),
+        "Severity": finding.get("severity"),
+        "Description": finding.get("description"),
+        "Risk": finding.get("risk_details"),
+        "Remediation": finding.get("remediation"),
+    }
+
+def run_grc_analysis(findings_source=FINDINGS_FILE):
+    qa_engine = build_qa_engine()
     all_remediations = []
-    
-    for file_path in json_files:
-        print(f"--- Analyzing {file_path} ---")
-        with open(file_path, 'r') as f:
-            findings = json.load(f)
-            
-        for finding in findings:
-            if finding.get("status_code") == "FAIL" and finding.get("severity") in SEVERITY and finding.get("status") == "New":
-                finding_summary = {
-                    "Title": finding.get("finding_info", {}).get("title"),
-                    "Resource": finding.get("resources", [{}])[0].get("uid"),
-                    "Severity": finding.get("severity"),
-                    "Description": finding.get("finding_info", {}).get("desc"),
-                    "Risk": finding.get("risk_details"),
-                    "Remediation": finding.get("remediation", {}).get("desc"),
-                }
-                
-                print(f"Processing: {finding_summary['Title']}")
-                
-                query_str = build_grc_prompt(finding_summary)
-                response = qa_engine.query(query_str)
-                
-                all_remediations.append({
-                    "resource": finding_summary["Resource"],
-                    "analysis": response.response.strip()
-                })
-                
+
+    candidates = select_remediation_candidates(load_findings(findings_source, columns=REMEDIATION_COLUMNS))
+    print(f"--- Analyzing {candidates.num_rows} remediation candidates from {findings_source} ---")
+
+    for finding in candidates.to_pylist():
+        finding_summary = summarize_finding(finding)
+
+        print(f"Processing: {finding_summary['Title']}")
+
+        query_str = build_grc_prompt(finding_summary)
+        response = qa_engine.query(query_str)
+
+        all_remediations.append({
+            "finding_id": finding["finding_id"],
+            "resource": finding_summary["Resource"],
+            "analysis": response.response.strip()
+        })
+
     return all_remediations
 
-prowler_files = ["aws_prowler_scan.json", "azurescan.json"]
-results = run_grc_analysis(prowler_files)
+if __name__ == "__main__":
+    results = run_grc_analysis(FINDINGS_FILE)
 
-with open("grc_remediation_plan.json", "w") as out:
-    json.dump(results, out, indent=4)
+    with open("grc_remediation_plan.json", "w") as out:
+        json.dump(results, out, indent=4)
 
-print("Analysis Complete. Results saved to grc_remediation_plan.json")   
\ No newline at end of file
+    print("Analysis Complete. Results saved to grc_remediation_plan.json")
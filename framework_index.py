@@ -0,0 +1,319 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+INDEX_SUFFIX = "_frameworks.npz"
+SPILL_DIR = os.path.join(".grc_cache", "spill")
+# Spilled (id, row) pairs are read back at most this many at a time when the postings are assembled
+SPILL_READ_PAIRS = 1 << 20
+
+# A query term is a framework name ("PCI-3.2.1") or a (framework, requirement) pair ("PCI-3.2.1", "3.4")
+Term = Union[str, Tuple[str, str]]
+
+
+def parse_term(text: str) -> Term:
+    """CLI form: 'FRAMEWORK' or 'FRAMEWORK:REQUIREMENT'"""
+    framework, _, requirement = text.partition(":")
+    return (framework, requirement) if requirement else framework
+
+
+def _postings(ids: Sequence[int], rows: Sequence[int], size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(id, row) pairs -> CSR offsets plus one int32 array of sorted, de-duplicated row positions per id"""
+    ids = np.asarray(ids, dtype=np.int64)
+    rows = np.asarray(rows, dtype=np.int64)
+    order = np.lexsort((rows, ids))
+    ids, rows = ids[order], rows[order]
+    if len(ids):
+        keep = np.ones(len(ids), dtype=bool)
+        keep[1:] = (ids[1:] != ids[:-1]) | (rows[1:] != rows[:-1])
+        ids, rows = ids[keep], rows[keep]
+    offsets = np.searchsorted(ids, np.arange(size + 1)).astype(np.int64)
+    return offsets, rows.astype(np.int32)
+
+
+def _segment_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    sums = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return sums[offsets[1:]] - sums[offsets[:-1]]
+
+
+class FrameworkIndex:
+    """
+    Compliance membership over register rows
+    Framework and requirement names are interned to dense ids; each id owns a sorted posting list of
+    row positions, stored CSR-style (offsets into one int32 array). Intersections only touch the postings
+    involved, so "ALE under PCI-3.2.1 3.4 ∩ NIST ac_2" never scans the register
+    """
+
+    def __init__(self, frameworks: List[str], requirements: List[str], requirement_framework: np.ndarray,
+                 framework_offsets: np.ndarray, framework_rows: np.ndarray,
+                 requirement_offsets: np.ndarray, requirement_rows: np.ndarray, ale: np.ndarray):
+        self.frameworks = frameworks
+        self.requirements = requirements
+        self.requirement_framework = requirement_framework
+        self.framework_offsets = framework_offsets
+        self.framework_rows = framework_rows
+        self.requirement_offsets = requirement_offsets
+        self.requirement_rows = requirement_rows
+        self.ale = ale
+        self._framework_ids = {name: i for i, name in enumerate(frameworks)}
+        self._requirement_ids = {(frameworks[fw], requirement): i
+                                 for i, (fw, requirement) in enumerate(zip(requirement_framework, requirements))}
+
+    def __len__(self) -> int:
+        return len(self.ale)
+
+    @classmethod
+    def build(cls, compliance_maps: Iterable[Optional[Dict]], ale: Iterable[float] = None) -> "FrameworkIndex":
+        """One {framework: [requirements]} mapping per register row (None / missing frameworks are skipped)"""
+        builder = FrameworkIndexBuilder()
+        builder.add(compliance_maps)
+        return builder.build(ale)
+
+    @classmethod
+    def from_register(cls, df: pd.DataFrame) -> "FrameworkIndex":
+        """
+        Index a register DataFrame. Uses the full compliance_map written by risk_engine.py; older registers
+        only carry the joined framework names in 'compliance', which index at framework level
+        """
+        if "compliance_map" in df.columns:
+            maps = df["compliance_map"]
+        else:
+            maps = (
+                {fw: [] for fw in str(names).split(", ") if fw}
+                for names in df.get("compliance", pd.Series([""] * len(df))).fillna("")
+            )
+        return cls.build(maps, df["ale"].to_numpy())
+
+    def framework_postings(self, framework: str) -> np.ndarray:
+        fw = self._framework_ids.get(framework)
+        if fw is None:
+            return np.empty(0, dtype=np.int32)
+        return self.framework_rows[self.framework_offsets[fw]:self.framework_offsets[fw + 1]]
+
+    def requirement_postings(self, framework: str, requirement: str) -> np.ndarray:
+        req = self._requirement_ids.get((framework, requirement))
+        if req is None:
+            return np.empty(0, dtype=np.int32)
+        return self.requirement_rows[self.requirement_offsets[req]:self.requirement_offsets[req + 1]]
+
+    def rows(self, *terms: Term) -> np.ndarray:
+        """Sorted row positions matching every term (intersection, shortest posting list first)"""
+        if not terms:
+            return np.arange(len(self), dtype=np.int32)
+        postings = sorted(
+            (self.framework_postings(term) if isinstance(term, str) else self.requirement_postings(*term)
+             for term in terms),
+            key=len,
+        )
+        result = postings[0]
+        for posting in postings[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+
+    def summary(self, *terms: Term) -> Dict[str, float]:
+        rows = self.rows(*terms)
+        return {"findings": int(len(rows)), "ale": float(self.ale[rows].sum())}
+
+    def coverage(self) -> pd.DataFrame:
+        """Findings, distinct requirements and ALE per framework, largest first"""
+        findings = np.diff(self.framework_offsets)
+        return pd.DataFrame({
+            "framework": self.frameworks,
+            "findings": findings,
+            "requirements": np.bincount(self.requirement_framework, minlength=len(self.frameworks)),
+            "ale": _segment_sums(self.ale[self.framework_rows], self.framework_offsets),
+        }).sort_values(["findings", "ale"], ascending=False, ignore_index=True)
+
+    def requirement_coverage(self, framework: str) -> pd.DataFrame:
+        """Findings and ALE per requirement of one framework, largest first"""
+        fw = self._framework_ids.get(framework)
+        req_ids = np.flatnonzero(self.requirement_framework == fw) if fw is not None else np.empty(0, dtype=int)
+        totals = _segment_sums(self.ale[self.requirement_rows], self.requirement_offsets)
+        return pd.DataFrame({
+            "requirement": [self.requirements[i] for i in req_ids],
+            "findings": np.diff(self.requirement_offsets)[req_ids],
+            "ale": totals[req_ids],
+        }).sort_values(["findings", "ale"], ascending=False, ignore_index=True)
+
+    def save(self, path: str):
+        names = json.dumps({"frameworks": self.frameworks, "requirements": self.requirements})
+        np.savez(path, names=np.array(names), requirement_framework=self.requirement_framework,
+                 framework_offsets=self.framework_offsets, framework_rows=self.framework_rows,
+                 requirement_offsets=self.requirement_offsets, requirement_rows=self.requirement_rows,
+                 ale=self.ale)
+
+    @classmethod
+    def load(cls, path: str) -> "FrameworkIndex":
+        with np.load(path) as data:
+            names = json.loads(str(data["names"]))
+            arrays = {key: data[key] for key in data.files if key != "names"}
+        return cls(names["frameworks"], names["requirements"], **arrays)
+
+
+class FrameworkIndexBuilder:
+    """
+    Accumulates (id, row) membership pairs batch by batch, for registers that are scored in batches
+    Pairs are kept in typed arrays (8 bytes each), never as the register rows themselves. With a budget,
+    the arrays are appended to files under spill_dir whenever they pass it, and build() assembles the CSR
+    postings from those files a slice at a time into memory-mapped arrays. Use as a context manager (or
+    call close()) so the spill files are removed once the index is saved
+    """
+
+    ARRAYS = ("fw_ids", "fw_rows", "req_ids", "req_rows", "ale")
+
+    def __init__(self, budget: Optional[int] = None, spill_dir: str = SPILL_DIR):
+        self.framework_ids: Dict[str, int] = {}
+        self.requirement_ids: Dict[Tuple[str, str], int] = {}
+        self.fw_ids, self.fw_rows = array("q"), array("q")
+        self.req_ids, self.req_rows = array("q"), array("q")
+        self.ale = array("d")
+        self.size = 0
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self.spills = 0
+        self._spilled = dict.fromkeys(self.ARRAYS, 0)
+        self._run_dir = None
+
+    def __enter__(self) -> "FrameworkIndexBuilder":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def buffered_bytes(self) -> int:
+        return sum(len(getattr(self, name)) * 8 for name in self.ARRAYS)
+
+    def add(self, compliance_maps: Iterable[Optional[Dict]], ale: Iterable[float] = None):
+        """Append rows: one {framework: [requirements]} mapping each, numbered after the rows added so far"""
+        framework_ids, requirement_ids = self.framework_ids, self.requirement_ids
+        for mapping in compliance_maps:
+            row = self.size
+            self.size += 1
+            if not isinstance(mapping, dict):
+                continue
+            for framework, requirements in mapping.items():
+                if requirements is None:
+                    continue
+                self.fw_ids.append(framework_ids.setdefault(framework, len(framework_ids)))
+                self.fw_rows.append(row)
+                if isinstance(requirements, str):
+                    requirements = [requirements]
+                # De-duplicated per row, so spilled postings need no de-duplication pass
+                for requirement in dict.fromkeys(map(str, requirements)):
+                    key = (framework, requirement)
+                    self.req_ids.append(requirement_ids.setdefault(key, len(requirement_ids)))
+                    self.req_rows.append(row)
+        if ale is not None:
+            self.ale.extend(ale)
+        if self.budget is not None and self.buffered_bytes > self.budget:
+            self.spill()
+
+    def spill(self):
+        """Append the buffered arrays to their spill files"""
+        if self._run_dir is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._run_dir = tempfile.mkdtemp(prefix="frameworks_", dir=self.spill_dir)
+        for name in self.ARRAYS:
+            values = getattr(self, name)
+            with open(os.path.join(self._run_dir, name), "ab") as f:
+                values.tofile(f)
+            self._spilled[name] += len(values)
+            setattr(self, name, array(values.typecode))
+        self.spills += 1
+
+    def _read_spilled(self, name: str, dtype) -> Iterable[np.ndarray]:
+        step = SPILL_READ_PAIRS if self.budget is None else max(1, min(SPILL_READ_PAIRS, self.budget // 64))
+        path = os.path.join(self._run_dir, name)
+        for start in range(0, self._spilled[name], step):
+            yield np.fromfile(path, dtype=dtype, count=min(step, self._spilled[name] - start),
+                              offset=start * np.dtype(dtype).itemsize)
+
+    def _spilled_postings(self, kind: str, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """_postings() over the spilled pairs: count per id, then scatter each slice into a memory-mapped array"""
+        total = self._spilled[f"{kind}_ids"]
+        counts = np.zeros(size, dtype=np.int64)
+        for ids in self._read_spilled(f"{kind}_ids", np.int64):
+            counts += np.bincount(ids, minlength=size)
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        if not total:
+            return offsets, np.empty(0, dtype=np.int32)
+
+        rows_out = np.lib.format.open_memmap(os.path.join(self._run_dir, f"{kind}_postings.npy"), mode="w+",
+                                             dtype=np.int32, shape=(total,))
+        cursor = offsets[:-1].copy()
+        # Rows only grow in arrival order, so a stable sort by id keeps every posting list sorted
+        for ids, rows in zip(self._read_spilled(f"{kind}_ids", np.int64), self._read_spilled(f"{kind}_rows", np.int64)):
+            order = np.argsort(ids, kind="stable")
+            ids, rows = ids[order], rows[order]
+            rank = np.arange(len(ids)) - np.searchsorted(ids, ids)
+            rows_out[cursor[ids] + rank] = rows
+            cursor += np.bincount(ids, minlength=size)
+        rows_out.flush()
+        return offsets, rows_out
+
+    def build(self, ale: Iterable[float] = None) -> FrameworkIndex:
+        """ALE per row from add() calls, or given here for all rows at once (zeros if neither)"""
+        if self.spills:
+            self.spill()
+        if ale is not None:
+            ale = np.asarray(ale, dtype=np.float64)
+        elif self._spilled["ale"]:
+            ale = np.memmap(os.path.join(self._run_dir, "ale"), dtype=np.float64, mode="r")
+        elif len(self.ale):
+            ale = np.frombuffer(self.ale, dtype=np.float64).copy()
+        else:
+            ale = np.zeros(self.size)
+        if self.spills:
+            framework_offsets, framework_rows = self._spilled_postings("fw", len(self.framework_ids))
+            requirement_offsets, requirement_rows = self._spilled_postings("req", len(self.requirement_ids))
+        else:
+            framework_offsets, framework_rows = _postings(self.fw_ids, self.fw_rows, len(self.framework_ids))
+            requirement_offsets, requirement_rows = _postings(self.req_ids, self.req_rows,
+                                                              len(self.requirement_ids))
+        return FrameworkIndex(
+            frameworks=list(self.framework_ids),
+            requirements=[requirement for _, requirement in self.requirement_ids],
+            requirement_framework=np.array([self.framework_ids[fw] for fw, _ in self.requirement_ids],
+                                           dtype=np.int32),
+            framework_offsets=framework_offsets,
+            framework_rows=framework_rows,
+            requirement_offsets=requirement_offsets,
+            requirement_rows=requirement_rows,
+            ale=ale,
+        )
+
+    def close(self):
+        if self._run_dir is not None:
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+            self._run_dir = None
+
+
+def index_file_for(report_file: str) -> str:
+    return report_file.replace(".json", INDEX_SUFFIX)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the compliance framework index of a risk report")
+    parser.add_argument("index", help=f"<report>{INDEX_SUFFIX} written by risk_engine.py")
+    parser.add_argument("terms", nargs="*", help="FRAMEWORK or FRAMEWORK:REQUIREMENT, intersected")
+    args = parser.parse_args()
+
+    index = FrameworkIndex.load(args.index)
+    if not args.terms:
+        print(index.coverage().to_string(index=False))
+    else:
+        start = time.perf_counter()
+        result = index.summary(*map(parse_term, args.terms))
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        print(f"{result['findings']} findings, ${result['ale']:,.2f} ALE ({elapsed_us:.0f} µs)")
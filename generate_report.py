@@ -1,21 +1,158 @@
+import argparse
+import hashlib
+import io
 import json
+import math
+import os
+import re
+import tempfile
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from fpdf import FPDF
 from datetime import datetime
-from typing import Dict, List
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple, Union
+
+from framework_index import FrameworkIndex, index_file_for
+from out_of_core import fits_in_memory, memory_budget
+from risk_drift import DRIFT_FILE, load_drift
+from risk_engine import RUNS_DIR, ale_cents, build_risk_cube, load_risk_cube, load_top_risks, top_file_for
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    from pypdf import PdfReader
+
+REPORT_FILE = "risk_quantification_report.json"
+OUTPUT_FILE = "GRC_Compliance_Report.pdf"
+
+# Appendix A is laid out at a fixed row count per page so every part's page numbers are known up front
+APPENDIX_COLUMNS = ["asset", "service", "severity", "ale", "classification",
+                    "is_public", "retention_days", "control", "compliance"]
+APPENDIX_ROWS_PER_PAGE = 50
+APPENDIX_PART_PAGES = 100
+# Above this the register ships as an evidence file and Appendix A becomes a summary table
+APPENDIX_MAX_ROWS = 20_000
+COMPLIANCE_TABLE_MAX_ROWS = 100
+DRIFT_TABLE_ROWS = 10
+EVIDENCE_FORMATS = ("csv", "parquet")
+EVIDENCE_CHUNK_ROWS = 50_000
+TENANT_DIR = "tenant_reports"
+TENANT_INDEX_FILE = "index.json"
+
+
+REPORT_FONTS = (("DejaVu", "", "DejaVuSans.ttf"),
+                ("DejaVu", "B", "DejaVuSans-Bold.ttf"),
+                ("DejaVu", "I", "DejaVuSans-Oblique.ttf"))
+# Every report's subset starts with Latin-1 plus the report's own symbols, so tenant packages and appendix
+# parts embed the same glyphs and share one CID width table per font (see _putTTfontwidths)
+REPORT_GLYPHS = list(range(0, 256)) + [ord(c) for c in "•–—×’“”…Δ→"]
+# Parsed metrics per (font file, style): add_font() reads each font once per process and later
+# reports copy the entry into their own fonts / font_files tables
+_REPORT_FONT_CACHE: Dict[Tuple[str, str], Tuple[Dict, Dict]] = {}
 
 
 class Fortune500GRCReport(FPDF):
     """Auditor-grade PDF generator for SOC2/ISO27001/PCI-DSS evidence packages"""
     
-    def __init__(self):
+    # Per-process caches: CID width tables, and the data-independent sections pre-rendered once
+    # (kept parsed, so pypdf reads their fonts and content streams a single time)
+    _font_widths: Dict[Tuple, str] = {}
+    _static_pdfs: Dict[str, "PdfReader"] = {}
+    
+    def __init__(self, page_offset: int = 0):
         super().__init__()
-        self.add_font("DejaVu", "", "DejaVuSans.ttf", uni=True)
-        self.add_font("DejaVu", "B", "DejaVuSans-Bold.ttf", uni=True)
-        self.add_font("DejaVu", "I", "DejaVuSans-Oblique.ttf", uni=True)
+        self.page_offset = page_offset
+        self.draw_header = True
+        self.draw_footer = True
+        self.static_pages: List[Tuple[str, int]] = []
+        self._add_report_fonts()
+
+    def _add_report_fonts(self):
+        """REPORT_FONTS from the per-process metrics cache; only the first report in a process parses them"""
+        for family, style, font_file in REPORT_FONTS:
+            fontkey = family.lower() + style
+            cached = _REPORT_FONT_CACHE.get((font_file, style))
+            if cached is None:
+                self.add_font(family, style, font_file, uni=True)
+                _REPORT_FONT_CACHE[(font_file, style)] = (
+                    dict(self.fonts[fontkey]),
+                    {key: dict(self.font_files[key]) for key in (fontkey, font_file)})
+                continue
+            font, files = cached
+            # Metrics ('cw', 'desc') are shared read-only; the glyph subset and object numbers are per report
+            self.fonts[fontkey] = {**font, "i": len(self.fonts) + 1}
+            self.font_files.update({key: dict(entry) for key, entry in files.items()})
+        for family, style, _ in REPORT_FONTS:
+            self.fonts[family.lower() + style]["subset"] = list(REPORT_GLYPHS)
+
+    def _putTTfontwidths(self, font, maxUni):
+        """
+        CID width arrays are reused across reports that embed the same glyph subset
+        fpdf builds them by scanning every code point against the subset list, seconds per font
+        """
+        key = (font["ttffile"], maxUni, tuple(sorted(set(font["subset"]))))
+        widths = self._font_widths.get(key)
+        if widths is None:
+            start = len(self.buffer)
+            super()._putTTfontwidths(font, maxUni)
+            widths = self._font_widths[key] = self.buffer[start:]
+        else:
+            self.buffer += widths
+
+    @classmethod
+    def static_pdf(cls, name: str) -> "PdfReader":
+        """A static section (methodology_section, remediation_roadmap, reference_appendices) rendered once"""
+        cached = cls._static_pdfs.get(name)
+        if cached is None:
+            from pypdf import PdfReader
+
+            renderer = cls()
+            renderer.draw_footer = False
+            renderer.set_auto_page_break(auto=True, margin=15)
+            getattr(renderer, name)()
+            cached = cls._static_pdfs[name] = PdfReader(io.BytesIO(renderer.output(dest="S").encode("latin-1")))
+        return cached
+
+    def static_section(self, name: str):
+        """
+        Reserve footer-only pages for a cached static section
+        write_pdf() stamps the pre-rendered header and body onto them, so footers keep this report's numbering
+        """
+        pages = len(self.static_pdf(name).pages)
+        self.static_pages.append((name, self.page_no() + 1))
+        self.draw_header = False
+        for _ in range(pages):
+            self.add_page()
+        self.draw_header = True
+
+    def write_pdf(self, output_file: str):
+        """output() plus the static sections merged onto their reserved pages (pypdf)"""
+        if not self.static_pages:
+            self.output(output_file)
+            return
+        from pypdf import PdfReader, PdfWriter
+
+        # Stamp the (small) footer-only placeholder onto the pre-rendered page, not the reverse
+        static = {}
+        for name, first_page in self.static_pages:
+            for i, page in enumerate(self.static_pdf(name).pages):
+                static[first_page - 1 + i] = page
+        reader = PdfReader(io.BytesIO(self.output(dest="S").encode("latin-1")))
+        writer = PdfWriter()
+        for i, page in enumerate(reader.pages):
+            if i in static:
+                writer.add_page(static[i]).merge_page(page)
+            else:
+                writer.add_page(page)
+        writer.add_metadata(reader.metadata or {})
+        with open(output_file, "wb") as f:
+            writer.write(f)
 
     def header(self):
         """Confidential header – required by Big 4 auditors"""
+        if not self.draw_header:
+            return
         self.set_font("DejaVu", "B", 9)
         self.set_text_color(128, 128, 128)
         self.cell(0, 8, "CONFIDENTIAL – AUDIT EVIDENCE PACKAGE – NOT FOR EXTERNAL DISTRIBUTION", 0, 1, "R")
@@ -23,10 +160,12 @@ class Fortune500GRCReport(FPDF):
 
     def footer(self):
         """Footer with page numbers and generation timestamp – SOX requirement"""
+        if not self.draw_footer:
+            return
         self.set_y(-15)
         self.set_font("DejaVu", "I", 8)
         self.set_text_color(100)
-        page_info = f"Page {self.page_no()} | Generated: {datetime.now().strftime('%Y-%m-%d %H:%M UTC')} | Auditor Use Only"
+        page_info = f"Page {self.page_no() + self.page_offset} | Generated: {datetime.now().strftime('%Y-%m-%d %H:%M UTC')} | Auditor Use Only"
         self.cell(0, 10, page_info, 0, 0, "C")
 
     def chapter_title(self, title: str, level: int = 1):
@@ -62,8 +201,8 @@ class Fortune500GRCReport(FPDF):
         self.cell(60, 8, value, 0, 1, "R", fill=True)
         self.ln(1)
 
-    def compliance_table(self, data: List[Dict]):
-        """Enhanced audit table with better formatting"""
+    def compliance_table(self, rows: Iterable[Tuple]):
+        """Enhanced audit table; rows are (asset, service, severity, ale, classification, control) tuples"""
         self.set_font("DejaVu", "B", 9)
         self.set_fill_color(233, 236, 239)
         headers = ["Resource", "Service", "Severity", "ALE ($)", "Classification", "Control"]
@@ -72,22 +211,101 @@ class Fortune500GRCReport(FPDF):
         self.ln()
         
         self.set_font("DejaVu", "", 8)
-        for row in data:
-            self.cell(32, 6, str(row["asset"])[:24], 1)
-            self.cell(32, 6, str(row["service"])[:24], 1)
-            self.cell(32, 6, str(row["severity"]), 1)
-            self.cell(32, 6, f"${row['ale']:,.0f}", 1)
-            self.cell(32, 6, str(row["classification"]), 1)
-            self.cell(32, 6, str(row["control"]), 1)
+        for asset, service, severity, ale, classification, control in rows:
+            self.cell(32, 6, str(asset)[:24], 1)
+            self.cell(32, 6, str(service)[:24], 1)
+            self.cell(32, 6, str(severity), 1)
+            self.cell(32, 6, f"${ale:,.0f}", 1)
+            self.cell(32, 6, str(classification), 1)
+            self.cell(32, 6, str(control), 1)
             self.ln()
 
-    def risk_heatmap_table(self, df: pd.DataFrame):
-        """Generate a risk heat map matrix in table format"""
+    def appendix_table_header(self):
+        self.set_font("DejaVu", "B", 8)
+        self.set_text_color(33, 37, 41)
+        self.set_fill_color(233, 236, 239)
+        headers = ["Asset", "Service", "Severity", "ALE", "Class", "Public", "Retention", "Control", "Frameworks"]
+        for h in headers:
+            self.cell(21, 6, h, 1, 0, "C", fill=True)
+        self.ln()
+        self.set_font("DejaVu", "", 7)
+
+    def appendix_rows(self, rows: Iterable[Tuple]):
+        """Register rows (APPENDIX_COLUMNS order) at exactly APPENDIX_ROWS_PER_PAGE per page"""
+        for i, (asset, service, severity, ale, classification, is_public, retention_days, control, compliance) in enumerate(rows):
+            if i % APPENDIX_ROWS_PER_PAGE == 0:
+                self.add_page()
+                self.appendix_table_header()
+            self.cell(21, 5, str(asset)[:20], 1)
+            self.cell(21, 5, str(service)[:20], 1)
+            self.cell(21, 5, str(severity), 1)
+            self.cell(21, 5, f"${ale:,.0f}", 1)
+            self.cell(21, 5, str(classification), 1)
+            self.cell(21, 5, str(is_public), 1)
+            self.cell(21, 5, f"{retention_days}d", 1)
+            self.cell(21, 5, str(control), 1)
+            self.cell(21, 5, str(compliance)[:15], 1)
+            self.ln()
+
+    def evidence_summary_table(self, cube: pd.DataFrame):
+        """Findings and ALE by severity x classification, shown when the register ships as an evidence file"""
+        summary = cube.groupby(["severity", "classification"]).agg(findings=("count", "sum"), ale=("ale_sum", "sum"))
+        self.set_font("DejaVu", "B", 9)
+        self.set_fill_color(233, 236, 239)
+        for h, w in [("Severity", 40), ("Classification", 50), ("Findings", 40), ("ALE ($)", 50)]:
+            self.cell(w, 8, h, 1, 0, "C", fill=True)
+        self.ln()
+        self.set_font("DejaVu", "", 9)
+        for (severity, classification), row in summary.iterrows():
+            self.cell(40, 6, str(severity), 1)
+            self.cell(50, 6, str(classification), 1)
+            self.cell(40, 6, f"{int(row['findings']):,}", 1, 0, "R")
+            self.cell(50, 6, f"${row['ale']:,.0f}", 1, 0, "R")
+            self.ln()
+
+    def drift_table(self, rows: Iterable[Dict]):
+        """Largest ALE movers since the previous run (risk_drift.py top_findings entries)"""
+        self.set_font("DejaVu", "B", 9)
+        self.set_fill_color(233, 236, 239)
+        columns = [("Change", 22), ("Asset", 48), ("Check", 60), ("ALE Δ ($)", 28), ("Changed", 32)]
+        for h, w in columns:
+            self.cell(w, 8, h, 1, 0, "C", fill=True)
+        self.ln()
+        self.set_font("DejaVu", "", 8)
+        for row in rows:
+            self.cell(22, 6, row["change"], 1)
+            self.cell(48, 6, str(row["asset"] or row["asset_uid"])[:34], 1)
+            self.cell(60, 6, str(row["finding_code"])[:44], 1)
+            self.cell(28, 6, f"{row['ale_delta']:+,.0f}", 1, 0, "R")
+            self.cell(32, 6, str(row["changed_fields"] or "–")[:24], 1)
+            self.ln()
+
+    def drift_summary(self, drift: Dict):
+        """Change since the previous run, from the risk_drift.py delta"""
+        findings = drift["findings"]
+        self.ln(5)
+        self.set_font("DejaVu", "B", 10)
+        self.set_text_color(33, 37, 41)
+        self.cell(0, 8, f"Change Since Previous Run ({drift['base_run']} → {drift['head_run']})", 0, 1)
+        self.ln(2)
+        self.metric_box("ALE Change", f"${drift['ale_delta']:+,.2f}", "critical" if drift["ale_delta"] > 0 else "low")
+        self.metric_box("New Findings", f"{findings['new']['count']} (${findings['new']['ale_delta']:+,.0f})", "high")
+        self.metric_box("Resolved Findings", f"{findings['resolved']['count']} (${findings['resolved']['ale_delta']:+,.0f})", "low")
+        self.metric_box("Changed Findings", f"{findings['changed']['count']} (${findings['changed']['ale_delta']:+,.0f})", "medium")
+        assets = drift["asset_changes"]
+        self.metric_box("Assets Reclassified", f"{assets['classification']} class | {assets['is_public']} exposure | "
+                                               f"{assets['retention_days']} retention", "info")
+        if drift["top_findings"]:
+            self.ln(3)
+            self.drift_table(drift["top_findings"][:DRIFT_TABLE_ROWS])
+
+    def risk_heatmap_table(self, cube: pd.DataFrame):
+        """Generate a risk heat map matrix in table format (from the risk cube)"""
         self.chapter_title("Risk Heat Map Matrix", level=2)
         
         # Create pivot table
-        heatmap_data = df.pivot_table(
-            values='ale', 
+        heatmap_data = cube.pivot_table(
+            values='ale_sum', 
             index='severity', 
             columns='classification', 
             aggfunc='sum',
@@ -123,26 +341,385 @@ class Fortune500GRCReport(FPDF):
                 self.cell(30, 8, f"${val:,.0f}", 1, 0, "C", fill=True)
             self.ln()
 
-def generate_grc_report():
-    """Generate Fortune 500 GRC audit evidence package"""
+    def methodology_section(self):
+        """Section 2 – FAIR methodology, model parameters and benchmarking sources"""
+        self.add_page()
+        self.chapter_title("2. Risk Quantification Methodology", level=1)
+    
+        self.set_text_color(33, 37, 41)
+        methodology_text = (
+            "This assessment employs the FAIR model to calculate Annual Loss Expectancy (ALE) using the formula:\n\n"
+            "**ALE = (Asset Value × Threat Frequency) × (1 - Control Effectiveness)**\n\n"
+            "The following parameters were derived from industry standards and control assessments:"
+        )
+        self.set_font("DejaVu", "", 10)
+        self.multi_cell(0, 7, methodology_text)
+        self.ln(5)
+    
+        self.set_text_color(33, 37, 41)
+        self.set_font("DejaVu", "B", 10)
+        self.cell(0, 8, "FAIR Model Parameters", 0, 1)
+        self.ln(2)
+    
+        parameters = [
+            ["Parameter", "Source", "Values"],
+            ["Asset Value", "Classification-based", "Highly Sensitive: $1M | Sensitive: $100K | Internal: $10K | Public: $1K"],
+            ["Threat Frequency", "MITRE ATT&CK + Prowler Severity", "Critical: 30% | High: 15% | Medium: 5% | Low: 1%"],
+            ["Control Effectiveness", "NIST 800-53 assessment", "MFA: 90% | Encryption: 95% | Security Groups: 80% | Default: 0%"]
+        ]
+    
+        for row in parameters:
+            self.set_text_color(33, 37, 41)
+            self.set_font("DejaVu", "B" if row[0] == "Parameter" else "", 9)
+            for item in row:
+                self.cell(63, 6, str(item), 1, 0, "C" if row[0] == "Parameter" else "L")
+            self.ln()
+        self.ln(10)
+    
+        self.set_font("DejaVu", "B", 10)
+        self.set_text_color(33, 37, 41)
+        self.cell(0, 8, "Validation & Benchmarking", 0, 1)
+        self.ln(2)
+        self.set_font("DejaVu", "", 9)
+        self.multi_cell(0, 5, (
+            "• Loss magnitudes benchmarked against IBM Cost of Data Breach Report 2024\n"
+            "• Threat frequencies validated against Verizon DBIR incident statistics\n"
+            "• Control effectiveness derived from NIST 800-53 and CIS Controls assessments\n"
+            "• Cross-validated with MITRE ATT&CK threat models for cloud environments"
+        ))
+
+    def remediation_roadmap(self):
+        """Section 6 – phased remediation roadmap"""
+        self.add_page()
+        self.chapter_title("6. Remediation Roadmap", level=1)
+    
+        self.set_text_color(33, 37, 41)
+    
+        roadmap_intro = (
+            "This roadmap prioritizes remediation efforts based on risk magnitude, asset criticality, "
+            "and compliance requirements. All timeframes align with NIST 800-53r5 recommended practices."
+        )
+        self.set_font("DejaVu", "", 10)
+        self.multi_cell(0, 7, roadmap_intro)
+        self.ln(5)
     
-    with open("risk_quantification_report.json", "r") as f:
+        self.set_font("DejaVu", "B", 11)
+        self.set_text_color(33, 37, 41)
+        self.cell(0, 8, "Phase 1 (0-30 days): Critical Risk Reduction", 0, 1)
+        self.set_font("DejaVu", "B", 10)
+        self.cell(0, 6, "Scope: Critical findings + ALE > $100,000", 0, 1)
+        self.set_font("DejaVu", "", 9)
+        self.multi_cell(0, 5, (
+            "• Implement Multi-Factor Authentication on all IAM roles and users (IA-2, AC-2)\n"
+            "• Remove root account access keys and enable hardware MFA (IA-2, AC-6)\n"
+            "• Remove internet exposure from all database instances (SC-7, AC-3)\n"
+            "• Revoke AdministratorAccess policy from non-essential principals (AC-6, SC-2)\n"
+            "• Deploy AWS Config rules for continuous compliance monitoring\n"
+            "• Create JIRA/ServiceNow tickets with P0 priority for tracking"
+        ))
+        self.ln(5)
+    
+        self.set_font("DejaVu", "B", 11)
+        self.set_text_color(33, 37, 41)
+        self.cell(0, 8, "Phase 2 (30-90 days): High Risk Mitigation", 0, 1)
+        self.set_font("DejaVu", "B", 10)
+        self.cell(0, 6, "Scope: High findings + ALE $10,000-$100,000", 0, 1)
+        self.set_font("DejaVu", "", 9)
+        self.multi_cell(0, 5, (
+            "• Enable encryption at rest for all storage accounts (SC-13, SC-28)\n"
+            "• Implement least-privilege IAM policies across all services (AC-6)\n"
+            "• Enable soft-delete and versioning on all storage buckets (SI-12)\n"
+            "• Add confused deputy protection to all service roles (SC-7)\n"
+            "• Configure CloudTrail logging for all regions (AU-2, AU-3)\n"
+            "• Establish weekly Steampipe compliance scanning cron jobs"
+        ))
+        self.ln(5)
+    
+        self.set_font("DejaVu", "B", 11)
+        self.set_text_color(33, 37, 41)
+        self.cell(0, 8, "Phase 3 (90+ days): Continuous Improvement", 0, 1)
+        self.set_font("DejaVu", "B", 10)
+        self.cell(0, 6, "Scope: Medium/Low findings + Process establishment", 0, 1)
+        self.set_font("DejaVu", "", 9)
+        self.multi_cell(0, 5, (
+            "• Implement automated remediation using AWS Lambda/Config (SI-7)\n"
+            "• Integrate findings with SIEM/SOAR platform (AU-6, IR-4)\n"
+            "• Conduct quarterly access reviews for all IAM principals (AC-2)\n"
+            "• Establish KPI dashboard for ongoing risk monitoring\n"
+            "• Perform annual third-party penetration testing\n"
+            "• Update disaster recovery plans based on risk assessments"
+        ))
+
+    def reference_appendices(self):
+        """Appendix B (control effectiveness) and Appendix C (assumptions & limitations)"""
+        self.add_page()
+        self.chapter_title("Appendix B – Control Effectiveness Calculations", level=1)
+        self.set_text_color(33, 37, 41)
+    
+        effectiveness_intro = "Detailed assumptions for control effectiveness coefficients used in FAIR calculations."
+        self.set_font("DejaVu", "", 10)
+        self.multi_cell(0, 7, effectiveness_intro)
+        self.ln(5)
+    
+        controls_detail = [
+            ["Control Type", "Effectiveness", "Rationale", "Mapped Findings"],
+            ["Multi-Factor Authentication (MFA)", "90%", "Based on Microsoft research showing MFA blocks 99.9% of automated attacks", "iam_root_hardware_mfa_enabled, iam_administrator_access_with_mfa"],
+            ["Encryption at Rest (AES-256)", "95%", "Considered cryptographically unbreakable with current technology", "S3 bucket encryption, RDS encryption"],
+            ["Security Group Restrictions", "80%", "Reduces lateral movement but not foolproof against insider threats", "ec2_securitygroup_allow_ingress_from_internet"],
+            ["Least Privilege IAM", "85%", "Limits blast radius but requires continuous maintenance", "iam_policy_allows_privilege_escalation"],
+            ["CloudTrail Logging", "60%", "Aids detection but not prevention; dependent on monitoring", "Logging configuration checks"],
+            ["Backup & Versioning", "70%", "Protects against ransomware but has recovery time costs", "S3 versioning, RDS snapshots"],
+            ["Cross-Service Confused Deputy Protection", "75%", "AWS IAM conditions significantly reduce attack surface", "iam_role_cross_service_confused_deputy_prevention"],
+            ["No Control / Full Exposure", "0%", "Baseline for unmitigated risk scenarios", "Default security group rules"]
+        ]
+    
+        for row in controls_detail:
+            self.set_text_color(33, 37, 41)
+            self.set_font("DejaVu", "B" if row[0] == "Control Type" else "", 9)
+            self.cell(50, 6, row[0], 1, 0, "C" if row[0] == "Control Type" else "L")
+            self.cell(20, 6, row[1], 1, 0, "C")
+            self.cell(70, 6, row[2][:35], 1, 0, "L")
+            self.cell(50, 6, row[3][:25], 1, 0, "L")
+            self.ln()
+    
+        self.add_page()
+        self.chapter_title("Appendix C – Assumptions & Limitations", level=1)
+    
+        self.set_text_color(33, 37, 41)
+        assumptions = (
+            "**Scope Assumptions:**\n"
+            "• Assessment limited to AWS and Azure resources discoverable by Prowler and Steampipe\n"
+            "• Asset values based on estimated business impact, not actual revenue attribution\n"
+            "• Threat frequencies derived from public incident statistics, not organization-specific data\n"
+            "• Control effectiveness assumes proper implementation and monitoring\n\n"
+            "**Limitations:**\n"
+            "• Does not account for zero-day vulnerabilities or advanced persistent threats\n"
+            "• Loss magnitude estimates do not include reputational damage or legal costs\n"
+            "• Network effects and cloud blast radius scenarios are simplified\n"
+            "• Assumes independent risk events; does not model compounding incidents\n\n"
+            "**Validation:**\n"
+            "• Findings cross-referenced with AWS Security Hub and Azure Security Center\n"
+            "• Control mappings validated against NIST 800-53r5 official controls catalog\n"
+            "• ALE calculations peer-reviewed against FAIR Institute guidelines"
+        )
+    
+        self.set_text_color(33, 37, 41)
+        self.set_font("DejaVu", "", 9)
+        self.multi_cell(0, 5, assumptions)
+
+
+def render_appendix_part(part_file: str, rows: List[Tuple], page_offset: int) -> int:
+    """Render one slice of Appendix A as a standalone PDF whose footers continue the main numbering"""
+    pdf = Fortune500GRCReport(page_offset=page_offset)
+    pdf.set_auto_page_break(auto=False)
+    pdf.appendix_rows(rows)
+    pdf.output(part_file)
+    return pdf.page_no()
+
+
+def concatenate_pdfs(part_files: List[str], output_file: str) -> int:
+    from pypdf import PdfWriter
+    
+    writer = PdfWriter()
+    for part_file in part_files:
+        writer.append(part_file)
+    with open(output_file, "wb") as f:
+        writer.write(f)
+    return len(writer.pages)
+
+
+def _compliance_json(mapping) -> str:
+    """compliance_map as JSON text, whether it arrives as a dict, Arrow (key, value) pairs or an Arrow struct"""
+    if mapping is None or (isinstance(mapping, float) and math.isnan(mapping)):
+        return "{}"
+    items = mapping.items() if isinstance(mapping, dict) else mapping
+    return json.dumps({str(fw): [str(req) for req in reqs] for fw, reqs in items if reqs is not None})
+
+
+def write_evidence_file(frames: Iterable[pd.DataFrame], evidence_file: str,
+                        evidence_format: str = "csv") -> Tuple[int, str]:
+    """
+    Stream register chunks (EVIDENCE_CHUNK_ROWS each) to CSV/Parquet; returns (rows, SHA-256 of the file)
+    compliance_map is written as JSON text
+    """
+    if evidence_format not in EVIDENCE_FORMATS:
+        raise ValueError(f"Unsupported evidence format: {evidence_format}")
+    
+    rows = 0
+    if evidence_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        writer = None
+        for frame in frames:
+            if "compliance_map" in frame:
+                frame = frame.assign(compliance_map=frame["compliance_map"].map(_compliance_json))
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            writer = writer or pq.ParquetWriter(evidence_file, table.schema)
+            writer.write_table(table)
+            rows += len(frame)
+        if writer:
+            writer.close()
+    else:
+        with open(evidence_file, "w", newline="") as f:
+            for frame in frames:
+                if "compliance_map" in frame:
+                    frame = frame.assign(compliance_map=frame["compliance_map"].map(_compliance_json))
+                frame.to_csv(f, header=rows == 0, index=False)
+                rows += len(frame)
+    
+    digest = hashlib.sha256()
+    with open(evidence_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return rows, digest.hexdigest()
+
+
+def load_register(report_file: str = REPORT_FILE) -> pd.DataFrame:
+    with open(report_file, "r") as f:
         risk_data = json.load(f)
     
-    df = pd.DataFrame(risk_data)
+    return pd.DataFrame(risk_data)
+
+
+class RegisterView:
+    """
+    What a report reads from a register: totals, the risk cube, the framework index, the top findings by
+    ALE (ties in register order) and the rows themselves, chunk by chunk, for Appendix A / the evidence file
+    from_frame() derives everything from a loaded DataFrame; from_run() reads the aggregates risk_engine.py
+    wrote next to the report and streams rows from the run snapshot, so a register above the memory budget
+    is never loaded. Both render the same report
+    """
+    
+    def __init__(self, count: int, total_ale: float, cube: pd.DataFrame, index: FrameworkIndex,
+                 top: pd.DataFrame, run_id: str = None, frame: pd.DataFrame = None, snapshot_file: str = None):
+        self.count = count
+        self.total_ale = total_ale
+        self.cube = cube
+        self.index = index
+        self._top = top
+        self.run_id = run_id
+        self._frame = frame
+        self._snapshot_file = snapshot_file
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "RegisterView":
+        run_id = df["run_id"].iloc[-1] if "run_id" in df and not df.empty else None
+        top = df.assign(row=np.arange(len(df))).nlargest(COMPLIANCE_TABLE_MAX_ROWS, "ale", keep="first")
+        return cls(len(df), round(int(ale_cents(df["ale"]).sum()) / 100, 2), build_risk_cube(df),
+                   FrameworkIndex.from_register(df), top, run_id, frame=df)
+    
+    @classmethod
+    def from_run(cls, report_file: str, runs_dir: str = RUNS_DIR) -> "RegisterView":
+        with open(report_file.replace(".json", "_summary.json"), "r") as f:
+            summary = json.load(f)
+        run_id = summary["run_id"]
+        cube = load_risk_cube(report_file.replace(".json", "_cube.json"))
+        top = load_top_risks(top_file_for(report_file))
+        stale = [name for name, data in (("cube", cube), ("top risks", top)) if data.attrs.get("run_id") != run_id]
+        if stale:
+            raise ValueError(f"{', '.join(stale)} of {report_file} belong to another run than {run_id}")
+        snapshot_file = os.path.join(runs_dir, f"{run_id}.parquet")
+        return cls(summary["total_findings"], summary["total_ale"], cube,
+                   FrameworkIndex.load(index_file_for(report_file)), top, run_id, snapshot_file=snapshot_file)
+    
+    def top(self, k: int) -> pd.DataFrame:
+        return self._top.head(k)
+    
+    def counts(self, dimension: str) -> Dict[str, int]:
+        return self.cube.groupby(dimension, dropna=False)["count"].sum().to_dict()
+    
+    def compliance_rows(self) -> pd.DataFrame:
+        """Top COMPLIANCE_TABLE_MAX_ROWS findings by ALE, or every finding in register order if that is all of them"""
+        top = self.top(COMPLIANCE_TABLE_MAX_ROWS)
+        return top if self.count > COMPLIANCE_TABLE_MAX_ROWS else top.sort_values("row")
     
-    total_ale = df["ale"].sum()
-    critical_count = len(df[df["severity"] == "Critical"])
-    high_count = len(df[df["severity"] == "High"])
-    medium_count = len(df[df["severity"] == "Medium"])
-    low_count = len(df[df["severity"] == "Low"])
+    def frames(self, columns: List[str] = None, chunk_rows: int = EVIDENCE_CHUNK_ROWS) -> Iterable[pd.DataFrame]:
+        """Register rows in order, chunk_rows at a time"""
+        if self._frame is not None:
+            frame = self._frame if columns is None else self._frame[columns]
+            for start in range(0, len(frame), chunk_rows):
+                yield frame.iloc[start:start + chunk_rows]
+            return
+        
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        if not os.path.exists(self._snapshot_file):
+            raise FileNotFoundError(f"Run snapshot {self._snapshot_file} is missing; re-run risk_engine.py")
+        parquet = pq.ParquetFile(self._snapshot_file)
+        pending = pa.Table.from_batches([], schema=parquet.schema_arrow if columns is None
+                                        else pa.schema([parquet.schema_arrow.field(c) for c in columns]))
+        for batch in parquet.iter_batches(chunk_rows, columns=columns):
+            pending = pa.concat_tables([pending, pa.Table.from_batches([batch])])
+            while pending.num_rows >= chunk_rows:
+                yield pending.slice(0, chunk_rows).to_pandas()
+                pending = pending.slice(chunk_rows)
+        if pending.num_rows:
+            yield pending.to_pandas()
+    
+    def rows(self, columns: List[str]) -> Iterable[Tuple]:
+        for frame in self.frames(columns):
+            yield from frame.itertuples(index=False, name=None)
+
+
+def load_register_view(report_file: str = REPORT_FILE, budget: str = None) -> RegisterView:
+    """The whole register in memory, unless the report is larger than the memory budget"""
+    budget = memory_budget(budget)
+    if fits_in_memory(report_file, budget):
+        return RegisterView.from_frame(load_register(report_file))
+    print(f"Register {report_file} exceeds the {budget / (1 << 20):,.0f} MiB memory budget; "
+          f"reporting from the risk engine's aggregates")
+    return RegisterView.from_run(report_file)
+
+
+def current_drift(run_id: str, drift_file: str = DRIFT_FILE) -> Dict:
+    """The drift delta ending at this run, or None if there is none (or it is stale)"""
+    drift = load_drift(drift_file)
+    if not drift or not drift.get("base_run"):
+        return None
+    return drift if run_id is None or drift["head_run"] == run_id else None
+
+
+def generate_grc_report(report_file: str = REPORT_FILE, output_file: str = OUTPUT_FILE, workers: int = None,
+                        appendix_max_rows: int = APPENDIX_MAX_ROWS, evidence_format: str = "csv",
+                        drift_file: str = DRIFT_FILE, budget: str = None) -> Dict:
+    """Generate Fortune 500 GRC audit evidence package for the whole register"""
+    register = load_register_view(report_file, budget)
+    return build_grc_report(register, output_file, workers, appendix_max_rows, evidence_format,
+                            drift=current_drift(register.run_id, drift_file))
+
+
+def build_grc_report(register: Union[pd.DataFrame, RegisterView], output_file: str = OUTPUT_FILE,
+                     workers: int = None, appendix_max_rows: int = APPENDIX_MAX_ROWS, evidence_format: str = "csv",
+                     scope: str = None, drift: Dict = None) -> Dict:
+    """
+    Render one evidence package from a register DataFrame or RegisterView
+    Appendix A is rendered in parallel part-PDFs and concatenated (in-process when workers == 1);
+    registers above appendix_max_rows ship as a CSV/Parquet evidence file with a summary table instead.
+    drift (risk_drift.py output) adds a change-since-previous-run summary to the executive summary
+    """
+    register = RegisterView.from_frame(register) if isinstance(register, pd.DataFrame) else register
+    cube = register.cube
     
-    highly_sensitive_count = len(df[df["classification"] == "Highly Sensitive"])
-    sensitive_count = len(df[df["classification"] == "Sensitive"])
-    internal_count = len(df[df["classification"] == "Internal"])
-    public_count = len(df[df["classification"] == "Public"])
+    total_ale = register.total_ale
+    severity_counts = register.counts("severity")
+    critical_count = severity_counts.get("Critical", 0)
+    high_count = severity_counts.get("High", 0)
+    medium_count = severity_counts.get("Medium", 0)
+    low_count = severity_counts.get("Low", 0)
     
-    service_counts = df['service'].value_counts().head(8)
+    classification_counts = register.counts("classification")
+    highly_sensitive_count = classification_counts.get("Highly Sensitive", 0)
+    sensitive_count = classification_counts.get("Sensitive", 0)
+    internal_count = classification_counts.get("Internal", 0)
+    public_count = classification_counts.get("Public", 0)
+    
+    services = (cube.groupby("service", sort=False).agg(count=("count", "sum"), ale=("ale_sum", "sum"))
+                .sort_values("count", ascending=False, kind="stable").head(8))
     
     pdf = Fortune500GRCReport()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -163,6 +740,8 @@ def generate_grc_report():
     pdf.set_font("DejaVu", "", 11)
     pdf.set_text_color(100)
     pdf.cell(0, 10, f"Reporting Period: Q4 2025", 0, 1, "C")
+    if scope:
+        pdf.cell(0, 10, f"Scope: {scope}", 0, 1, "C")
     pdf.cell(0, 10, f"Generated: {datetime.now().strftime('%Y-%m-%d')}", 0, 1, "C")
     pdf.cell(0, 10, "AUDITOR USE ONLY – CONFIDENTIAL", 0, 1, "C")
     
@@ -171,7 +750,7 @@ def generate_grc_report():
     
     summary_text = (
         f"This audit quantifies financial risk exposure for multi-cloud infrastructure (AWS/Azure) using the "
-        f"FAIR (Factor Analysis of Information Risk) methodology. Analysis of {len(df)} security findings "
+        f"FAIR (Factor Analysis of Information Risk) methodology. Analysis of {len(register)} security findings "
         f"identified **{critical_count} Critical** and **{high_count} High** risk items with a total "
         f"Annual Loss Expectancy (ALE) of **${total_ale:,.2f}**. "
     )
@@ -200,50 +779,10 @@ def generate_grc_report():
     pdf.metric_box("Internal", str(internal_count), "medium")
     pdf.metric_box("Public", str(public_count), "low")
     
-    pdf.add_page()
-    pdf.chapter_title("2. Risk Quantification Methodology", level=1)
-    
-    pdf.set_text_color(33, 37, 41)
-    methodology_text = (
-        "This assessment employs the FAIR model to calculate Annual Loss Expectancy (ALE) using the formula:\n\n"
-        "**ALE = (Asset Value × Threat Frequency) × (1 - Control Effectiveness)**\n\n"
-        "The following parameters were derived from industry standards and control assessments:"
-    )
-    pdf.set_font("DejaVu", "", 10)
-    pdf.multi_cell(0, 7, methodology_text)
-    pdf.ln(5)
-    
-    pdf.set_text_color(33, 37, 41)
-    pdf.set_font("DejaVu", "B", 10)
-    pdf.cell(0, 8, "FAIR Model Parameters", 0, 1)
-    pdf.ln(2)
-    
-    parameters = [
-        ["Parameter", "Source", "Values"],
-        ["Asset Value", "Classification-based", "Highly Sensitive: $1M | Sensitive: $100K | Internal: $10K | Public: $1K"],
-        ["Threat Frequency", "MITRE ATT&CK + Prowler Severity", "Critical: 30% | High: 15% | Medium: 5% | Low: 1%"],
-        ["Control Effectiveness", "NIST 800-53 assessment", "MFA: 90% | Encryption: 95% | Security Groups: 80% | Default: 0%"]
-    ]
+    if drift:
+        pdf.drift_summary(drift)
     
-    for row in parameters:
-        pdf.set_text_color(33, 37, 41)
-        pdf.set_font("DejaVu", "B" if row[0] == "Parameter" else "", 9)
-        for item in row:
-            pdf.cell(63, 6, str(item), 1, 0, "C" if row[0] == "Parameter" else "L")
-        pdf.ln()
-    pdf.ln(10)
-    
-    pdf.set_font("DejaVu", "B", 10)
-    pdf.set_text_color(33, 37, 41)
-    pdf.cell(0, 8, "Validation & Benchmarking", 0, 1)
-    pdf.ln(2)
-    pdf.set_font("DejaVu", "", 9)
-    pdf.multi_cell(0, 5, (
-        "• Loss magnitudes benchmarked against IBM Cost of Data Breach Report 2024\n"
-        "• Threat frequencies validated against Verizon DBIR incident statistics\n"
-        "• Control effectiveness derived from NIST 800-53 and CIS Controls assessments\n"
-        "• Cross-validated with MITRE ATT&CK threat models for cloud environments"
-    ))
+    pdf.static_section("methodology_section")
     
     pdf.add_page()
     pdf.chapter_title("3. Control & Compliance Mapping", level=1)
@@ -259,17 +798,21 @@ def generate_grc_report():
     pdf.multi_cell(0, 7, mapping_intro)
     pdf.ln(5)
     
-    pdf.compliance_table(df.to_dict("records"))
+    compliance_columns = ["asset", "service", "severity", "ale", "classification", "control"]
+    if len(register) > COMPLIANCE_TABLE_MAX_ROWS:
+        pdf.multi_cell(0, 7, f"Top {COMPLIANCE_TABLE_MAX_ROWS} findings by ALE shown; the full register is in Appendix A.")
+        pdf.ln(2)
+    pdf.compliance_table(register.compliance_rows()[compliance_columns].itertuples(index=False, name=None))
     pdf.ln(5)
     
     pdf.set_font("DejaVu", "B", 10)
     pdf.cell(0, 8, "Compliance Framework Coverage", 0, 1)
     pdf.ln(2)
     
-    frameworks = df['compliance'].str.split(', ').explode().value_counts().head(10)
-    for fw, count in frameworks.items():
+    coverage = register.index.coverage().head(10)
+    for fw, count, requirements, fw_ale in coverage.itertuples(index=False, name=None):
         pdf.set_font("DejaVu", "", 9)
-        pdf.cell(0, 5, f"• {fw}: {count} findings", 0, 1)
+        pdf.cell(0, 5, f"• {fw}: {count} findings | {requirements} requirements | ${fw_ale:,.0f} ALE", 0, 1)
     
     pdf.add_page()
     pdf.chapter_title("4. Risk Heat Map Analysis", level=1)
@@ -282,7 +825,7 @@ def generate_grc_report():
     pdf.multi_cell(0, 7, heatmap_intro)
     pdf.ln(5)
     
-    pdf.risk_heatmap_table(df)
+    pdf.risk_heatmap_table(cube)
     
     pdf.add_page()
     pdf.chapter_title("5. Top 10 Prioritized Risks", level=1)
@@ -293,7 +836,7 @@ def generate_grc_report():
     pdf.multi_cell(0, 7, risk_intro)
     pdf.ln(5)
     
-    top_10 = df.sort_values("ale", ascending=False).head(10)
+    top_10 = register.top(10)
     for i, (index, row) in enumerate(top_10.iterrows(), 1):
         pdf.chapter_title(f"5.{i} {row['asset']}", level=2)
         pdf.set_font("DejaVu", "", 9)
@@ -313,65 +856,7 @@ def generate_grc_report():
         pdf.multi_cell(0, 4, row['remediation'][:300])
         pdf.ln(3)
     
-    pdf.add_page()
-    pdf.chapter_title("6. Remediation Roadmap", level=1)
-    
-    pdf.set_text_color(33, 37, 41)
-
-    roadmap_intro = (
-        "This roadmap prioritizes remediation efforts based on risk magnitude, asset criticality, "
-        "and compliance requirements. All timeframes align with NIST 800-53r5 recommended practices."
-    )
-    pdf.set_font("DejaVu", "", 10)
-    pdf.multi_cell(0, 7, roadmap_intro)
-    pdf.ln(5)
-    
-    pdf.set_font("DejaVu", "B", 11)
-    pdf.set_text_color(33, 37, 41)
-    pdf.cell(0, 8, "Phase 1 (0-30 days): Critical Risk Reduction", 0, 1)
-    pdf.set_font("DejaVu", "B", 10)
-    pdf.cell(0, 6, "Scope: Critical findings + ALE > $100,000", 0, 1)
-    pdf.set_font("DejaVu", "", 9)
-    pdf.multi_cell(0, 5, (
-        "• Implement Multi-Factor Authentication on all IAM roles and users (IA-2, AC-2)\n"
-        "• Remove root account access keys and enable hardware MFA (IA-2, AC-6)\n"
-        "• Remove internet exposure from all database instances (SC-7, AC-3)\n"
-        "• Revoke AdministratorAccess policy from non-essential principals (AC-6, SC-2)\n"
-        "• Deploy AWS Config rules for continuous compliance monitoring\n"
-        "• Create JIRA/ServiceNow tickets with P0 priority for tracking"
-    ))
-    pdf.ln(5)
-    
-    pdf.set_font("DejaVu", "B", 11)
-    pdf.set_text_color(33, 37, 41)
-    pdf.cell(0, 8, "Phase 2 (30-90 days): High Risk Mitigation", 0, 1)
-    pdf.set_font("DejaVu", "B", 10)
-    pdf.cell(0, 6, "Scope: High findings + ALE $10,000-$100,000", 0, 1)
-    pdf.set_font("DejaVu", "", 9)
-    pdf.multi_cell(0, 5, (
-        "• Enable encryption at rest for all storage accounts (SC-13, SC-28)\n"
-        "• Implement least-privilege IAM policies across all services (AC-6)\n"
-        "• Enable soft-delete and versioning on all storage buckets (SI-12)\n"
-        "• Add confused deputy protection to all service roles (SC-7)\n"
-        "• Configure CloudTrail logging for all regions (AU-2, AU-3)\n"
-        "• Establish weekly Steampipe compliance scanning cron jobs"
-    ))
-    pdf.ln(5)
-    
-    pdf.set_font("DejaVu", "B", 11)
-    pdf.set_text_color(33, 37, 41)
-    pdf.cell(0, 8, "Phase 3 (90+ days): Continuous Improvement", 0, 1)
-    pdf.set_font("DejaVu", "B", 10)
-    pdf.cell(0, 6, "Scope: Medium/Low findings + Process establishment", 0, 1)
-    pdf.set_font("DejaVu", "", 9)
-    pdf.multi_cell(0, 5, (
-        "• Implement automated remediation using AWS Lambda/Config (SI-7)\n"
-        "• Integrate findings with SIEM/SOAR platform (AU-6, IR-4)\n"
-        "• Conduct quarterly access reviews for all IAM principals (AC-2)\n"
-        "• Establish KPI dashboard for ongoing risk monitoring\n"
-        "• Perform annual third-party penetration testing\n"
-        "• Update disaster recovery plans based on risk assessments"
-    ))
+    pdf.static_section("remediation_roadmap")
     
     pdf.add_page()
     pdf.chapter_title("7. Asset Inventory Summary", level=1)
@@ -387,97 +872,195 @@ def generate_grc_report():
     pdf.cell(0, 8, "Assets by Service Category", 0, 1)
     pdf.ln(2)
     
-    for service, count in service_counts.items():
+    for service, count, service_ale in services.itertuples(name=None):
         pdf.set_font("DejaVu", "", 9)
-        service_ale = df[df['service'] == service]['ale'].sum()
         pdf.cell(0, 5, f"• {service}: {count} assets | ${service_ale:,.0f} total ALE", 0, 1)
     
     pdf.add_page()
     pdf.chapter_title("Appendix A – Detailed Risk Register", level=1)
 
     pdf.set_text_color(33, 37, 41)
-    appendix_intro = "Complete listing of all identified risks with full compliance mappings."
+    if len(register) > appendix_max_rows:
+        evidence_file = os.path.splitext(output_file)[0] + f"_register.{evidence_format}"
+        evidence_rows, evidence_sha256 = write_evidence_file(register.frames(), evidence_file, evidence_format)
+        appendix_intro = (
+            f"The register contains {evidence_rows:,} findings, beyond the {appendix_max_rows:,} rows rendered inline. "
+            f"The complete listing with full compliance mappings is attached as the evidence file "
+            f"{os.path.basename(evidence_file)} (SHA-256: {evidence_sha256})."
+        )
+        pdf.set_font("DejaVu", "", 10)
+        pdf.multi_cell(0, 7, appendix_intro)
+        pdf.ln(5)
+        pdf.evidence_summary_table(cube)
+        
+        pdf.static_section("reference_appendices")
+        pdf.write_pdf(output_file)
+        print(f"Audit-ready GRC report saved: {output_file} ({pdf.page_no()} pages), register evidence: {evidence_file}")
+        return {"file": output_file, "pages": pdf.page_no(), "evidence_file": evidence_file,
+                "evidence_sha256": evidence_sha256}
+    
+    appendix_pages = math.ceil(len(register) / APPENDIX_ROWS_PER_PAGE)
+    appendix_intro = (
+        "Complete listing of all identified risks with full compliance mappings "
+        f"({len(register):,} findings on the following {appendix_pages:,} pages)."
+    )
     pdf.set_font("DejaVu", "", 10)
     pdf.multi_cell(0, 7, appendix_intro)
-    pdf.ln(5)
     
-    # Write all findings
-    pdf.set_font("DejaVu", "B", 8)
-    headers = ["Asset", "Service", "Severity", "ALE", "Class", "Public", "Retention", "Control", "Frameworks"]
-    for h in headers:
-        pdf.cell(21, 6, h, 1, 0, "C", fill=True)
-    pdf.ln()
-
-    pdf.set_font("DejaVu", "", 7)
-    for _, row in df.iterrows():
-        pdf.cell(21, 5, str(row["asset"])[:20], 1)
-        pdf.cell(21, 5, str(row["service"])[:20], 1)
-        pdf.cell(21, 5, str(row["severity"]), 1)
-        pdf.cell(21, 5, f"${row['ale']:,.0f}", 1)
-        pdf.cell(21, 5, str(row["classification"]), 1)
-        pdf.cell(21, 5, str(row["is_public"]), 1)
-        pdf.cell(21, 5, f"{row['retention_days']}d", 1)
-        pdf.cell(21, 5, str(row["control"]), 1)
-        pdf.cell(21, 5, str(row["compliance"])[:15], 1)
-        pdf.ln()
+    part_rows = APPENDIX_ROWS_PER_PAGE * APPENDIX_PART_PAGES
+    if len(register) <= part_rows:
+        # A single part gains nothing from the split/merge round trip; lay it out in place
+        pdf.set_auto_page_break(auto=False)
+        pdf.appendix_rows(register.rows(APPENDIX_COLUMNS))
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.static_section("reference_appendices")
+        pdf.write_pdf(output_file)
+        print(f"Audit-ready GRC report saved: {output_file} ({pdf.page_no()} pages)")
+        return {"file": output_file, "pages": pdf.page_no()}
     
-    pdf.add_page()
-    pdf.chapter_title("Appendix B – Control Effectiveness Calculations", level=1)
-    pdf.set_text_color(33, 37, 41)
+    head_pages = pdf.page_no()
+    with tempfile.TemporaryDirectory(prefix="grc_report_") as tmp_dir:
+        head_file = os.path.join(tmp_dir, "head.pdf")
+        pdf.write_pdf(head_file)
+        
+        # Register rows are rendered as fixed-size part PDFs in parallel, then concatenated in order
+        rows = register.rows(APPENDIX_COLUMNS)
+        part_files = []
+        chunks = enumerate(iter(lambda: list(islice(rows, part_rows)), []))
+        if workers == 1:
+            for part, chunk in chunks:
+                part_files.append(os.path.join(tmp_dir, f"appendix_{part:05d}.pdf"))
+                render_appendix_part(part_files[-1], chunk, head_pages + part * APPENDIX_PART_PAGES)
+        else:
+            max_in_flight = 2 * (workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = []
+                for part, chunk in chunks:
+                    part_file = os.path.join(tmp_dir, f"appendix_{part:05d}.pdf")
+                    pending.append(executor.submit(render_appendix_part, part_file, chunk,
+                                                   head_pages + part * APPENDIX_PART_PAGES))
+                    part_files.append(part_file)
+                    if len(pending) >= max_in_flight:
+                        pending.pop(0).result()
+                for future in pending:
+                    future.result()
+        
+        tail = Fortune500GRCReport(page_offset=head_pages + appendix_pages)
+        tail.set_auto_page_break(auto=True, margin=15)
+        tail.static_section("reference_appendices")
+        tail_file = os.path.join(tmp_dir, "tail.pdf")
+        tail.write_pdf(tail_file)
+        
+        total_pages = concatenate_pdfs([head_file, *part_files, tail_file], output_file)
     
-    effectiveness_intro = "Detailed assumptions for control effectiveness coefficients used in FAIR calculations."
-    pdf.set_font("DejaVu", "", 10)
-    pdf.multi_cell(0, 7, effectiveness_intro)
-    pdf.ln(5)
+    print(f"Audit-ready GRC report saved: {output_file} ({total_pages} pages)")
+    return {"file": output_file, "pages": total_pages}
+
+
+def _tenant_file_name(tenant: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(tenant)).strip("_") or "unknown"
+
+
+def partition_register(df: pd.DataFrame, partition_by: str) -> Dict[str, np.ndarray]:
+    """
+    Row positions per tenant. "framework" uses the framework index postings, so a finding
+    mapped to several frameworks appears in each of their packages
+    """
+    if partition_by == "framework":
+        index = FrameworkIndex.from_register(df)
+        return {fw: index.framework_postings(fw) for fw in sorted(index.frameworks)}
+    if partition_by not in df.columns:
+        raise ValueError(f"Cannot partition by '{partition_by}': not a register column")
+    return {str(key): rows for key, rows in df.groupby(partition_by, sort=True, dropna=False).indices.items()}
+
+
+_SHARED_REGISTERS: Dict[str, "pa.Table"] = {}
+
+
+def _render_tenant_report(arrow_file: str, tenant: str, rows: np.ndarray, output_file: str,
+                          scope: str, appendix_max_rows: int, evidence_format: str) -> Dict:
+    """Worker: slice the memory-mapped register (zero-copy, opened once per process) and render one package"""
+    import pyarrow as pa
     
-    controls_detail = [
-        ["Control Type", "Effectiveness", "Rationale", "Mapped Findings"],
-        ["Multi-Factor Authentication (MFA)", "90%", "Based on Microsoft research showing MFA blocks 99.9% of automated attacks", "iam_root_hardware_mfa_enabled, iam_administrator_access_with_mfa"],
-        ["Encryption at Rest (AES-256)", "95%", "Considered cryptographically unbreakable with current technology", "S3 bucket encryption, RDS encryption"],
-        ["Security Group Restrictions", "80%", "Reduces lateral movement but not foolproof against insider threats", "ec2_securitygroup_allow_ingress_from_internet"],
-        ["Least Privilege IAM", "85%", "Limits blast radius but requires continuous maintenance", "iam_policy_allows_privilege_escalation"],
-        ["CloudTrail Logging", "60%", "Aids detection but not prevention; dependent on monitoring", "Logging configuration checks"],
-        ["Backup & Versioning", "70%", "Protects against ransomware but has recovery time costs", "S3 versioning, RDS snapshots"],
-        ["Cross-Service Confused Deputy Protection", "75%", "AWS IAM conditions significantly reduce attack surface", "iam_role_cross_service_confused_deputy_prevention"],
-        ["No Control / Full Exposure", "0%", "Baseline for unmitigated risk scenarios", "Default security group rules"]
-    ]
-    
-    for row in controls_detail:
-        pdf.set_text_color(33, 37, 41)
-        pdf.set_font("DejaVu", "B" if row[0] == "Control Type" else "", 9)
-        pdf.cell(50, 6, row[0], 1, 0, "C" if row[0] == "Control Type" else "L")
-        pdf.cell(20, 6, row[1], 1, 0, "C")
-        pdf.cell(70, 6, row[2][:35], 1, 0, "L")
-        pdf.cell(50, 6, row[3][:25], 1, 0, "L")
-        pdf.ln()
+    table = _SHARED_REGISTERS.get(arrow_file)
+    if table is None:
+        table = pa.ipc.open_file(pa.memory_map(arrow_file, "r")).read_all()
+        _SHARED_REGISTERS[arrow_file] = table
+    df = table.take(pa.array(rows)).to_pandas()
+    result = build_grc_report(df, output_file, 1, appendix_max_rows, evidence_format, scope=scope)
+    total_ale = float(df["ale"].sum())
+    return {"tenant": tenant, "findings": len(df), "total_ale": round(total_ale, 2), **result}
+
+
+def generate_tenant_reports(report_file: str = REPORT_FILE, partition_by: str = "account_id",
+                            output_dir: str = TENANT_DIR, workers: int = None,
+                            appendix_max_rows: int = APPENDIX_MAX_ROWS, evidence_format: str = "csv") -> Dict:
+    """
+    Batch mode: load the register once, partition it by partition_by and render one evidence package per
+    tenant in a process pool. Workers share the register as a read-only memory-mapped Arrow IPC file
+    """
+    import pyarrow as pa
     
-    pdf.add_page()
-    pdf.chapter_title("Appendix C – Assumptions & Limitations", level=1)
+    df = load_register(report_file)
+    partitions = partition_register(df, partition_by)
+    os.makedirs(output_dir, exist_ok=True)
     
-    pdf.set_text_color(33, 37, 41)
-    assumptions = (
-        "**Scope Assumptions:**\n"
-        "• Assessment limited to AWS and Azure resources discoverable by Prowler and Steampipe\n"
-        "• Asset values based on estimated business impact, not actual revenue attribution\n"
-        "• Threat frequencies derived from public incident statistics, not organization-specific data\n"
-        "• Control effectiveness assumes proper implementation and monitoring\n\n"
-        "**Limitations:**\n"
-        "• Does not account for zero-day vulnerabilities or advanced persistent threats\n"
-        "• Loss magnitude estimates do not include reputational damage or legal costs\n"
-        "• Network effects and cloud blast radius scenarios are simplified\n"
-        "• Assumes independent risk events; does not model compounding incidents\n\n"
-        "**Validation:**\n"
-        "• Findings cross-referenced with AWS Security Hub and Azure Security Center\n"
-        "• Control mappings validated against NIST 800-53r5 official controls catalog\n"
-        "• ALE calculations peer-reviewed against FAIR Institute guidelines"
-    )
+    index = {
+        "partition_by": partition_by,
+        "source": report_file,
+        "generated_at": datetime.now().isoformat(),
+        "reports": [],
+        "failures": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="grc_tenants_") as tmp_dir:
+        arrow_file = os.path.join(tmp_dir, "register.arrow")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(arrow_file, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        del df, table
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for tenant, rows in partitions.items():
+                output_file = os.path.join(output_dir, f"GRC_Compliance_Report_{_tenant_file_name(tenant)}.pdf")
+                future = executor.submit(_render_tenant_report, arrow_file, tenant, rows, output_file,
+                                         f"{partition_by} {tenant}", appendix_max_rows, evidence_format)
+                futures[future] = tenant
+            for future in as_completed(futures):
+                try:
+                    index["reports"].append(future.result())
+                except Exception as e:
+                    index["failures"][futures[future]] = str(e)
     
-    pdf.set_text_color(33, 37, 41)
-    pdf.set_font("DejaVu", "", 9)
-    pdf.multi_cell(0, 5, assumptions)
+    index["reports"].sort(key=lambda report: report["tenant"])
+    with open(os.path.join(output_dir, TENANT_INDEX_FILE), "w") as f:
+        json.dump(index, f, indent=2, default=str)
     
-    pdf.output("GRC_Compliance_Report.pdf")
-    print(f"Audit-ready GRC report saved: GRC_Compliance_Report.pdf ({pdf.page_no()} pages)")
+    print(f"Generated {len(index['reports'])}/{len(partitions)} {partition_by} packages in {output_dir}")
+    if index["failures"]:
+        print(f"Warning: {len(index['failures'])} packages failed, see {TENANT_INDEX_FILE}")
+    return index
 
 if __name__ == "__main__":
-    generate_grc_report()
+    parser = argparse.ArgumentParser(description="Generate the GRC audit evidence PDF")
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--workers", type=int, help="Processes rendering Appendix A parts (default: CPU count)")
+    parser.add_argument("--appendix-max-rows", type=int, default=APPENDIX_MAX_ROWS)
+    parser.add_argument("--evidence-format", choices=EVIDENCE_FORMATS, default="csv")
+    parser.add_argument("--drift", default=DRIFT_FILE, help="risk_drift.py delta shown in the executive summary")
+    parser.add_argument("--memory-budget", help="e.g. 2G; a register report larger than this is not loaded, the "
+                                                "report is built from the risk engine's aggregates and run snapshot "
+                                                "(default: GRC_MEMORY_BUDGET, unlimited). Not a fixed RSS ceiling: "
+                                                "the framework index is still loaded whole and grows with the register")
+    parser.add_argument("--partition-by", metavar="COLUMN",
+                        help="Batch mode: one package per value of a register column (e.g. account_id) or 'framework'")
+    parser.add_argument("--output-dir", default=TENANT_DIR, help="Batch mode output directory")
+    args = parser.parse_args()
+
+    if args.partition_by:
+        generate_tenant_reports(args.report, args.partition_by, args.output_dir, args.workers,
+                                args.appendix_max_rows, args.evidence_format)
+    else:
+        generate_grc_report(args.report, args.output, args.workers, args.appendix_max_rows, args.evidence_format,
+                            args.drift, args.memory_budget)
@@ -1,32 +1,139 @@
+import argparse
+import hashlib
 import json
-import re
 import os
+import re
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Any, Tuple
+
+from json_stream import iter_json_records
+from verdict_cache import POLICY_FILE, VerdictCache, policy_bundle_hash
+
+OUTPUT_DIR = "extracted_remediations"
+MANIFEST_FILE = "manifest.json"
+
+hcl_regex = re.compile(r"```(?:hcl)?\s*(.*?)\s*```", re.DOTALL)
+resource_regex = re.compile(r'^\s*resource\s+"([\w-]+)"\s+"([\w-]+)"', re.MULTILINE)
+fragment_regex = re.compile(r"^[0-9a-f]{64}\.tf$")
+
 
-output_dir = "extracted_remediations"
-os.makedirs(output_dir, exist_ok=True)
+def normalize_hcl(code: str) -> str:
+    """Canonical form used for content addressing: LF endings, no trailing whitespace or blank edges"""
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+    return "\n".join(lines).strip() + "\n"
 
-with open('grc_remediation_plan.json', 'r') as f:
-    plan = json.load(f)
 
-hcl_regex = r"```(?:hcl)?\s*(.*?)\s*```"
+def hcl_digest(code: str) -> str:
+    return hashlib.sha256(normalize_hcl(code).encode("utf-8")).hexdigest()
 
-for i, item in enumerate(plan):
+
+def extract_blocks(indexed_item: Tuple[int, Dict[str, Any]]) -> Tuple[int, str, List[Dict[str, Any]]]:
+    """Worker: pull fenced HCL blocks out of one remediation analysis"""
+    i, item = indexed_item
     analysis_text = item.get('analysis', '')
-    resource_id = item.get('resource', 'unknown').split('/')[-1]
-    
-    matches = list(re.finditer(hcl_regex, analysis_text, re.DOTALL))
-    
-    if not matches:
-        print(f"Skipping Item {i}: No HCL code found.")
-        continue
-
-    for j, match in enumerate(matches):
-        code_content = match.group(1).strip()
-        
-        filename = f"item_{i}_block_{j}_{resource_id}.tf"
-        filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, 'w') as tf_file:
-            tf_file.write(code_content)
-            
-    print(f"Item {i}: Extracted {len(matches)} blocks for {resource_id}")
\ No newline at end of file
+    resource_uid = item.get('resource') or 'unknown'
+
+    blocks = []
+    for match in hcl_regex.finditer(analysis_text):
+        code = normalize_hcl(match.group(1))
+        if not code.strip():
+            continue
+        blocks.append({
+            "digest": hcl_digest(code),
+            "code": code,
+            "addresses": [f"{r_type}.{r_name}" for r_type, r_name in resource_regex.findall(code)],
+        })
+    return i, resource_uid, blocks
+
+
+def prune_fragments(output_dir: str, keep: Iterable[str]) -> int:
+    """Remove <sha256>.tf fragments of earlier plans (digests not in keep); returns the number removed"""
+    keep = set(keep)
+    removed = 0
+    for filename in os.listdir(output_dir):
+        if fragment_regex.match(filename) and filename[:-len(".tf")] not in keep:
+            os.remove(os.path.join(output_dir, filename))
+            removed += 1
+    return removed
+
+
+def extract_remediations(plan_file: str = "grc_remediation_plan.json", output_dir: str = OUTPUT_DIR,
+                         workers: int = None, chunksize: int = 16,
+                         policy_file: str = POLICY_FILE) -> Dict[str, Any]:
+    """
+    Stream the remediation plan (JSON array or JSONL), extract HCL in a worker pool and
+    write each distinct block once as <sha256>.tf plus a manifest mapping resources to block hashes
+    Fragments of earlier plans that this plan no longer contains are removed, so downstream stages only
+    see the current plan's blocks
+    Blocks already validated against the current policy carry their cached verdict in the manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    cache = VerdictCache(policy_bundle_hash(policy_file)) if os.path.exists(policy_file) else None
+    manifest = {"policy_hash": cache.policy_hash if cache else None, "blocks": {}, "resources": {}, "stats": {}}
+    items = blocks_found = written = 0
+
+    with Pool(processes=workers) as pool:
+        results = pool.imap(extract_blocks, enumerate(iter_json_records(plan_file)), chunksize=chunksize)
+        for i, resource_uid, blocks in results:
+            items += 1
+            resource_id = resource_uid.split('/')[-1]
+            if not blocks:
+                print(f"Skipping Item {i}: No HCL code found.")
+                continue
+
+            resource_hashes = manifest["resources"].setdefault(resource_uid, [])
+            for block in blocks:
+                blocks_found += 1
+                digest = block["digest"]
+                entry = manifest["blocks"].get(digest)
+                if entry is None:
+                    filename = f"{digest}.tf"
+                    filepath = os.path.join(output_dir, filename)
+                    if not os.path.exists(filepath):
+                        with open(filepath, 'w') as tf_file:
+                            tf_file.write(block["code"])
+                        written += 1
+                    entry = manifest["blocks"][digest] = {
+                        "file": filename,
+                        "addresses": block["addresses"],
+                        "resources": [],
+                        "items": [],
+                    }
+                    verdict = cache.get(digest) if cache else None
+                    if verdict is not None:
+                        entry["verdict"] = {"allow": not verdict, "deny": verdict}
+                if resource_uid not in entry["resources"]:
+                    entry["resources"].append(resource_uid)
+                entry["items"].append(i)
+                if digest not in resource_hashes:
+                    resource_hashes.append(digest)
+
+            print(f"Item {i}: Extracted {len(blocks)} blocks for {resource_id}")
+
+    pruned = prune_fragments(output_dir, manifest["blocks"])
+    manifest["stats"] = {
+        "items": items,
+        "blocks_found": blocks_found,
+        "unique_blocks": len(manifest["blocks"]),
+        "files_written": written,
+        "files_pruned": pruned,
+        "cached_verdicts": cache.hits if cache else 0,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Extraction complete: {blocks_found} blocks from {items} items -> "
+          f"{len(manifest['blocks'])} unique files ({written} new, {pruned} stale removed) in {output_dir}/, "
+          f"{manifest['stats']['cached_verdicts']} already validated")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract deduplicated Terraform fixes from the remediation plan")
+    parser.add_argument("--plan", default="grc_remediation_plan.json")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    extract_remediations(args.plan, args.output_dir, args.workers)
@@ -0,0 +1,311 @@
+import json
+import re
+from typing import Dict, List, Any, Tuple
+
+NUMBER_REGEX = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+IDENT_REGEX = re.compile(r"[A-Za-z_][A-Za-z0-9_-]*")
+HEREDOC_REGEX = re.compile(r"<<(-?)([A-Za-z_][A-Za-z0-9_]*)[ \t]*\n")
+
+BLOCK_LABEL_COUNTS = {"resource": 2, "data": 2, "provider": 1, "variable": 1, "output": 1, "module": 1,
+                      "terraform": 0, "locals": 0}
+
+# Meta-arguments whose Terraform JSON form is a bare reference string, not a "${...}" template
+BARE_REFERENCE_KEYS = {"depends_on", "provider", "ignore_changes", "replace_triggered_by"}
+
+
+class HCLParseError(ValueError):
+    pass
+
+
+class _HCLParser:
+    """
+    Recursive-descent reader for the HCL subset LLM remediations use
+    Literals become JSON values; any other expression is kept verbatim as a "${...}" template,
+    which is how Terraform JSON syntax represents expressions
+    """
+
+    def __init__(self, text: str):
+        self.text = text.replace("\r\n", "\n")
+        self.pos = 0
+
+    def error(self, message: str):
+        line = self.text.count("\n", 0, self.pos) + 1
+        raise HCLParseError(f"line {line}: {message}")
+
+    def peek(self, n: int = 1) -> str:
+        return self.text[self.pos:self.pos + n]
+
+    def skip_ws(self, newlines: bool = True):
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if ch in " \t" or (newlines and ch == "\n"):
+                self.pos += 1
+            elif ch == "#" or self.peek(2) == "//":
+                end = self.text.find("\n", self.pos)
+                self.pos = len(self.text) if end == -1 else end
+            elif self.peek(2) == "/*":
+                end = self.text.find("*/", self.pos + 2)
+                if end == -1:
+                    self.error("unterminated comment")
+                self.pos = end + 2
+            else:
+                break
+
+    def parse_body(self, closing: str = None) -> List[Tuple]:
+        items = []
+        while True:
+            self.skip_ws()
+            if self.pos >= len(self.text):
+                if closing:
+                    self.error(f"expected '{closing}'")
+                return items
+            if self.peek() == closing:
+                return items
+
+            match = IDENT_REGEX.match(self.text, self.pos)
+            if not match:
+                self.error(f"unexpected character {self.peek()!r}")
+            name = match.group(0)
+            self.pos = match.end()
+            self.skip_ws(newlines=False)
+
+            if self.peek() == "=" and self.peek(2) != "==":
+                self.pos += 1
+                items.append(("attr", name, self.parse_expr("\n}")))
+                continue
+
+            labels = []
+            while self.peek() != "{":
+                if self.peek() == '"':
+                    labels.append(self.parse_string())
+                else:
+                    label = IDENT_REGEX.match(self.text, self.pos)
+                    if not label:
+                        self.error(f"expected block label or '{{' after {name!r}")
+                    labels.append(label.group(0))
+                    self.pos = label.end()
+                self.skip_ws(newlines=False)
+            self.pos += 1
+            body = self.parse_body("}")
+            self.pos += 1
+            items.append(("block", name, labels, body))
+
+    def parse_expr(self, terminators: str) -> Any:
+        start = self.pos
+        self.skip_ws(newlines=False)
+        try:
+            value, is_literal = self.parse_literal()
+        except HCLParseError:
+            is_literal = False
+        if is_literal:
+            self.skip_ws(newlines=False)
+            if self.pos >= len(self.text) or self.peek() in terminators:
+                return value
+        self.pos = start
+        return "${" + self.scan_raw(terminators) + "}"
+
+    def parse_literal(self) -> Tuple[Any, bool]:
+        ch = self.peek()
+        if ch == '"':
+            return self.parse_string(), True
+        if self.peek(2) == "<<":
+            return self.parse_heredoc(), True
+        if ch in "[{":
+            if re.match(r"[\[{]\s*for\s", self.text[self.pos:self.pos + 16]):
+                return None, False
+            return (self.parse_tuple() if ch == "[" else self.parse_object()), True
+        number = NUMBER_REGEX.match(self.text, self.pos)
+        if number:
+            self.pos = number.end()
+            return json.loads(number.group(0)), True
+        ident = IDENT_REGEX.match(self.text, self.pos)
+        if ident and ident.group(0) in ("true", "false", "null"):
+            self.pos = ident.end()
+            return {"true": True, "false": False, "null": None}[ident.group(0)], True
+        return None, False
+
+    def parse_string(self) -> str:
+        """Quoted template; escapes are decoded, ${...} interpolations are kept as-is"""
+        self.pos += 1
+        out = []
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if ch == '"':
+                self.pos += 1
+                return "".join(out)
+            if ch == "\n":
+                self.error("newline in string literal")
+            if ch == "\\":
+                esc = self.peek(2)[1:]
+                if esc == "u":
+                    out.append(chr(int(self.text[self.pos + 2:self.pos + 6], 16)))
+                    self.pos += 6
+                    continue
+                out.append({"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}.get(esc, "\\" + esc))
+                self.pos += 2
+                continue
+            if self.peek(2) in ("${", "%{"):
+                start = self.pos
+                self.skip_template()
+                out.append(self.text[start:self.pos])
+                continue
+            out.append(ch)
+            self.pos += 1
+        self.error("unterminated string")
+
+    def skip_template(self):
+        self.pos += 2
+        depth = 1
+        while self.pos < len(self.text) and depth:
+            ch = self.text[self.pos]
+            if ch == '"':
+                self.parse_string()
+                continue
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+            self.pos += 1
+        if depth:
+            self.error("unterminated template interpolation")
+
+    def parse_heredoc(self) -> str:
+        match = HEREDOC_REGEX.match(self.text, self.pos)
+        if not match:
+            self.error("malformed heredoc")
+        strip_indent, marker = match.group(1) == "-", match.group(2)
+        end = re.compile(rf"^[ \t]*{marker}[ \t]*$", re.MULTILINE).search(self.text, match.end())
+        if not end:
+            self.error(f"unterminated heredoc {marker}")
+        lines = self.text[match.end():end.start()].split("\n")[:-1]
+        if strip_indent:
+            indents = [len(l) - len(l.lstrip()) for l in lines if l.strip()]
+            cut = min(indents) if indents else 0
+            lines = [l[cut:] for l in lines]
+        self.pos = end.end()
+        return "\n".join(lines) + "\n"
+
+    def parse_tuple(self) -> List[Any]:
+        self.pos += 1
+        values = []
+        while True:
+            self.skip_ws()
+            if self.peek() == "]":
+                self.pos += 1
+                return values
+            values.append(self.parse_expr(",]"))
+            self.skip_ws()
+            if self.peek() == ",":
+                self.pos += 1
+            elif self.peek() != "]":
+                self.error("expected ',' or ']' in tuple")
+
+    def parse_object(self) -> Dict[str, Any]:
+        self.pos += 1
+        values = {}
+        while True:
+            self.skip_ws()
+            if self.peek() == "}":
+                self.pos += 1
+                return values
+            if self.peek() == '"':
+                key = self.parse_string()
+            else:
+                match = IDENT_REGEX.match(self.text, self.pos)
+                if not match:
+                    self.error("unsupported object key")
+                key = match.group(0)
+                self.pos = match.end()
+            self.skip_ws(newlines=False)
+            if self.peek() not in ("=", ":"):
+                self.error(f"expected '=' after object key {key!r}")
+            self.pos += 1
+            values[key] = self.parse_expr(",}\n")
+            self.skip_ws(newlines=False)
+            if self.peek() == ",":
+                self.pos += 1
+
+    def scan_raw(self, terminators: str) -> str:
+        """Consume an arbitrary expression up to a terminator at bracket depth 0"""
+        start = self.pos
+        depth = 0
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if depth == 0 and (ch in terminators or ch == "#" or self.peek(2) == "//"):
+                break
+            if ch == '"':
+                self.parse_string()
+                continue
+            if ch in "([{":
+                depth += 1
+            elif ch in ")]}":
+                depth -= 1
+            self.pos += 1
+        raw = self.text[start:self.pos].strip()
+        if not raw:
+            self.error("expected expression")
+        return raw
+
+
+def _body_to_json(items: List[Tuple]) -> Dict[str, Any]:
+    body = {}
+    for item in items:
+        if item[0] == "attr":
+            _, name, value = item
+            if name in BARE_REFERENCE_KEYS:
+                value = _strip_template(value)
+            body[name] = value
+        else:
+            _, name, labels, inner = item
+            block = _body_to_json(inner)
+            for label in reversed(labels):
+                block = {label: block}
+            body.setdefault(name, []).append(block)
+    return body
+
+
+def _strip_template(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_strip_template(v) for v in value]
+    if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
+        return value[2:-1]
+    return value
+
+
+def parse_hcl(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse HCL source into top-level blocks
+    Returns: [{"type": "resource", "labels": ["aws_s3_bucket", "logs"], "body": {...Terraform JSON...}}]
+    """
+    blocks = []
+    for item in _HCLParser(text).parse_body():
+        if item[0] == "attr":
+            raise HCLParseError(f"top-level attribute {item[1]!r} outside of a block")
+        _, block_type, labels, inner = item
+        expected = BLOCK_LABEL_COUNTS.get(block_type)
+        if expected is not None and len(labels) != expected:
+            raise HCLParseError(f"{block_type} block expects {expected} labels, got {len(labels)}")
+        body = _body_to_json(inner)
+        if block_type == "variable" and "type" in body:
+            body["type"] = _strip_template(body["type"])
+        blocks.append({"type": block_type, "labels": labels, "body": body})
+    return blocks
+
+
+def to_terraform_json(blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble parsed top-level blocks into a Terraform JSON document (the shape OPA reads as input)"""
+    doc = {}
+    for block in blocks:
+        block_type, labels, body = block["type"], block["labels"], block["body"]
+        if block_type == "terraform":
+            doc.setdefault("terraform", []).append(body)
+        elif block_type == "locals":
+            doc.setdefault("locals", {}).update(body)
+        elif block_type == "provider":
+            doc.setdefault("provider", {}).setdefault(labels[0], []).append(body)
+        else:
+            node = doc.setdefault(block_type, {})
+            for label in labels[:-1]:
+                node = node.setdefault(label, {})
+            node[labels[-1]] = body
+    return doc
@@ -0,0 +1,63 @@
+import json
+from typing import Any, Dict, Iterator
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+def iter_json_records(filepath: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a JSON array file or a JSONL/NDJSON file
+    Only one record (plus one read buffer) is held in memory at a time
+    """
+    with open(filepath, 'r') as f:
+        head = f.read(READ_CHUNK_SIZE)
+        # Sniff the format from the first non-whitespace character, however much whitespace precedes it
+        while head.isspace():
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            head += chunk
+        if not head.lstrip().startswith("["):
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+        yield from _iter_json_array(f, head)
+
+
+def _iter_json_array(f, buffer: str) -> Iterator[Dict[str, Any]]:
+    decoder = json.JSONDecoder()
+    pos = buffer.index("[") + 1
+    eof = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        # A number cut by the buffer edge ("12" of "123", "-0" of "-0.25") may decode short: scalars count
+        # only once a delimiter follows them; otherwise refill and retry
+        if not eof and not isinstance(record, (dict, list, str)) and \
+                (end == len(buffer) or buffer[end] not in " \t\r\n,]"):
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield record
+        pos = end
+        if pos > READ_CHUNK_SIZE:
+            buffer = buffer[pos:]
+            pos = 0
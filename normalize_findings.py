@@ -0,0 +1,147 @@
+import argparse
+import hashlib
+import os
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from json_stream import iter_json_records
+
+FINDINGS_FILE = "findings.parquet"
+PROWLER_FILES = ["aws_prowler_scan.json", "azurescan.json"]
+BATCH_ROWS = 50_000
+
+# One row per Prowler OCSF finding, first resource only (what every consumer reads).
+# Parquet dictionary-encodes the low-cardinality string columns on disk
+FINDINGS_SCHEMA = pa.schema([
+    ("finding_id", pa.string()),
+    ("source_uid", pa.string()),
+    ("source_file", pa.string()),
+    ("cloud_provider", pa.string()),
+    ("account_id", pa.string()),
+    ("region", pa.string()),
+    ("finding_code", pa.string()),
+    ("severity", pa.string()),
+    ("status_code", pa.string()),
+    ("status", pa.string()),
+    ("title", pa.string()),
+    ("description", pa.string()),
+    ("risk_details", pa.string()),
+    ("remediation", pa.string()),
+    ("created_time", pa.string()),
+    ("resource_uid", pa.string()),
+    ("resource_name", pa.string()),
+    ("resource_type", pa.string()),
+    ("resource_state", pa.string()),
+    ("categories", pa.list_(pa.string())),
+    ("compliance", pa.map_(pa.string(), pa.list_(pa.string()))),
+])
+
+FINDING_ID_FIELDS = ["cloud_provider", "account_id", "region", "finding_code", "resource_uid"]
+
+
+def _text(value: Any) -> Union[str, None]:
+    return None if value is None else str(value)
+
+
+def finding_id(row: Dict[str, Any]) -> str:
+    """Stable across scans: the same check on the same resource always gets the same ID"""
+    key = "|".join(row.get(field) or "" for field in FINDING_ID_FIELDS)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def normalize_finding(finding: Dict[str, Any], source_file: str = None) -> Dict[str, Any]:
+    """Flatten one raw OCSF finding into a FINDINGS_SCHEMA row"""
+    resource = (finding.get("resources") or [{}])[0] or {}
+    info = finding.get("finding_info") or {}
+    cloud = finding.get("cloud") or {}
+    unmapped = finding.get("unmapped") if isinstance(finding.get("unmapped"), dict) else {}
+    compliance = unmapped.get("compliance") if isinstance(unmapped.get("compliance"), dict) else {}
+    remediation = finding.get("remediation") if isinstance(finding.get("remediation"), dict) else {}
+    metadata = (resource.get("data") or {}).get("metadata") or {}
+
+    row = {
+        "source_uid": _text(info.get("uid")),
+        "source_file": source_file,
+        "cloud_provider": _text(cloud.get("provider")),
+        "account_id": _text((cloud.get("account") or {}).get("uid")),
+        "region": _text(resource.get("region") or cloud.get("region")),
+        "finding_code": _text((finding.get("metadata") or {}).get("event_code")),
+        "severity": _text(finding.get("severity")),
+        "status_code": _text(finding.get("status_code")),
+        "status": _text(finding.get("status")),
+        "title": _text(info.get("title")),
+        "description": _text(info.get("desc")),
+        "risk_details": _text(finding.get("risk_details")),
+        "remediation": _text(remediation.get("desc")),
+        "created_time": _text(info.get("created_time_dt")),
+        "resource_uid": _text(resource.get("uid")),
+        "resource_name": _text(resource.get("name")),
+        "resource_type": _text(resource.get("type")),
+        "resource_state": _text(metadata.get("state") if isinstance(metadata, dict) else None),
+        "categories": [str(c) for c in unmapped.get("categories") or []],
+        "compliance": [(str(fw), [str(req) for req in (reqs or [])]) for fw, reqs in compliance.items()],
+    }
+    row["finding_id"] = finding_id(row)
+    return row
+
+
+def iter_finding_batches(prowler_files: List[str], batch_rows: int = BATCH_ROWS) -> Iterator[pa.RecordBatch]:
+    """Stream raw Prowler JSON/NDJSON files into typed record batches"""
+    for prowler_file in prowler_files:
+        rows = (normalize_finding(finding, prowler_file) for finding in iter_json_records(prowler_file))
+        for chunk in iter(lambda: list(islice(rows, batch_rows)), []):
+            yield pa.RecordBatch.from_pylist(chunk, schema=FINDINGS_SCHEMA)
+
+
+def write_findings(prowler_files: List[str], output_file: str = FINDINGS_FILE, batch_rows: int = BATCH_ROWS) -> int:
+    """Normalize Prowler output once into a Parquet findings table; returns the row count"""
+    rows = 0
+    tmp_file = f"{output_file}.tmp"
+    with pq.ParquetWriter(tmp_file, FINDINGS_SCHEMA) as writer:
+        for batch in iter_finding_batches(prowler_files, batch_rows):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    os.replace(tmp_file, output_file)
+    return rows
+
+
+def load_findings(source: Union[str, List[str]] = FINDINGS_FILE, columns: List[str] = None) -> pa.Table:
+    """
+    Findings table from the normalized Parquet file, or normalized on the fly from raw Prowler JSON
+    (one path or a list of paths) when the normalization stage has not run
+    """
+    sources = [source] if isinstance(source, str) else list(source)
+    if len(sources) == 1 and sources[0].endswith(".parquet"):
+        return pq.read_table(sources[0], columns=columns)
+    table = pa.Table.from_batches(list(iter_finding_batches(sources)), schema=FINDINGS_SCHEMA)
+    return table.select(columns) if columns else table
+
+
+def iter_findings(source: Union[str, List[str]] = FINDINGS_FILE, columns: List[str] = None,
+                  batch_rows: int = BATCH_ROWS) -> Iterator[pa.Table]:
+    """load_findings() in batches of at most batch_rows, for consumers working under a memory budget"""
+    sources = [source] if isinstance(source, str) else list(source)
+    if len(sources) == 1 and sources[0].endswith(".parquet"):
+        for batch in pq.ParquetFile(sources[0]).iter_batches(batch_rows, columns=columns):
+            yield pa.Table.from_batches([batch])
+        return
+    for batch in iter_finding_batches(sources, batch_rows):
+        table = pa.Table.from_batches([batch])
+        yield table.select(columns) if columns else table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize Prowler OCSF output into a typed Parquet findings table")
+    parser.add_argument("inputs", nargs="*", default=PROWLER_FILES, help="Prowler JSON/NDJSON files")
+    parser.add_argument("--output", default=FINDINGS_FILE)
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    args = parser.parse_args()
+
+    started = time.time()
+    count = write_findings(args.inputs, args.output, args.batch_rows)
+    print(f"Normalized {count} findings from {len(args.inputs)} files into {args.output} "
+          f"in {time.time() - started:.1f}s")
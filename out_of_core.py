@@ -0,0 +1,72 @@
+import heapq
+import os
+import re
+from typing import List, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+MEMORY_BUDGET_ENV = "GRC_MEMORY_BUDGET"
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text: Union[str, int]) -> int:
+    """'512M', '2GB', '1.5g' or a plain byte count -> bytes"""
+    if isinstance(text, int):
+        return text
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)(?:I?B)?\s*", str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text!r} (expected e.g. 512M or 2GB)")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def memory_budget(value: Union[str, int] = None) -> Optional[int]:
+    """Memory budget in bytes from an explicit value or GRC_MEMORY_BUDGET; None (or 0) means unlimited"""
+    value = value if value is not None else os.environ.get(MEMORY_BUDGET_ENV)
+    budget = parse_size(value) if value not in (None, "") else 0
+    return budget or None
+
+
+def fits_in_memory(path: str, budget: Optional[int]) -> bool:
+    """On-disk size as a proxy for the in-memory frame; always True without a budget"""
+    return budget is None or not os.path.exists(path) or os.path.getsize(path) <= budget
+
+
+class TopK:
+    """
+    The k largest rows of a stream of record batches by one column (descending), ties in arrival order
+    Each batch is cut to its own top k in Arrow, then offered to a bounded min-heap, so at most k records
+    are held however many batches are appended
+    """
+
+    def __init__(self, k: int, sort_column: str = "ale"):
+        self.k = k
+        self.sort_column = sort_column
+        self.rows = 0
+        self.schema: Optional[pa.Schema] = None
+        # (value, -row, record): the heap root is the row that leaves first
+        self._heap: List[Tuple[float, int, dict]] = []
+
+    def append(self, table: pa.Table):
+        """Add a batch; its rows are numbered after everything appended so far (the 'row' column)"""
+        table = table.append_column("row", pa.array(range(self.rows, self.rows + table.num_rows), pa.int64()))
+        self.schema = self.schema or table.schema
+        self.rows += table.num_rows
+        if self.k <= 0 or not table.num_rows:
+            return
+        candidates = table.take(pc.select_k_unstable(
+            table, self.k, [(self.sort_column, "descending"), ("row", "ascending")]))
+        heap = self._heap
+        for record in candidates.to_pylist():
+            entry = (record[self.sort_column], -record["row"], record)
+            if len(heap) < self.k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+    def top_k(self) -> pa.Table:
+        """The k largest rows so far, largest first (ties by arrival order)"""
+        if self.schema is None:
+            return pa.table({})
+        records = [record for _, _, record in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+        return pa.Table.from_pylist(records, schema=self.schema)
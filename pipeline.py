@@ -0,0 +1,340 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import yaml
+
+from json_stream import iter_json_records
+
+PIPELINE_FILE = "pipeline.yaml"
+CACHE_DIR = ".grc_cache"
+STORE_DIR = os.path.join(CACHE_DIR, "store")
+MANIFEST_FILE = os.path.join(CACHE_DIR, "pipeline_manifest.json")
+LOG_DIR = os.path.join(CACHE_DIR, "logs")
+HASH_BLOCK_SIZE = 1 << 20
+TREE_PREFIX = "tree:"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _strip_keys(value: Any, ignore: Set[str]) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_keys(v, ignore) for k, v in value.items() if k not in ignore}
+    if isinstance(value, list):
+        return [_strip_keys(v, ignore) for v in value]
+    return value
+
+
+def normalized_sha256(path: str, ignore_keys: List[str]) -> str:
+    """SHA-256 over the JSON/NDJSON records of a file with run-time fields removed"""
+    ignore = set(ignore_keys)
+    digest = hashlib.sha256()
+    for record in iter_json_records(path):
+        digest.update(json.dumps(_strip_keys(record, ignore), sort_keys=True, default=str).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _walk_files(root: str) -> List[str]:
+    """Relative paths of every file under root, in a stable order"""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            files.append(os.path.relpath(os.path.join(dirpath, filename), root))
+    return files
+
+
+class ContentStore:
+    """
+    Content-addressed artifact store
+    Files are blobs at <root>/<sha[:2]>/<sha>; a directory is a JSON tree {relative path: blob sha},
+    itself stored as a blob and referenced as "tree:<sha>"
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _write_blob(self, digest: str, source: str = None, data: bytes = None):
+        blob = self._blob_path(digest)
+        if os.path.exists(blob):
+            return
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp_blob = f"{blob}.{threading.get_ident()}.tmp"
+        if source is not None:
+            shutil.copyfile(source, tmp_blob)
+        else:
+            with open(tmp_blob, "wb") as f:
+                f.write(data)
+        os.replace(tmp_blob, blob)
+
+    def put(self, path: str) -> str:
+        if os.path.isdir(path):
+            tree = {}
+            for rel_path in _walk_files(path):
+                tree[rel_path] = self.put(os.path.join(path, rel_path))
+            data = json.dumps(tree, sort_keys=True).encode()
+            digest = hashlib.sha256(data).hexdigest()
+            self._write_blob(digest, data=data)
+            return TREE_PREFIX + digest
+        digest = file_sha256(path)
+        self._write_blob(digest, source=path)
+        return digest
+
+    def has(self, ref: str) -> bool:
+        if not ref.startswith(TREE_PREFIX):
+            return os.path.exists(self._blob_path(ref))
+        tree_blob = self._blob_path(ref[len(TREE_PREFIX):])
+        if not os.path.exists(tree_blob):
+            return False
+        with open(tree_blob, "r") as f:
+            return all(self.has(blob) for blob in json.load(f).values())
+
+    def restore(self, ref: str, path: str):
+        if ref.startswith(TREE_PREFIX):
+            with open(self._blob_path(ref[len(TREE_PREFIX):]), "r") as f:
+                tree = json.load(f)
+            for rel_path, blob in tree.items():
+                self.restore(blob, os.path.join(path, rel_path))
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.restore.tmp"
+        shutil.copyfile(self._blob_path(ref), tmp_path)
+        os.replace(tmp_path, path)
+
+
+class Pipeline:
+    """
+    DAG runner over pipeline.yaml
+    Each stage's key is the SHA-256 of its command and the content digests of its inputs. A stage is skipped
+    when its key matches the last successful run and its outputs are intact (or restorable from the store)
+    """
+
+    def __init__(self, config: Dict, store: ContentStore = None, manifest_file: str = MANIFEST_FILE):
+        self.stages: Dict[str, Dict] = config["stages"]
+        self.normalize: Dict[str, List[str]] = config.get("normalize") or {}
+        self.store = store or ContentStore()
+        self.manifest_file = manifest_file
+        self.lock = threading.Lock()
+
+        try:
+            with open(manifest_file, "r") as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: pipeline manifest unreadable, running every stage: {e}")
+            self.manifest = {}
+        self.manifest.setdefault("stages", {})
+        self.manifest.setdefault("files", {})
+
+        self.producers: Dict[str, str] = {}
+        for name, stage in self.stages.items():
+            for output in stage.get("outputs", []):
+                if output in self.producers:
+                    raise ValueError(f"'{output}' is produced by both {self.producers[output]} and {name}")
+                self.producers[output] = name
+        self.dependencies = {
+            name: {self.producers[path] for path in stage.get("inputs", [])
+                   if path in self.producers and self.producers[path] != name}
+            for name, stage in self.stages.items()
+        }
+        self._check_acyclic()
+
+    @classmethod
+    def from_yaml(cls, pipeline_file: str = PIPELINE_FILE, **kwargs) -> "Pipeline":
+        with open(pipeline_file, "r") as f:
+            return cls(yaml.safe_load(f), **kwargs)
+
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+
+        def visit(name, trail):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline cycle: {' -> '.join(trail + [name])}")
+            visiting.add(name)
+            for dependency in self.dependencies[name]:
+                visit(dependency, trail + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name, [])
+
+    def upstream(self, targets: List[str]) -> List[str]:
+        """Targets plus every stage they transitively depend on, in declaration order"""
+        selected, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return [name for name in self.stages if name in selected]
+
+    def digest(self, path: str) -> Optional[str]:
+        """Content digest of a workspace file or directory (None if missing); unchanged files are not re-read"""
+        if os.path.isdir(path):
+            entries = [(rel_path, self.digest(os.path.join(path, rel_path))) for rel_path in _walk_files(path)]
+            return TREE_PREFIX + hashlib.sha256(json.dumps(entries).encode()).hexdigest()
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        signature = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            cached = self.manifest["files"].get(path)
+        if cached and cached[:2] == signature:
+            return cached[2]
+
+        if path in self.normalize:
+            try:
+                digest = "normalized:" + normalized_sha256(path, self.normalize[path])
+            except ValueError:
+                digest = file_sha256(path)
+        else:
+            digest = file_sha256(path)
+        with self.lock:
+            self.manifest["files"][path] = signature + [digest]
+        return digest
+
+    def stage_key(self, name: str) -> Dict[str, Any]:
+        stage = self.stages[name]
+        inputs = {path: self.digest(path) for path in stage.get("inputs", [])}
+        missing = [path for path, digest in inputs.items() if digest is None]
+        key = hashlib.sha256(json.dumps({"command": stage["command"], "inputs": inputs},
+                                        sort_keys=True).encode()).hexdigest()
+        return {"key": key, "missing": missing}
+
+    def _outputs_current(self, name: str, previous: Dict) -> bool:
+        """True if every output matches the last run, restoring missing or altered ones from the store"""
+        outputs = previous.get("outputs", {})
+        stale = [path for path in self.stages[name].get("outputs", [])
+                 if path not in outputs or self.digest(path) != previous["digests"].get(path)]
+        if not all(path in outputs and self.store.has(outputs[path]) for path in stale):
+            return False
+        for path in stale:
+            self.store.restore(outputs[path], path)
+        return True
+
+    def save_manifest(self):
+        with self.lock:
+            data = json.dumps(self.manifest, indent=2)
+        os.makedirs(os.path.dirname(self.manifest_file) or ".", exist_ok=True)
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(data)
+        os.replace(tmp_file, self.manifest_file)
+
+    def run_stage(self, name: str, force: bool = False) -> str:
+        """Run or skip one stage; returns 'skipped', 'restored', 'ran' or 'failed'"""
+        stage = self.stages[name]
+        key = self.stage_key(name)
+        if key["missing"]:
+            print(f"[{name}] missing inputs: {', '.join(key['missing'])}")
+            return "failed"
+
+        with self.lock:
+            previous = self.manifest["stages"].get(name)
+        if not force and not stage.get("volatile") and previous and previous["key"] == key["key"]:
+            restored = any(self.digest(path) != previous["digests"].get(path) for path in stage.get("outputs", []))
+            if self._outputs_current(name, previous):
+                print(f"[{name}] inputs unchanged, {'restored outputs from store' if restored else 'skipped'}")
+                return "restored" if restored else "skipped"
+
+        command = [sys.executable if part == "python" else str(part) for part in stage["command"]]
+        os.makedirs(LOG_DIR, exist_ok=True)
+        log_file = os.path.join(LOG_DIR, f"{name}.log")
+        print(f"[{name}] running: {' '.join(command)}")
+        started = time.time()
+        with open(log_file, "w") as log:
+            returncode = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT).returncode
+
+        missing_outputs = [path for path in stage.get("outputs", []) if not os.path.exists(path)]
+        if returncode != 0 or missing_outputs:
+            with open(log_file, "r") as log:
+                tail = log.readlines()[-20:]
+            reason = f"exit code {returncode}" if returncode else f"missing outputs {missing_outputs}"
+            print(f"[{name}] failed ({reason}), last log lines from {log_file}:\n{''.join(tail)}")
+            return "failed"
+
+        record = {
+            "key": key["key"],
+            "outputs": {path: self.store.put(path) for path in stage.get("outputs", [])},
+            "digests": {path: self.digest(path) for path in stage.get("outputs", [])},
+            "finished_at": datetime.now().isoformat(),
+            "seconds": round(time.time() - started, 2),
+        }
+        with self.lock:
+            self.manifest["stages"][name] = record
+        self.save_manifest()
+        print(f"[{name}] done in {time.time() - started:.1f}s")
+        return "ran"
+
+    def run(self, targets: List[str] = None, workers: int = 4, force: bool = False) -> Dict[str, str]:
+        """Run the selected stages concurrently in dependency order; dependents of a failed stage are blocked"""
+        selected = self.upstream(targets) if targets else list(self.stages)
+        status: Dict[str, str] = {}
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            while len(status) < len(selected):
+                for name in selected:
+                    if name in status or name in running.values():
+                        continue
+                    dependencies = self.dependencies[name] & set(selected)
+                    if any(status.get(dep) in ("failed", "blocked") for dep in dependencies):
+                        status[name] = "blocked"
+                        print(f"[{name}] blocked by failed upstream stage")
+                    elif all(dep in status for dep in dependencies):
+                        running[executor.submit(self.run_stage, name, force)] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as e:
+                        print(f"[{name}] failed: {e}")
+                        status[name] = "failed"
+
+        self.save_manifest()
+        summary = ", ".join(f"{name}: {status[name]}" for name in selected)
+        print(f"Pipeline finished in {time.time() - started:.1f}s ({summary})")
+        return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the GRC pipeline, skipping stages whose inputs are unchanged")
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date (default: all)")
+    parser.add_argument("--pipeline", default=PIPELINE_FILE)
+    parser.add_argument("--workers", type=int, default=4, help="stages run concurrently")
+    parser.add_argument("--force", action="store_true", help="run the selected stages even if unchanged")
+    args = parser.parse_args()
+
+    results = Pipeline.from_yaml(args.pipeline).run(args.targets, args.workers, args.force)
+    sys.exit(1 if any(result in ("failed", "blocked") for result in results.values()) else 0)
@@ -8,7 +8,8 @@ default allow = false
 deny[msg] {
     resource := input.resource.aws_s3_bucket_server_side_encryption_configuration[_]
     rule := resource.rule[_]
-    not rule.apply_server_side_encryption_by_default.sse_algorithm
+    # Nested blocks are lists in Terraform JSON (apply_server_side_encryption_by_default = [{...}])
+    not rule.apply_server_side_encryption_by_default[_].sse_algorithm
     msg := sprintf("CRITICAL: S3 Bucket encryption missing for resource '%v'", [resource.bucket])
 }
 
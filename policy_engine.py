@@ -0,0 +1,392 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from typing import Dict, List, Any, Iterator, Tuple
+
+from generate_terraform_code import OUTPUT_DIR as EXTRACTED_DIR, MANIFEST_FILE
+from hcl_parser import HCLParseError, parse_hcl, to_terraform_json
+from verdict_cache import POLICY_FILE, VerdictCache, policy_bundle_hash
+
+VERDICTS_FILE = "policy_verdicts.json"
+
+PATH = r"[A-Za-z_]\w*(?:\.[A-Za-z_]\w*|\[_\])*"
+LITERAL = r'"(?:[^"\\]|\\.)*"|true|false|null|-?\d+(?:\.\d+)?'
+STATEMENT_PATTERNS = [
+    ("iterate", re.compile(rf"^(\w+)\s*:=\s*({PATH})\[_\]$")),
+    ("message", re.compile(r'^(\w+)\s*:=\s*sprintf\(("(?:[^"\\]|\\.)*")\s*,\s*\[([^\]]*)\]\)$')),
+    ("not_compare", re.compile(rf"^not\s+({PATH})\s*(==|!=)\s*({LITERAL})$")),
+    ("not", re.compile(rf"^not\s+({PATH})$")),
+    ("compare", re.compile(rf"^({PATH})\s*(==|!=)\s*({LITERAL})$")),
+    ("truthy", re.compile(rf"^({PATH})$")),
+]
+RULE_HEAD = re.compile(r"^(\w+)(\[(\w+)\])?\s*(?:if\s*)?\{$")
+
+
+class PolicyLoadError(ValueError):
+    pass
+
+
+def _strip_comment(line: str) -> str:
+    in_string = False
+    for i, ch in enumerate(line):
+        if ch == '"' and (i == 0 or line[i - 1] != "\\"):
+            in_string = not in_string
+        elif ch == "#" and not in_string:
+            return line[:i]
+    return line
+
+
+def _rego_equal(a: Any, b: Any) -> bool:
+    """Rego equality: booleans never equal numbers, ints equal matching floats"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    return a == b
+
+
+def _rego_format(value: Any) -> str:
+    """sprintf %v rendering of a JSON value the way OPA prints it"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), sort_keys=True)
+    return str(value)
+
+
+class DenyRule:
+    """One compiled `deny[msg] { ... }` body: a resource type plus a chain of statements"""
+
+    def __init__(self, statements: List[Tuple], source: str):
+        first = statements[0] if statements else None
+        if not first or first[0] != "iterate" or not first[2].startswith("input.resource."):
+            raise PolicyLoadError(f"deny rule must start with `x := input.resource.<type>[_]`:\n{source}")
+        if statements[-1][0] != "message":
+            raise PolicyLoadError(f"deny rule must end with `msg := sprintf(...)`:\n{source}")
+        self.resource_var = first[1]
+        self.resource_type = first[2].split(".", 2)[2]
+        self.statements = statements[1:]
+        self.source = source
+
+    def _resolve(self, bindings: Dict[str, Any], path: str) -> Iterator[Any]:
+        """Every value a path can take; a `[_]` segment fans out over list items / object values like Rego"""
+        head, *keys = re.findall(r"\[_\]|\w+", path)
+        if head not in bindings:
+            return
+        values = [bindings[head]]
+        for key in keys:
+            if key == "[_]":
+                values = [v for value in values if isinstance(value, (dict, list))
+                          for v in (value.values() if isinstance(value, dict) else value)]
+            else:
+                values = [value[key] for value in values if isinstance(value, dict) and key in value]
+        yield from values
+
+    def _holds(self, kind: str, bindings: Dict[str, Any], args: List[Any]) -> bool:
+        """True if some binding of the path's `[_]` wildcards satisfies the expression"""
+        for value in self._resolve(bindings, args[0]):
+            if kind == "truthy" and value is not False:
+                return True
+            if kind == "compare":
+                equal = _rego_equal(value, args[2])
+                if equal == (args[1] == "=="):
+                    return True
+        return False
+
+    def _solve(self, bindings: Dict[str, Any], idx: int) -> Iterator[str]:
+        if idx == len(self.statements):
+            return
+        kind, *args = self.statements[idx]
+
+        if kind == "iterate":
+            for collection in self._resolve(bindings, args[1]):
+                if isinstance(collection, dict):
+                    collection = collection.values()
+                elif not isinstance(collection, list):
+                    continue
+                for item in collection:
+                    yield from self._solve({**bindings, args[0]: item}, idx + 1)
+            return
+
+        if kind == "message":
+            for values in itertools.product(*(list(self._resolve(bindings, a)) for a in args[2])):
+                yield re.sub(r"%[a-z]", lambda _m, it=iter(values): _rego_format(next(it)), args[1])
+            return
+
+        if kind in ("truthy", "compare"):
+            ok = self._holds(kind, bindings, args)
+        else:  # not / not_compare
+            ok = not self._holds("truthy" if kind == "not" else "compare", bindings, args)
+        if ok:
+            yield from self._solve(bindings, idx + 1)
+
+    def evaluate(self, resource: Dict[str, Any]) -> Iterator[str]:
+        yield from self._solve({self.resource_var: resource}, 0)
+
+
+class PolicyEngine:
+    """
+    Native evaluator for the deny rules in security_policy.rego
+    Supports the Rego subset the policy uses; anything else fails loudly at load time
+    """
+
+    def __init__(self, package: str, rules: List[DenyRule], policy_hash: str):
+        self.package = package
+        self.rules = rules
+        self.policy_hash = policy_hash
+        self.rules_by_type: Dict[str, List[DenyRule]] = {}
+        for rule in rules:
+            self.rules_by_type.setdefault(rule.resource_type, []).append(rule)
+
+    @classmethod
+    def from_rego(cls, filepath: str = POLICY_FILE) -> "PolicyEngine":
+        with open(filepath, 'r') as f:
+            source = f.read()
+
+        package, rules = None, []
+        lines = [_strip_comment(l).strip() for l in source.splitlines()]
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            i += 1
+            if not line or line.startswith("import "):
+                continue
+            if line.startswith("package "):
+                package = line.split(None, 1)[1]
+                continue
+            if line.startswith("default "):
+                continue
+            head = RULE_HEAD.match(line)
+            if not head:
+                raise PolicyLoadError(f"unsupported Rego statement: {line}")
+
+            body = []
+            while i < len(lines) and lines[i] != "}":
+                if lines[i]:
+                    body.append(lines[i])
+                i += 1
+            i += 1
+            name, var = head.group(1), head.group(3)
+
+            if name == "allow" and body == ["count(deny) == 0"]:
+                continue
+            if name != "deny" or var is None:
+                raise PolicyLoadError(f"unsupported Rego rule: {line}")
+            rules.append(DenyRule([cls._compile(s, var) for s in body], "\n".join(body)))
+
+        if not rules:
+            raise PolicyLoadError(f"no deny rules found in {filepath}")
+        return cls(package, rules, policy_bundle_hash(filepath))
+
+    @staticmethod
+    def _compile(statement: str, msg_var: str) -> Tuple:
+        for kind, pattern in STATEMENT_PATTERNS:
+            match = pattern.match(statement)
+            if not match:
+                continue
+            if kind == "iterate":
+                return kind, match.group(1), match.group(2)
+            if kind == "message":
+                if match.group(1) != msg_var:
+                    break
+                arg_list = [a.strip() for a in match.group(3).split(",") if a.strip()]
+                return kind, match.group(1), json.loads(match.group(2)), arg_list
+            if kind in ("compare", "not_compare"):
+                return kind, match.group(1), match.group(2), json.loads(match.group(3))
+            return kind, match.group(1)
+        raise PolicyLoadError(f"unsupported Rego expression in deny rule: {statement}")
+
+    def evaluate(self, doc: Dict[str, Any]) -> List[str]:
+        """Deny messages for one Terraform JSON input document (same result set as `opa eval ... deny`)"""
+        return self.evaluate_many({"input": doc})["input"]
+
+    def evaluate_many(self, docs: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+        """
+        Evaluate many input documents in one pass
+        Resources are indexed by type first, so each rule only visits resources it can match
+        """
+        index: Dict[str, List[Tuple[str, Any]]] = {}
+        for doc_id, doc in docs.items():
+            resources = doc.get("resource", {}) if isinstance(doc, dict) else {}
+            for r_type in self.rules_by_type.keys() & resources.keys():
+                instances = resources[r_type]
+                instances = instances.values() if isinstance(instances, dict) else instances
+                index.setdefault(r_type, []).extend((doc_id, r) for r in instances)
+
+        results = {doc_id: set() for doc_id in docs}
+        for r_type, entries in index.items():
+            for rule in self.rules_by_type[r_type]:
+                for doc_id, resource in entries:
+                    results[doc_id].update(rule.evaluate(resource))
+        return {doc_id: sorted(msgs) for doc_id, msgs in results.items()}
+
+
+def load_remediation_docs(extracted_dir: str = EXTRACTED_DIR,
+                          digests: List[str] = None) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """Parse extracted blocks (all, or only `digests`) into Terraform JSON inputs; returns (docs, parse_errors)"""
+    with open(os.path.join(extracted_dir, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+
+    docs, errors = {}, {}
+    for digest in manifest["blocks"] if digests is None else digests:
+        entry = manifest["blocks"][digest]
+        try:
+            with open(os.path.join(extracted_dir, entry["file"]), 'r') as f:
+                docs[digest] = to_terraform_json(parse_hcl(f.read()))
+        except (OSError, HCLParseError) as e:
+            errors[digest] = str(e)
+    return docs, errors
+
+
+def validate_remediations(engine: PolicyEngine, extracted_dir: str = EXTRACTED_DIR,
+                          cache: VerdictCache = None) -> Tuple[Dict[str, List[str]], Dict[str, Dict], Dict[str, str]]:
+    """
+    Verdicts for every extracted block; blocks with a cached verdict for this policy are not re-parsed
+    Returns (results, freshly evaluated docs, parse_errors)
+    """
+    with open(os.path.join(extracted_dir, MANIFEST_FILE), 'r') as f:
+        digests = list(json.load(f)["blocks"])
+
+    results = {}
+    if cache is not None:
+        for digest in digests:
+            verdict = cache.get(digest)
+            if verdict is not None:
+                results[digest] = verdict
+
+    docs, errors = load_remediation_docs(extracted_dir, [d for d in digests if d not in results])
+    fresh = engine.evaluate_many(docs)
+    if cache is not None:
+        for digest, msgs in fresh.items():
+            cache.put(digest, msgs)
+        cache.save()
+    results.update(fresh)
+    return results, docs, errors
+
+
+def document_digest(doc: Dict[str, Any]) -> str:
+    """Cache key of a Terraform JSON document: SHA-256 of its canonical JSON (prefixed apart from block hashes)"""
+    return "json:" + hashlib.sha256(json.dumps(doc, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def validate_documents(engine: PolicyEngine, paths: List[str],
+                       cache: VerdictCache = None) -> Tuple[Dict[str, List[str]], Dict[str, Dict]]:
+    """
+    Verdicts for Terraform JSON documents (e.g. consolidated_remediations/plan_input.json), keyed by path
+    and cached by document_digest(). Returns (results, freshly evaluated docs)
+    """
+    results, docs, digests = {}, {}, {}
+    for path in paths:
+        with open(path, 'r') as f:
+            doc = json.load(f)
+        digests[path] = document_digest(doc)
+        verdict = cache.get(digests[path]) if cache is not None else None
+        if verdict is None:
+            docs[path] = doc
+        else:
+            results[path] = verdict
+
+    fresh = engine.evaluate_many(docs)
+    if cache is not None:
+        for path, msgs in fresh.items():
+            cache.put(digests[path], msgs)
+        cache.save()
+    results.update(fresh)
+    return results, docs
+
+
+def compare_with_opa(engine: PolicyEngine, docs: Dict[str, Dict], results: Dict[str, List[str]],
+                     policy_file: str = POLICY_FILE) -> List[Dict[str, Any]]:
+    """Re-evaluate each document with the opa binary and list any result that differs"""
+    opa = shutil.which("opa")
+    if not opa:
+        print("Warning: opa binary not found, skipping OPA cross-check")
+        return []
+
+    mismatches = []
+    query = f"data.{engine.package}.deny"
+    with tempfile.TemporaryDirectory() as tmp:
+        for doc_id, doc in docs.items():
+            input_path = os.path.join(tmp, "input.json")
+            with open(input_path, "w") as f:
+                json.dump(doc, f)
+            out = subprocess.run([opa, "eval", "--format", "json", "-d", policy_file, "-i", input_path, query],
+                                 capture_output=True, text=True, check=True)
+            expressions = json.loads(out.stdout).get("result", [{}])[0].get("expressions", [{}])
+            opa_result = sorted(expressions[0].get("value", []))
+            if opa_result != results[doc_id]:
+                mismatches.append({"input": doc_id, "opa": opa_result, "native": results[doc_id]})
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate Terraform remediations against security_policy.rego")
+    parser.add_argument("-d", "--policy", default=POLICY_FILE)
+    parser.add_argument("-i", "--input", nargs="*",
+                        help="Terraform JSON documents checked as well as the extracted remediations (e.g. plan_input.json)")
+    parser.add_argument("--extracted-dir", default=EXTRACTED_DIR)
+    parser.add_argument("--output", default=VERDICTS_FILE)
+    parser.add_argument("--compare-opa", action="store_true", help="cross-check every verdict against `opa eval`")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the persistent verdict cache")
+    parser.add_argument("--fail-on-deny", action="store_true")
+    args = parser.parse_args()
+
+    engine = PolicyEngine.from_rego(args.policy)
+    print(f"Loaded {len(engine.rules)} deny rules from {args.policy} "
+          f"covering {len(engine.rules_by_type)} resource types")
+
+    # Every extracted block is checked on its own (including blocks dropped as consolidation conflicts),
+    # then the -i documents; both are served from the verdict cache when unchanged
+    cache = None if args.no_cache else VerdictCache(engine.policy_hash)
+    results, docs, errors = {}, {}, {}
+    if not args.input or os.path.exists(os.path.join(args.extracted_dir, MANIFEST_FILE)):
+        results, docs, errors = validate_remediations(engine, args.extracted_dir, cache)
+    if args.input:
+        input_results, input_docs = validate_documents(engine, args.input, cache)
+        results.update(input_results)
+        docs.update(input_docs)
+    if cache is not None:
+        print(f"Verdict cache: {cache.hits} hits, {cache.misses} evaluated")
+
+    denied = {doc_id: msgs for doc_id, msgs in results.items() if msgs}
+
+    for doc_id, msgs in denied.items():
+        print(f"[{doc_id[:16]}]")
+        for msg in msgs:
+            print(f"  {msg}")
+
+    verdicts = {
+        "policy_hash": engine.policy_hash,
+        "summary": {
+            "evaluated": len(results),
+            "denied": len(denied),
+            "allowed": len(results) - len(denied),
+            "parse_errors": len(errors),
+        },
+        "results": {doc_id: {"allow": not msgs, "deny": msgs} for doc_id, msgs in results.items()},
+        "parse_errors": errors,
+    }
+
+    if args.compare_opa:
+        mismatches = compare_with_opa(engine, docs, results, args.policy)
+        verdicts["opa_mismatches"] = mismatches
+        print(f"OPA cross-check: {len(mismatches)} mismatches")
+
+    with open(args.output, "w") as f:
+        json.dump(verdicts, f, indent=2)
+
+    summary = verdicts["summary"]
+    print(f"Policy check: {summary['evaluated']} evaluated, {summary['denied']} denied, "
+          f"{summary['parse_errors']} unparseable. Verdicts saved to {args.output}")
+    if args.fail_on_deny and (denied or (args.compare_opa and verdicts["opa_mismatches"])):
+        raise SystemExit(1)
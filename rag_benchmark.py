@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from math import sqrt
+from typing import Dict, List, Any
+
+from llama_index.core.embeddings import BaseEmbedding
+
+from RAG import COMPLIANCE_DOCS, load_compliance_docs, build_compliance_index
+from extract_learn import build_grc_prompt, summarize_finding
+from normalize_findings import normalize_finding
+
+BACKENDS = ["simple", "chroma"]
+QUERY_MODES = ["prompt", "finding"]
+TOKEN_REGEX = re.compile(r"[a-z0-9]+(?:[.-][a-z0-9]+)*")
+
+
+class HashingEmbedding(BaseEmbedding):
+    """
+    Offline feature-hashing embedder (word unigrams + bigrams)
+    Deterministic and network-free so benchmark runs are reproducible in CI
+    """
+    dim: int = 1024
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = TOKEN_REGEX.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vec = [0.0] * self.dim
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vec[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+
+def build_embedder(name: str):
+    if name == "hashing":
+        return HashingEmbedding()
+    if name == "openai":
+        from llama_index.embeddings.openai import OpenAIEmbedding
+        return OpenAIEmbedding(api_key=os.getenv("OPENAI_API_KEY"))
+    raise ValueError(f"Unknown embedder: {name}")
+
+
+def load_labels(filepath: str, query_mode: str = "prompt") -> List[Dict[str, Any]]:
+    """
+    Load labelled findings
+    Format: [{"id": ..., "finding": {Prowler OCSF finding}, "expected_controls": ["SC-28", ...]}]
+    query_mode "prompt" embeds the full extract_learn prompt (what production retrieves with),
+    "finding" embeds only the finding summary
+    """
+    with open(filepath, 'r') as f:
+        labels = json.load(f)
+    for label in labels:
+        finding_summary = summarize_finding(normalize_finding(label["finding"]))
+        if query_mode == "prompt":
+            label["query"] = build_grc_prompt(finding_summary)
+        else:
+            label["query"] = json.dumps(finding_summary, indent=2)
+        label["patterns"] = [
+            re.compile(rf"(?<![A-Za-z0-9]){re.escape(control)}(?![0-9])")
+            for control in label["expected_controls"]
+        ]
+    return labels
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile over an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def build_backend_index(backend: str, docs, chunk_size: int, chunk_overlap: int,
+                        embed_model, workdir: str):
+    """Build one index variant and return (index, build_seconds, index_bytes, chunk_count)"""
+    if backend == "chroma":
+        # Imported here so the offline "simple" backend runs without chromadb installed
+        import chromadb
+        from llama_index.vector_stores.chroma import ChromaVectorStore
+
+        client = chromadb.PersistentClient(path=workdir)
+        collection = client.create_collection("compliance_bench")
+        vector_store = ChromaVectorStore(chroma_collection=collection)
+    elif backend == "simple":
+        vector_store = None
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    start = time.perf_counter()
+    index = build_compliance_index(docs, vector_store=vector_store, chunk_size=chunk_size,
+                                   chunk_overlap=chunk_overlap, embed_model=embed_model)
+    build_seconds = time.perf_counter() - start
+
+    if backend == "chroma":
+        chunk_count = collection.count()
+    else:
+        index.storage_context.persist(persist_dir=workdir)
+        chunk_count = len(index.index_struct.nodes_dict)
+
+    return index, build_seconds, directory_size(workdir), chunk_count
+
+
+def score_retrieval(index, labels: List[Dict], top_k: int) -> Dict[str, float]:
+    """Run every labelled query at top_k; report recall@k, MRR and latency percentiles"""
+    retriever = index.as_retriever(similarity_top_k=top_k)
+    retriever.retrieve(labels[0]["query"])  # warm-up
+
+    latencies, recalls, reciprocal_ranks = [], [], []
+    for label in labels:
+        start = time.perf_counter()
+        nodes = retriever.retrieve(label["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        texts = [n.node.get_content() for n in nodes[:top_k]]
+        found = [any(p.search(t) for t in texts) for p in label["patterns"]]
+        recalls.append(sum(found) / len(found))
+
+        first_hit = next(
+            (rank for rank, t in enumerate(texts, 1) if any(p.search(t) for p in label["patterns"])),
+            None
+        )
+        reciprocal_ranks.append(1 / first_hit if first_hit else 0.0)
+
+    latencies.sort()
+    return {
+        "recall_at_k": round(sum(recalls) / len(recalls), 4),
+        "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def run_benchmark(labels_file: str, doc_paths: List[str], chunk_sizes: List[int],
+                  chunk_overlaps: List[int], top_ks: List[int], backends: List[str],
+                  embedder: str = "hashing", query_mode: str = "prompt") -> List[Dict[str, Any]]:
+    labels = load_labels(labels_file, query_mode)
+    docs = load_compliance_docs(doc_paths)
+    if not docs or not labels:
+        print("Nothing to benchmark: no documents or no labelled findings loaded")
+        return []
+
+    embed_model = build_embedder(embedder)
+    results = []
+
+    for backend in backends:
+        for chunk_size in chunk_sizes:
+            for chunk_overlap in chunk_overlaps:
+                if chunk_overlap >= chunk_size:
+                    continue
+                workdir = tempfile.mkdtemp(prefix="rag_bench_")
+                try:
+                    index, build_seconds, index_bytes, chunk_count = build_backend_index(
+                        backend, docs, chunk_size, chunk_overlap, embed_model, workdir
+                    )
+                    for top_k in top_ks:
+                        metrics = score_retrieval(index, labels, top_k)
+                        row = {
+                            "backend": backend,
+                            "chunk_size": chunk_size,
+                            "chunk_overlap": chunk_overlap,
+                            "top_k": top_k,
+                            **metrics,
+                            "chunks": chunk_count,
+                            "index_bytes": index_bytes,
+                            "build_seconds": round(build_seconds, 3),
+                        }
+                        results.append(row)
+                        print(f"   → {backend:<6} size={chunk_size:<5} overlap={chunk_overlap:<4} k={top_k:<3} "
+                              f"recall@k={row['recall_at_k']:.3f} MRR={row['mrr']:.3f} "
+                              f"p50={row['p50_ms']:.2f}ms p99={row['p99_ms']:.2f}ms "
+                              f"index={index_bytes / 1_048_576:.1f}MB build={row['build_seconds']:.1f}s")
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrieval quality/latency benchmark for the compliance RAG")
+    parser.add_argument("--labels", default="rag_benchmark_labels.json")
+    parser.add_argument("--docs", nargs="+", default=COMPLIANCE_DOCS)
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[500, 1000, 2000])
+    parser.add_argument("--chunk-overlaps", type=_int_list, default=[50, 100, 200])
+    parser.add_argument("--top-k", type=_int_list, default=[1, 3, 5, 10])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--embedder", choices=["hashing", "openai"], default="hashing")
+    parser.add_argument("--query-mode", choices=QUERY_MODES, default="prompt")
+    parser.add_argument("--output", default="rag_benchmark_results.json")
+    args = parser.parse_args()
+
+    print("RAG BENCHMARK - Compliance Knowledge Base Retrieval")
+    results = run_benchmark(args.labels, args.docs, args.chunk_sizes, args.chunk_overlaps,
+                            args.top_k, args.backends, args.embedder, args.query_mode)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results saved: {args.output} ({len(results)} configurations)")
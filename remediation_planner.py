@@ -0,0 +1,373 @@
+import argparse
+import json
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from json_stream import iter_json_records
+from risk_drift import run_snapshots
+from risk_engine import CONTROL_EFFECTIVENESS, ale_cents
+
+REPORT_FILE = "risk_quantification_report.json"
+OPTIONS_FILE = "remediation_options.json"
+WHATIF_FILE = "remediation_whatif.json"
+DEFAULT_BUDGET_HOURS = 160
+DEFAULT_GROUP_BY = ["finding_code"]
+# Engineering hours are rounded up to this step for the knapsack
+HOUR_STEP = 0.25
+# Exact knapsack up to this many (option x capacity step) cells, greedy beyond
+KNAPSACK_MAX_CELLS = 20_000_000
+FRONTIER_POINTS = 40
+SEVERITIES = ["Critical", "High", "Medium", "Low"]
+
+# What a fix puts in place, matched on the Prowler check: exact "codes" first, then "match" substrings
+# (first match wins). The fixed finding's control effectiveness rises to that control's
+# CONTROL_EFFECTIVENESS; hours = setup + per affected resource
+REMEDIATION_PROFILES = {
+    # Exact codes: "root" also appears in MFA checks such as iam_root_hardware_mfa_enabled
+    "root_account_restricted": {"codes": ["iam_no_root_access_key", "iam_avoid_root_usage"], "match": [],
+                                "setup_hours": 2, "hours_per_resource": 1.0},
+    "mfa_enabled": {"match": ["mfa"], "setup_hours": 2, "hours_per_resource": 0.5},
+    "encryption_enabled": {"match": ["encrypt", "kms"], "setup_hours": 4, "hours_per_resource": 1.0},
+    "security_group_restricted": {"match": ["securitygroup", "exposed_to_internet", "public_access"],
+                                  "setup_hours": 4, "hours_per_resource": 0.5},
+    "iam_policy_least_privilege": {"match": ["privilege", "administrator", "policy"],
+                                   "setup_hours": 8, "hours_per_resource": 2.0},
+    "backup_enabled": {"match": ["backup"], "setup_hours": 4, "hours_per_resource": 0.5},
+    "logging_enabled": {"match": ["logging", "trail"], "setup_hours": 2, "hours_per_resource": 0.25},
+}
+# Checks without a mapped control: the fix makes the check pass, credited at this effectiveness
+CHECK_REMEDIATED = "check_remediated"
+CHECK_REMEDIATED_EFFECTIVENESS = 0.80
+CHECK_REMEDIATED_PROFILE = {"match": [], "setup_hours": 4, "hours_per_resource": 1.0}
+
+# Register columns a remediation's ALE reduction is computed from (plus the group_by scope)
+SCORING_COLUMNS = ["finding_code", "asset_uid", "severity", "threat_frequency", "loss_magnitude",
+                   "control_effectiveness", "ale"]
+PLANNER_COLUMNS = ["run_id", "account_id", "region", "service"] + SCORING_COLUMNS
+
+
+def remediation_profile(finding_code: str) -> Tuple[str, float, Dict[str, Any]]:
+    """(control, effectiveness once fixed, profile) for one Prowler check"""
+    code = (finding_code or "").lower()
+    for control, profile in REMEDIATION_PROFILES.items():
+        if code in profile.get("codes", ()):
+            return control, CONTROL_EFFECTIVENESS[control], profile
+    for control, profile in REMEDIATION_PROFILES.items():
+        if any(token in code for token in profile["match"]):
+            return control, CONTROL_EFFECTIVENESS[control], profile
+    return CHECK_REMEDIATED, CHECK_REMEDIATED_EFFECTIVENESS, CHECK_REMEDIATED_PROFILE
+
+
+def load_planner_input(source: str) -> pd.DataFrame:
+    """PLANNER_COLUMNS of one run: a risk_runs/ Parquet snapshot or a JSON report"""
+    if source.endswith(".parquet"):
+        parquet = pq.ParquetFile(source)
+        columns = [name for name in PLANNER_COLUMNS if name in parquet.schema_arrow.names]
+        return parquet.read(columns=columns).to_pandas()
+    return pd.DataFrame([{name: record.get(name) for name in PLANNER_COLUMNS}
+                         for record in iter_json_records(source)], columns=PLANNER_COLUMNS)
+
+
+class RemediationPlanner:
+    """
+    What-if planning over per-remediation ALE contributions
+    A remediation fixes one Prowler check (per group_by scope, e.g. per account) on every resource it fails on.
+    Each finding belongs to exactly one remediation, so its ALE reduction (exposure x control-effectiveness
+    uplift, in integer cents) is precomputed once and a fix set's totals are plain sums over the options it
+    picks: no rescoring of the register. plan() picks options under an hours budget with an exact 0/1
+    knapsack (greedy by ALE reduction per hour when the table would exceed KNAPSACK_MAX_CELLS)
+    """
+
+    def __init__(self, options: pd.DataFrame, total_ale_cents: int, group_by: List[str], run_id: str = None):
+        self.options = options.reset_index(drop=True)
+        self.total_ale_cents = int(total_ale_cents)
+        self.group_by = group_by
+        self.run_id = run_id
+        self.reduction_cents = self.options["reduction_cents"].to_numpy(dtype=np.int64)
+        self.hours = self.options["hours"].to_numpy(dtype=np.float64)
+        self.severity_cents = self.options[[f"reduction_cents:{s}" for s in SEVERITIES]].to_numpy(dtype=np.int64)
+        self._ids = {label: i for i, label in enumerate(self.options["remediation"])}
+        self._greedy_order = None
+
+    def __len__(self) -> int:
+        return len(self.options)
+
+    @classmethod
+    def from_register(cls, df: pd.DataFrame, group_by: List[str] = None, hours: Dict[str, float] = None,
+                      run_id: str = None) -> "RemediationPlanner":
+        """
+        Precompute remediation options from register records
+        hours overrides the profile estimate per remediation label ("check" or "check @ account" ...)
+        """
+        group_by = list(group_by or DEFAULT_GROUP_BY)
+        if "finding_code" not in group_by:
+            raise ValueError("group_by must include finding_code: a remediation fixes one check")
+        missing = [c for c in dict.fromkeys(group_by + SCORING_COLUMNS) if c not in df.columns]
+        if missing:
+            raise ValueError(f"Register lacks {', '.join(missing)}; re-run risk_engine.py")
+        if run_id is None and "run_id" in df and not df.empty:
+            run_id = df["run_id"].iloc[-1]
+
+        keys = df[group_by].astype(object).where(df[group_by].notna(), "unknown").astype(str)
+        codes = keys["finding_code"]
+        profiles = {code: remediation_profile(code) for code in pd.unique(codes)}
+        target = codes.map({code: p[1] for code, p in profiles.items()}).to_numpy(dtype=np.float64)
+
+        effectiveness = df["control_effectiveness"].to_numpy(dtype=np.float64)
+        exposure = df["loss_magnitude"].to_numpy(dtype=np.float64) * df["threat_frequency"].to_numpy(dtype=np.float64)
+        uplift = np.clip(target - effectiveness, 0, None)
+        current = ale_cents(df["ale"].astype(float).fillna(0))
+        remediated = ale_cents(pd.Series(np.clip(exposure * (1 - np.maximum(effectiveness, target)), 0, None)).round(2))
+        reduction = np.where(uplift > 0, np.clip(current.to_numpy() - remediated.to_numpy(), 0, None), 0)
+
+        group = keys.groupby(group_by, sort=False).ngroup().to_numpy()
+        frame = pd.DataFrame({"group": group, "asset_uid": df["asset_uid"].to_numpy(), "ale_cents": current.to_numpy(),
+                              "reduction_cents": reduction, "uplift": uplift,
+                              "severity": df["severity"].to_numpy()})
+        options = keys.groupby(group_by, sort=False).size().reset_index(name="findings")
+        grouped = frame.groupby("group", sort=True)
+        options["resources"] = grouped["asset_uid"].nunique().to_numpy()
+        options["ale_cents"] = grouped["ale_cents"].sum().to_numpy()
+        options["reduction_cents"] = grouped["reduction_cents"].sum().to_numpy()
+        options["uplift"] = grouped["uplift"].mean().round(4).to_numpy()
+        by_severity = frame.groupby(["group", "severity"])["reduction_cents"].sum().unstack(fill_value=0)
+        by_severity = by_severity.reindex(index=range(len(options)), columns=SEVERITIES, fill_value=0)
+        for severity in SEVERITIES:
+            options[f"reduction_cents:{severity}"] = by_severity[severity].to_numpy(dtype=np.int64)
+
+        options.insert(0, "remediation", options[group_by].agg(" @ ".join, axis=1))
+        options["control"] = options["finding_code"].map({code: p[0] for code, p in profiles.items()})
+        setup = options["finding_code"].map({code: p[2]["setup_hours"] for code, p in profiles.items()})
+        per_resource = options["finding_code"].map({code: p[2]["hours_per_resource"] for code, p in profiles.items()})
+        options["hours"] = (setup + per_resource * options["resources"]).astype(float)
+        if hours:
+            options["hours"] = options["remediation"].map(hours).fillna(options["hours"]).astype(float)
+        return cls(options, int(current.sum()), group_by, run_id)
+
+    @classmethod
+    def from_run(cls, source: str, group_by: List[str] = None, hours: Dict[str, float] = None) -> "RemediationPlanner":
+        return cls.from_register(load_planner_input(source), group_by, hours)
+
+    def save(self, path: str = OPTIONS_FILE):
+        with open(path, "w") as f:
+            json.dump({
+                "run_id": self.run_id,
+                "group_by": self.group_by,
+                "total_ale_cents": self.total_ale_cents,
+                "generated_at": datetime.now().isoformat(),
+                "options": self.options.to_dict(orient="list"),
+            }, f, default=str)
+
+    @classmethod
+    def load(cls, path: str = OPTIONS_FILE) -> "RemediationPlanner":
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(pd.DataFrame(data["options"]), data["total_ale_cents"], data["group_by"], data.get("run_id"))
+
+    def selection(self, fixes: Union[Iterable[str], Iterable[int], np.ndarray]) -> np.ndarray:
+        """Boolean option mask from remediation labels, option positions or a mask"""
+        fixes = np.asarray(list(fixes) if not isinstance(fixes, np.ndarray) else fixes)
+        if fixes.dtype == bool:
+            return fixes
+        mask = np.zeros(len(self), dtype=bool)
+        if fixes.size:
+            unknown = [f for f in fixes.tolist() if isinstance(f, str) and f not in self._ids]
+            if unknown:
+                raise KeyError(f"Unknown remediations: {', '.join(unknown[:5])}")
+            mask[[self._ids[f] if isinstance(f, str) else int(f) for f in fixes.tolist()]] = True
+        return mask
+
+    def evaluate(self, fixes) -> Dict[str, Any]:
+        """Totals if this fix set were applied"""
+        mask = self.selection(fixes)
+        reduction = int(self.reduction_cents[mask].sum())
+        return {
+            "fixes": int(mask.sum()),
+            "hours": round(float(self.hours[mask].sum()), 2),
+            "findings": int(self.options["findings"].to_numpy()[mask].sum()),
+            "ale_before": self.total_ale_cents / 100,
+            "ale_reduction": reduction / 100,
+            "ale_after": (self.total_ale_cents - reduction) / 100,
+            "reduction_by_severity": dict(zip(SEVERITIES, (self.severity_cents[mask].sum(axis=0) / 100).tolist())),
+        }
+
+    def evaluate_many(self, masks: np.ndarray) -> pd.DataFrame:
+        """One row per scenario (a row of a scenarios x options boolean matrix), in one matrix product"""
+        masks = np.asarray(masks, dtype=bool)
+        reduction = masks.astype(np.int64) @ self.reduction_cents
+        return pd.DataFrame({
+            "fixes": masks.sum(axis=1),
+            "hours": masks @ self.hours,
+            "ale_reduction": reduction / 100,
+            "ale_after": (self.total_ale_cents - reduction) / 100,
+        })
+
+    def _weights(self) -> np.ndarray:
+        return np.ceil(np.round(self.hours / HOUR_STEP, 6)).astype(np.int64)
+
+    def greedy(self, budget_hours: float) -> np.ndarray:
+        """Best ALE reduction per hour first; the single best affordable option instead if that beats it"""
+        mask = np.zeros(len(self), dtype=bool)
+        affordable = (self.reduction_cents > 0) & (self.hours <= budget_hours)
+        if not affordable.any():
+            return mask
+        if self._greedy_order is None:
+            ratio = self.reduction_cents / np.maximum(self.hours, 1e-9)
+            self._greedy_order = np.lexsort((np.arange(len(self)), -ratio))
+        order = self._greedy_order[affordable[self._greedy_order]]
+        # The prefix that fits is taken in one step; only the options after it are tried one by one
+        spent_prefix = np.cumsum(self.hours[order])
+        stop = int(np.searchsorted(spent_prefix, budget_hours, side="right"))
+        mask[order[:stop]] = True
+        spent = float(spent_prefix[stop - 1]) if stop else 0.0
+        rest = order[stop:]
+        for i in rest[self.hours[rest] <= budget_hours - spent]:
+            if spent + self.hours[i] <= budget_hours:
+                mask[i] = True
+                spent += self.hours[i]
+        best = np.flatnonzero(affordable)[np.argmax(self.reduction_cents[affordable])]
+        if self.reduction_cents[best] > self.reduction_cents[mask].sum():
+            mask[:] = False
+            mask[best] = True
+        return mask
+
+    def _knapsack(self, budget_hours: float) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(candidate options, their weights, take table) of the 0/1 knapsack, or None if it is too large"""
+        capacity = int(math.floor(budget_hours / HOUR_STEP + 1e-9))
+        weights = self._weights()
+        items = np.flatnonzero((self.reduction_cents > 0) & (weights <= capacity))
+        if len(items) * (capacity + 1) > KNAPSACK_MAX_CELLS:
+            return None
+        best = np.zeros(capacity + 1, dtype=np.int64)
+        take = np.zeros((len(items), capacity + 1), dtype=bool)
+        for row, i in enumerate(items):
+            w, value = weights[i], self.reduction_cents[i]
+            candidate = best[:capacity + 1 - w] + value
+            better = candidate > best[w:]
+            take[row, w:] = better
+            best[w:] = np.where(better, candidate, best[w:])
+        return items, weights[items], take
+
+    @staticmethod
+    def _chosen(items: np.ndarray, weights: np.ndarray, take: np.ndarray, capacity: int, size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        for row in range(len(items) - 1, -1, -1):
+            if take[row, capacity]:
+                mask[items[row]] = True
+                capacity -= weights[row]
+        return mask
+
+    def optimal(self, budget_hours: float) -> Optional[np.ndarray]:
+        """Maximum ALE reduction within budget_hours (hours rounded up to HOUR_STEP), None if too large"""
+        table = self._knapsack(budget_hours)
+        if table is None:
+            return None
+        return self._chosen(*table, int(math.floor(budget_hours / HOUR_STEP + 1e-9)), len(self))
+
+    def plan(self, budget_hours: float, method: str = "auto") -> Tuple[np.ndarray, str]:
+        """(selected options, method used); "auto" is the exact knapsack when it fits KNAPSACK_MAX_CELLS"""
+        if method in ("auto", "optimal"):
+            mask = self.optimal(budget_hours)
+            if mask is not None:
+                return mask, "optimal"
+            if method == "optimal":
+                raise ValueError(f"Knapsack over {len(self)} options x {budget_hours}h exceeds "
+                                 f"{KNAPSACK_MAX_CELLS:,} cells; use greedy or a coarser group_by")
+        return self.greedy(budget_hours), "greedy"
+
+    def frontier(self, budgets: Iterable[float], method: str = "auto") -> pd.DataFrame:
+        """Best plan per budget; one knapsack table at the largest budget answers every smaller one"""
+        budgets = sorted(float(b) for b in budgets)
+        table = self._knapsack(budgets[-1]) if budgets and method != "greedy" else None
+        masks = []
+        for budget in budgets:
+            if table is not None:
+                capacity = int(math.floor(budget / HOUR_STEP + 1e-9))
+                masks.append(self._chosen(*table, capacity, len(self)))
+            else:
+                masks.append(self.greedy(budget))
+        frame = self.evaluate_many(np.array(masks).reshape(len(budgets), len(self)))
+        frame.insert(0, "budget_hours", budgets)
+        frame["method"] = "optimal" if table is not None else "greedy"
+        return frame
+
+    def selected(self, mask: np.ndarray) -> pd.DataFrame:
+        """Display rows (dollars, not cents) of the chosen options, largest reduction first"""
+        chosen = self.options[mask].sort_values("reduction_cents", ascending=False, kind="stable")
+        return pd.DataFrame({
+            "remediation": chosen["remediation"],
+            "control": chosen["control"],
+            "findings": chosen["findings"],
+            "resources": chosen["resources"],
+            "hours": chosen["hours"],
+            "ale": chosen["ale_cents"] / 100,
+            "ale_reduction": chosen["reduction_cents"] / 100,
+        }).reset_index(drop=True)
+
+
+def write_whatif(planner: RemediationPlanner, budget_hours: float, method: str = "auto",
+                 whatif_file: str = WHATIF_FILE) -> Dict[str, Any]:
+    """Plan at budget_hours plus the reduction frontier up to twice that budget"""
+    mask, used = planner.plan(budget_hours, method)
+    budgets = np.linspace(0, 2 * budget_hours, FRONTIER_POINTS + 1)[1:]
+    whatif = {
+        "run_id": planner.run_id,
+        "generated_at": datetime.now().isoformat(),
+        "budget_hours": budget_hours,
+        "method": used,
+        "totals": planner.evaluate(mask),
+        "plan": planner.selected(mask).to_dict(orient="records"),
+        "frontier": planner.frontier(budgets, method).to_dict(orient="records"),
+    }
+    with open(whatif_file, "w") as f:
+        json.dump(whatif, f, indent=2, default=str)
+    return whatif
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Which remediations buy the largest ALE reduction within N hours")
+    parser.add_argument("source", nargs="?",
+                        help=f"run snapshot (Parquet) or report JSON; default: the latest risk_runs/ snapshot, "
+                             f"else {REPORT_FILE}")
+    parser.add_argument("--budget-hours", type=float, default=DEFAULT_BUDGET_HOURS)
+    parser.add_argument("--group-by", default=",".join(DEFAULT_GROUP_BY),
+                        help="remediation scope, e.g. finding_code,account_id")
+    parser.add_argument("--method", choices=["auto", "optimal", "greedy"], default="auto")
+    parser.add_argument("--hours", help="JSON {remediation: hours} overriding the profile estimates")
+    parser.add_argument("--fix", action="append", default=[], help="evaluate this fix set instead of planning")
+    parser.add_argument("--options", default=OPTIONS_FILE)
+    parser.add_argument("--output", default=WHATIF_FILE)
+    args = parser.parse_args()
+
+    source = args.source or (run_snapshots()[-1:] or [REPORT_FILE])[0]
+    hours = None
+    if args.hours:
+        with open(args.hours, "r") as f:
+            hours = json.load(f)
+
+    started = time.time()
+    planner = RemediationPlanner.from_run(source, args.group_by.split(","), hours)
+    planner.save(args.options)
+    print(f"{len(planner)} remediation options from {source} in {time.time() - started:.1f}s")
+
+    if args.fix:
+        try:
+            totals = planner.evaluate(args.fix)
+        except KeyError as e:
+            parser.error(e.args[0])
+        print(f"{totals['fixes']} fixes, {totals['hours']:,.1f}h: ALE ${totals['ale_before']:,.2f} → "
+              f"${totals['ale_after']:,.2f} (−${totals['ale_reduction']:,.2f})")
+    else:
+        started = time.perf_counter()
+        whatif = write_whatif(planner, args.budget_hours, args.method, args.output)
+        totals = whatif["totals"]
+        print(f"{whatif['method'].title()} plan for {args.budget_hours:g}h: {totals['fixes']} fixes, "
+              f"{totals['hours']:,.1f}h, ALE ${totals['ale_before']:,.2f} → ${totals['ale_after']:,.2f} "
+              f"(−${totals['ale_reduction']:,.2f}) in {(time.perf_counter() - started) * 1e3:.0f} ms")
+        print(f"Saved {args.options} and {args.output}")
@@ -0,0 +1,333 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+from json_stream import iter_json_records
+from risk_engine import RUNS_DIR
+
+REGISTER_FILE = "risk_register.ndjson"
+DRIFT_FILE = "risk_drift.json"
+DRIFT_TABLE_FILE = "risk_drift.parquet"
+BATCH_ROWS = 50_000
+TOP_N = 25
+
+JOIN_KEYS = ["asset_uid", "finding_code"]
+ASSET_ATTRIBUTES = ["classification", "is_public", "retention_days"]
+FINDING_ATTRIBUTES = ["severity"] + ASSET_ATTRIBUTES
+# ALE is rounded to cents by risk_engine.py; anything smaller is float noise
+ALE_TOLERANCE = 0.005
+
+# Only these register columns are parsed; everything else in a record is skipped by the reader
+DRIFT_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("asset_uid", pa.string()),
+    ("finding_code", pa.string()),
+    ("asset", pa.string()),
+    ("service", pa.string()),
+    ("severity", pa.string()),
+    ("classification", pa.string()),
+    ("is_public", pa.bool_()),
+    ("retention_days", pa.int64()),
+    ("ale", pa.float64()),
+])
+
+
+def _is_json_array(path: str) -> bool:
+    with open(path, "r") as f:
+        return f.read(4096).lstrip().startswith("[")
+
+
+def _iter_batches(path: str) -> Iterator[pa.Table]:
+    """Projected DRIFT_SCHEMA batches from a Parquet, NDJSON or JSON array register"""
+    if path.endswith(".parquet"):
+        parquet = pq.ParquetFile(path)
+        columns = [name for name in DRIFT_SCHEMA.names if name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(BATCH_ROWS, columns=columns):
+            yield _conform(pa.Table.from_batches([batch]))
+    elif _is_json_array(path):
+        # JSON array reports (risk_quantification_report.json) have no line framing to split on,
+        # so they take the slower streaming decoder
+        records = iter_json_records(path)
+        while True:
+            chunk = [{name: record.get(name) for name in DRIFT_SCHEMA.names}
+                     for _, record in zip(range(BATCH_ROWS), records)]
+            if not chunk:
+                return
+            yield pa.Table.from_pylist(chunk, schema=DRIFT_SCHEMA)
+    else:
+        reader = pa_json.open_json(path, parse_options=pa_json.ParseOptions(
+            explicit_schema=DRIFT_SCHEMA, unexpected_field_behavior="ignore"))
+        for batch in reader:
+            yield _conform(pa.Table.from_batches([batch]))
+
+
+def _conform(table: pa.Table) -> pa.Table:
+    """Add missing DRIFT_SCHEMA columns as nulls and cast to the schema types"""
+    columns = [table[name] if name in table.column_names else pa.nulls(table.num_rows, field.type)
+               for name, field in zip(DRIFT_SCHEMA.names, DRIFT_SCHEMA)]
+    return pa.Table.from_arrays(columns, names=DRIFT_SCHEMA.names).cast(DRIFT_SCHEMA)
+
+
+def load_runs(path: str, run_ids: List[str] = None, last: int = 2) -> Dict[str, pa.Table]:
+    """
+    Projected tables per run_id, in register order
+    With run_ids, only those runs are kept; otherwise only the last `last` runs are. Runs are appended to
+    the register as contiguous blocks, so batches of older runs are dropped as soon as a newer one appears
+    and memory stays bounded by the runs being compared, not by the register's history
+    """
+    runs: Dict[str, List[pa.Table]] = {}
+    for batch in _iter_batches(path):
+        batch = batch.set_column(0, "run_id", pc.fill_null(batch["run_id"], "legacy"))
+        for run_id in pc.unique(batch["run_id"]).to_pylist():
+            if run_ids is not None and run_id not in run_ids:
+                continue
+            runs.setdefault(run_id, []).append(batch.filter(pc.equal(batch["run_id"], run_id)))
+            if run_ids is None and len(runs) > last:
+                del runs[next(iter(runs))]
+    return {run_id: pa.concat_tables(tables) for run_id, tables in runs.items()}
+
+
+def load_run(path: str, run_id: str = None) -> Tuple[str, pa.Table]:
+    """One run from a register or report file (the latest one unless run_id is given)"""
+    runs = load_runs(path, [run_id] if run_id else None, last=1)
+    if not runs:
+        raise ValueError(f"{path}: no run {run_id or ''} found".replace("  ", " "))
+    return next(iter(runs.items()))
+
+
+def _dedupe(table: pa.Table, keys: List[str], attributes: List[str]) -> pa.Table:
+    """
+    One row per key: ALE summed, attributes of duplicate rows collapsed to their max
+    Runs are normally unique on the key already, in which case only the distinct-count pass is paid
+    """
+    table = table.filter(pc.is_valid(table["asset_uid"]))
+    if "finding_code" in keys:
+        table = table.set_column(table.schema.get_field_index("finding_code"), "finding_code",
+                                 pc.fill_null(table["finding_code"], ""))
+    table = table.select(keys + ["ale"] + attributes)
+    if table.group_by(keys).aggregate([]).num_rows == table.num_rows:
+        return table
+    grouped = table.group_by(keys).aggregate([("ale", "sum")] + [(name, "max") for name in attributes])
+    grouped = grouped.rename_columns([name if name in keys else name.rsplit("_", 1)[0]
+                                      for name in grouped.column_names])
+    return grouped.select(keys + ["ale"] + attributes)
+
+
+def _changed(base: pa.ChunkedArray, head: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Null-aware inequality: null vs null is equal, null vs value is a change"""
+    return pc.coalesce(pc.not_equal(base, head), pc.xor(pc.is_null(base), pc.is_null(head)))
+
+
+def _any(masks: List[pa.ChunkedArray]) -> pa.ChunkedArray:
+    result = masks[0]
+    for mask in masks[1:]:
+        result = pc.or_(result, mask)
+    return result
+
+
+def _changed_fields(flags: Dict[str, pa.ChunkedArray], rows: pa.ChunkedArray = None) -> pa.Array:
+    """Comma-joined names of the flagged fields per row ('' where rows is false)"""
+    masks = {name: mask.to_numpy() for name, mask in flags.items()}
+    size = len(next(iter(masks.values())))
+    fields = np.full(size, "", dtype=object)
+    for i in (np.flatnonzero(rows.to_numpy()) if rows is not None else range(size)):
+        fields[i] = ", ".join(name for name, mask in masks.items() if mask[i])
+    return pa.array(fields, pa.string())
+
+
+def _ranked(table: pa.Table, keys: List[str]) -> pd.DataFrame:
+    """Largest absolute ALE delta first, ties broken by key so the output is reproducible"""
+    impact = pc.abs(table["ale_delta"])
+    order = pc.sort_indices(table.append_column("impact", impact),
+                            [("impact", "descending")] + [(key, "ascending") for key in keys])
+    return table.take(order).to_pandas(integer_object_nulls=True)
+
+
+def diff_runs(base: pa.Table, head: pa.Table) -> pd.DataFrame:
+    """
+    Full-outer hash join of two runs on (asset_uid, finding_code)
+    Returns one row per new, resolved or changed finding, ranked by absolute ALE delta. Change detection
+    and ranking stay in Arrow; only the delta rows reach pandas
+    """
+    attributes = ["asset", "service"] + FINDING_ATTRIBUTES
+    joined = _dedupe(base, JOIN_KEYS, attributes).join(
+        _dedupe(head, JOIN_KEYS, attributes), keys=JOIN_KEYS, join_type="full outer",
+        left_suffix="_base", right_suffix="_head", coalesce_keys=True)
+
+    new, resolved = pc.is_null(joined["ale_base"]), pc.is_null(joined["ale_head"])
+    ale_delta = pc.round(pc.subtract(pc.fill_null(joined["ale_head"], 0.0),
+                                     pc.fill_null(joined["ale_base"], 0.0)), 2)
+    flags = {"ale": pc.greater(pc.abs(ale_delta), ALE_TOLERANCE)}
+    flags.update({name: _changed(joined[f"{name}_base"], joined[f"{name}_head"]) for name in FINDING_ATTRIBUTES})
+    changed = pc.and_(pc.invert(pc.or_(new, resolved)), _any(list(flags.values())))
+    keep = _any([new, resolved, changed])
+
+    delta = pa.table({
+        "change": pc.if_else(new, "new", pc.if_else(resolved, "resolved", "changed")).filter(keep),
+        **{key: joined[key].filter(keep) for key in JOIN_KEYS},
+        "asset": pc.coalesce(joined["asset_head"], joined["asset_base"]).filter(keep),
+        "service": pc.coalesce(joined["service_head"], joined["service_base"]).filter(keep),
+        "ale_base": joined["ale_base"].filter(keep),
+        "ale_head": joined["ale_head"].filter(keep),
+        "ale_delta": ale_delta.filter(keep),
+        "changed_fields": _changed_fields({name: mask.filter(keep) for name, mask in flags.items()},
+                                          changed.filter(keep)),
+        **{f"{name}_{side}": joined[f"{name}_{side}"].filter(keep)
+           for name in FINDING_ATTRIBUTES for side in ("base", "head")},
+    })
+    return _ranked(delta, JOIN_KEYS)
+
+
+def asset_changes(base: pa.Table, head: pa.Table) -> pd.DataFrame:
+    """Assets present in both runs whose classification, exposure or retention moved, by ALE impact"""
+    attributes = ["asset"] + ASSET_ATTRIBUTES
+    joined = _dedupe(base, ["asset_uid"], attributes).join(
+        _dedupe(head, ["asset_uid"], attributes), keys="asset_uid", join_type="inner",
+        left_suffix="_base", right_suffix="_head")
+
+    flags = {name: _changed(joined[f"{name}_base"], joined[f"{name}_head"]) for name in ASSET_ATTRIBUTES}
+    keep = _any(list(flags.values()))
+    delta = pa.table({
+        "asset_uid": joined["asset_uid"].filter(keep),
+        "asset": pc.coalesce(joined["asset_head"], joined["asset_base"]).filter(keep),
+        "changed_fields": _changed_fields({name: mask.filter(keep) for name, mask in flags.items()}),
+        "ale_base": joined["ale_base"].filter(keep),
+        "ale_head": joined["ale_head"].filter(keep),
+        "ale_delta": pc.round(pc.subtract(joined["ale_head"], joined["ale_base"]), 2).filter(keep),
+        **{f"{name}_{side}": joined[f"{name}_{side}"].filter(keep)
+           for name in ASSET_ATTRIBUTES for side in ("base", "head")},
+    })
+    return _ranked(delta, ["asset_uid"])
+
+
+def _records(df: pd.DataFrame, limit: int) -> List[Dict[str, Any]]:
+    head = df.head(limit).astype(object)
+    return head.where(head.notna(), None).to_dict("records")
+
+
+def build_drift(base: Optional[Tuple[str, pa.Table]], head: Tuple[str, pa.Table],
+                top_n: int = TOP_N) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """Machine-readable drift summary plus the full finding-level delta table"""
+    head_run, head_table = head
+    base_run, base_table = base if base else (None, DRIFT_SCHEMA.empty_table())
+    # Without a previous run there is nothing to compare; an empty delta keeps the output shape stable
+    findings = diff_runs(base_table, head_table if base else base_table)
+    assets = asset_changes(base_table, head_table if base else base_table)
+
+    totals = {}
+    for change in ("new", "resolved", "changed"):
+        rows = findings[findings["change"] == change]
+        totals[change] = {"count": int(len(rows)), "ale_delta": round(float(rows["ale_delta"].sum()), 2)}
+
+    base_ale = round(float(pc.sum(base_table["ale"]).as_py() or 0.0), 2)
+    head_ale = round(float(pc.sum(head_table["ale"]).as_py() or 0.0), 2)
+    drift = {
+        "base_run": base_run,
+        "head_run": head_run,
+        "generated_at": datetime.now().isoformat(),
+        "base_findings": base_table.num_rows,
+        "head_findings": head_table.num_rows,
+        "base_ale": base_ale,
+        "head_ale": head_ale,
+        "ale_delta": round(head_ale - base_ale, 2) if base else 0.0,
+        "findings": totals,
+        "asset_changes": {
+            "count": int(len(assets)),
+            **{name: int(assets["changed_fields"].str.contains(name).sum()) for name in ASSET_ATTRIBUTES},
+        },
+        "top_findings": _records(findings, top_n),
+        "top_assets": _records(assets, top_n),
+    }
+    return drift, findings
+
+
+def write_drift(drift: Dict[str, Any], findings: pd.DataFrame,
+                drift_file: str = DRIFT_FILE, table_file: str = DRIFT_TABLE_FILE):
+    tmp_table = f"{table_file}.tmp"
+    pq.write_table(pa.Table.from_pandas(findings, preserve_index=False), tmp_table)
+    os.replace(tmp_table, table_file)
+    tmp_file = f"{drift_file}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(drift, f, indent=2, default=str)
+    os.replace(tmp_file, drift_file)
+
+
+def load_drift(drift_file: str = DRIFT_FILE) -> Optional[Dict[str, Any]]:
+    """The last drift summary, or None if no drift has been computed"""
+    if not os.path.exists(drift_file):
+        return None
+    with open(drift_file, "r") as f:
+        return json.load(f)
+
+
+def run_snapshots(runs_dir: str = RUNS_DIR) -> List[str]:
+    """Per-run Parquet snapshots written by risk_engine.py, oldest first (run_ids are timestamps)"""
+    if not os.path.isdir(runs_dir):
+        return []
+    return sorted(os.path.join(runs_dir, name) for name in os.listdir(runs_dir) if name.endswith(".parquet"))
+
+
+def compare(sources: List[str], base_run: str = None, head_run: str = None) -> Tuple[Optional[Tuple], Tuple]:
+    """
+    (base, head) runs to compare
+    One source: two runs of the same register (the last two unless named). Two sources: one run of each
+    """
+    if len(sources) == 2:
+        return load_run(sources[0], base_run), load_run(sources[1], head_run)
+    if base_run:
+        head_run = head_run or next(iter(load_runs(sources[0], last=1)), None)
+        runs = load_runs(sources[0], [base_run, head_run])
+        if base_run not in runs or head_run not in runs:
+            raise ValueError(f"{sources[0]}: runs {base_run}, {head_run} not both found")
+        return (base_run, runs[base_run]), (head_run, runs[head_run])
+    runs = list(load_runs(sources[0], last=2).items())
+    if not runs:
+        raise ValueError(f"{sources[0]}: no runs found")
+    return (runs[0] if len(runs) == 2 else None), runs[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash-join two risk runs and report what changed")
+    parser.add_argument("sources", nargs="*",
+                        help="one register (compares its last two runs) or BASE HEAD files (register NDJSON, "
+                             f"report JSON or Parquet); default: the last two snapshots in {RUNS_DIR}/, "
+                             f"else {REGISTER_FILE}")
+    parser.add_argument("--base-run", help="run_id to compare from")
+    parser.add_argument("--head-run", help="run_id to compare to (default: latest)")
+    parser.add_argument("--output", default=DRIFT_FILE)
+    parser.add_argument("--table", default=DRIFT_TABLE_FILE, help="full finding-level delta (Parquet)")
+    parser.add_argument("--top", type=int, default=TOP_N)
+    args = parser.parse_args()
+    if len(args.sources) > 2:
+        parser.error("expected one register or two files")
+    if args.head_run and not args.base_run and len(args.sources) < 2:
+        parser.error("--head-run needs --base-run when comparing runs of one register")
+
+    args.sources = args.sources or run_snapshots()[-2:] or [REGISTER_FILE]
+
+    started = time.time()
+    base, head = compare(args.sources, args.base_run, args.head_run)
+    drift, findings = build_drift(base, head, args.top)
+    write_drift(drift, findings, args.output, args.table)
+
+    if base is None:
+        print(f"Only one run ({drift['head_run']}) in {args.sources[0]}; nothing to compare yet")
+    else:
+        totals = drift["findings"]
+        print(f"Drift {drift['base_run']} → {drift['head_run']}: "
+              f"{totals['new']['count']} new (${totals['new']['ale_delta']:+,.2f}), "
+              f"{totals['resolved']['count']} resolved (${totals['resolved']['ale_delta']:+,.2f}), "
+              f"{totals['changed']['count']} changed (${totals['changed']['ale_delta']:+,.2f}), "
+              f"{drift['asset_changes']['count']} assets reclassified/re-exposed; "
+              f"total ALE ${drift['ale_delta']:+,.2f}")
+    print(f"Saved {args.output} and {args.table} in {time.time() - started:.1f}s")
@@ -1,7 +1,19 @@
+import argparse
 import json
+import os
+import shutil
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from collections import Counter
+from contextlib import ExitStack
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional
+
+from framework_index import FrameworkIndexBuilder, index_file_for
+from normalize_findings import FINDINGS_FILE, iter_findings
+from out_of_core import TopK, memory_budget
 
 
 THREAT_EVENT_FREQUENCY_DAYS = {
@@ -64,36 +76,68 @@ FINDING_CONTROL_EFFECTIVENESS = {
 }
 
 
+def _parse_tag_list(tag_list: List[str]) -> Dict[str, Any]:
+    tags = {}
+    for tag_item in tag_list:
+        tag_item = tag_item.strip("{} ")
+        if ":" in tag_item:
+            key, val = tag_item.split(":", 1)
+            key = key.strip().lower().replace(" ", "_")
+            val = val.strip()
+            
+            if val.lower() in ["true", "enabled", "yes"]:
+                val = True
+            elif val.lower() in ["false", "disabled", "no"]:
+                val = False
+            else:
+                try:
+                    val = int(val.split()[0]) 
+                except:
+                    pass
+            
+            tags[key] = val
+    return tags
+
+
+def _typed_columns(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Typed Steampipe columns -> tag dict; JSONB tag maps are flattened to one key per tag"""
+    tags = {}
+    for column, val in columns.items():
+        if isinstance(val, dict):
+            for tag_key, tag_val in val.items():
+                tags[str(tag_key).strip().lower().replace(" ", "_")] = tag_val
+        else:
+            tags[column.lower()] = val
+    return tags
+
+
 def load_steampipe_tags(filepath: str) -> Dict[str, Dict[str, Any]]:
     """
-    Parse Steampipe JSON into structured asset dictionary
-    Handles format: {"Resource Name": ["{key:value}", "{key:value}"]}
+    Parse Steampipe output into structured asset dictionary
+    Handles typed NDJSON (schema header, then {"resource_type", "name", "columns": {...}} lines),
+    and the legacy stringified formats {"name": ..., "tags": ["{key:value}", ...]} per line or
+    {"Resource Name": ["{key:value}", "{key:value}"]}
     """
     try:
-        with open(filepath, 'r') as f:
-            raw_data = json.load(f)
+        raw_data = {}
+        if filepath.endswith((".ndjson", ".jsonl")):
+            with open(filepath, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    row = json.loads(line)
+                    if "schema" in row:
+                        continue
+                    if "columns" in row:
+                        raw_data[str(row["name"])] = _typed_columns(row["columns"])
+                    else:
+                        raw_data[str(row["name"])] = _parse_tag_list(row["tags"])
+        else:
+            with open(filepath, 'r') as f:
+                raw_data = {name: _parse_tag_list(tag_list) for name, tag_list in json.load(f).items()}
         
         parsed_assets = {}
-        for resource_name, tag_list in raw_data.items():
-            tags = {}
-            for tag_item in tag_list:
-                tag_item = tag_item.strip("{} ")
-                if ":" in tag_item:
-                    key, val = tag_item.split(":", 1)
-                    key = key.strip().lower().replace(" ", "_")
-                    val = val.strip()
-                    
-                    if val.lower() in ["true", "enabled", "yes"]:
-                        val = True
-                    elif val.lower() in ["false", "disabled", "no"]:
-                        val = False
-                    else:
-                        try:
-                            val = int(val.split()[0]) 
-                        except:
-                            pass
-                    
-                    tags[key] = val
+        for resource_name, tags in raw_data.items():
             
             parsed_assets[resource_name.lower()] = tags
             parsed_assets[resource_name.replace("-", "_").lower()] = tags
@@ -104,22 +148,19 @@ def load_steampipe_tags(filepath: str) -> Dict[str, Dict[str, Any]]:
         print(f"Warning: Steampipe tags not loaded: {e}")
         return {}
 
-def extract_prowler_findings(filepath: str) -> List[Dict[str, Any]]:
-    """Load Prowler findings from JSON file"""
-    try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading Prowler findings: {e}")
-        return []
-
+def select_scored_findings(findings: pa.Table) -> pa.Table:
+    """Failed findings with a resource (a missing status_code counts as FAIL), as column predicates"""
+    failed = pc.equal(pc.fill_null(findings["status_code"], "FAIL"), "FAIL")
+    has_resource = pc.is_valid(findings["resource_uid"])
+    return findings.filter(pc.and_(failed, has_resource))
 
 
 def get_resource_context(resource_uid: str, resource_name: str, 
-                        resource_type: str, prowler_metadata: Dict,finding : Dict,
+                        resource_type: str, finding: Dict,
                         steampipe_assets: Dict) -> Dict[str, Any]:
     """
     Unified context extractor merging Prowler + Steampipe metadata
+    finding is a normalized findings-table row (see normalize_findings.py)
     Returns: classification, public status, activity, retention, soft-delete
     """
     context = {
@@ -201,6 +242,8 @@ def get_resource_context(resource_uid: str, resource_name: str,
             
             elif "public" in key and isinstance(val, bool):
                 context["is_public"] = val
+            elif "public" in key and isinstance(val, str) and val.lower() in ["enabled", "disabled"]:
+                context["is_public"] = val.lower() == "enabled"
             
             elif "status" in key and isinstance(val, str):
                 if val.lower() in ["disabled", "deleted", "failed", "inactive", "stopped"]:
@@ -214,12 +257,10 @@ def get_resource_context(resource_uid: str, resource_name: str,
             elif "retention" in key and isinstance(val, int):
                 context["retention"] = val
     
-    unmapped = finding.get("unmapped", {})
-    categories = unmapped.get("categories", []) if isinstance(unmapped, dict) else []
-    if "internet-exposed" in categories:
+    if "internet-exposed" in (finding.get("categories") or []):
         context["is_public"] = True
     
-    state = prowler_metadata.get("state", "")
+    state = finding.get("resource_state") or ""
     if state in ["stopped", "terminated", "deleted", "failed"]:
         context["is_active"] = False
     
@@ -230,17 +271,17 @@ def calculate_control_effectiveness(finding: Dict) -> float:
     """
     Map Prowler findings to control effectiveness scores
     """
-    event_code = finding.get("metadata", {}).get("event_code", "")
+    event_code = finding.get("finding_code") or ""
     
     if event_code in FINDING_CONTROL_EFFECTIVENESS:
         return FINDING_CONTROL_EFFECTIVENESS[event_code]
     
     # Pattern-based matching
     if "mfa" in event_code.lower():
-        return 0.0 if "FAIL" in finding.get("status_code", "") else CONTROL_EFFECTIVENESS["mfa_enabled"]
+        return 0.0 if "FAIL" in (finding.get("status_code") or "FAIL") else CONTROL_EFFECTIVENESS["mfa_enabled"]
     
     if "encryption" in event_code.lower() or "kms" in event_code.lower():
-        return 0.0 if "FAIL" in finding.get("status_code", "") else CONTROL_EFFECTIVENESS["encryption_enabled"]
+        return 0.0 if "FAIL" in (finding.get("status_code") or "FAIL") else CONTROL_EFFECTIVENESS["encryption_enabled"]
     
     if "securitygroup" in event_code.lower():
         if "all_ports" in event_code:
@@ -256,7 +297,7 @@ def calculate_control_effectiveness(finding: Dict) -> float:
     if "logging" in event_code.lower() or "trail" in event_code.lower():
         return CONTROL_EFFECTIVENESS["logging_enabled"]
     
-    severity = finding.get("severity", "High")
+    severity = finding.get("severity") or "High"
     if severity == "Critical":
         return 0.0
     elif severity == "High":
@@ -279,111 +320,375 @@ def calculate_ale(loss_magnitude: float, threat_frequency: float,
     return max(residual_risk, 0.0)
 
 
+CUBE_DIMENSIONS = ["severity", "classification", "service", "region", "account_id", "is_public"]
+CUBE_MEASURES = ["ale_sum", "count", "risky_count", "retention_sum"]
+RISKY_RETENTION_DAYS = 14
+RUNS_DIR = "risk_runs"
+RUNS_KEEP = 30
+# The NDJSON register keeps as many runs as there are snapshots; older runs are trimmed from its head
+REGISTER_KEEP_RUNS = RUNS_KEEP
+SCORING_BATCH_ROWS = 10_000
+# Peak bytes per finding while its batch is scored (record dicts, DataFrame, Arrow batch; ~4 KiB measured).
+# Under a memory budget, half of it sizes the scoring batches and half holds framework postings before they spill
+SCORED_RECORD_BYTES = 8 << 10
+TOP_RISKS = 100
+TOP_SUFFIX = "_top.json"
+
+# One register record, in the key order of the JSON report; also the schema of the run snapshot
+RECORD_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("finding_id", pa.string()),
+    ("asset", pa.string()),
+    ("asset_uid", pa.string()),
+    ("asset_type", pa.string()),
+    ("service", pa.string()),
+    ("severity", pa.string()),
+    ("classification", pa.string()),
+    ("is_public", pa.bool_()),
+    ("is_active", pa.bool_()),
+    ("retention_days", pa.int64()),
+    ("soft_delete", pa.bool_()),
+    ("threat_frequency", pa.float64()),
+    ("loss_magnitude", pa.int64()),
+    ("control_effectiveness", pa.float64()),
+    ("ale", pa.float64()),
+    ("control", pa.string()),
+    ("compliance", pa.string()),
+    ("compliance_map", pa.map_(pa.string(), pa.list_(pa.string()))),
+    ("finding_code", pa.string()),
+    ("risk_details", pa.string()),
+    ("remediation", pa.string()),
+    ("region", pa.string()),
+    ("cloud_provider", pa.string()),
+    ("account_id", pa.string()),
+    ("status", pa.string()),
+    ("created_time", pa.string()),
+])
+
+
+def ale_cents(ale: pd.Series) -> pd.Series:
+    """ALE is rounded to cents, so sums over integer cents are exact in any order or partitioning"""
+    return (ale * 100).round().astype("int64")
+
+
+def build_risk_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pre-aggregate the risk register over CUBE_DIMENSIONS
+    A finding is risky if public, retained under RISKY_RETENTION_DAYS, or Critical
+    """
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+    
+    risky = (df["is_public"] == True) | (df["retention_days"] < RISKY_RETENTION_DAYS) | (df["severity"] == "Critical")
+    cube = (
+        df.assign(risky=risky.astype(int), ale_cents=ale_cents(df["ale"]))
+        .groupby(CUBE_DIMENSIONS, dropna=False, sort=False)
+        .agg(ale_cents=("ale_cents", "sum"), count=("ale", "size"),
+             risky_count=("risky", "sum"), retention_sum=("retention_days", "sum"))
+        .reset_index()
+    )
+    cube.insert(len(CUBE_DIMENSIONS), "ale_sum", cube.pop("ale_cents") / 100)
+    return cube
+
+
+def merge_risk_cubes(cubes: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Combine partial cubes of consecutive register slices
+    Equal to build_risk_cube() over the whole register: same cells, same (first-seen) order, same sums
+    """
+    cubes = [cube for cube in cubes if not cube.empty]
+    if not cubes:
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+    combined = pd.concat(cubes, ignore_index=True)
+    cube = (
+        combined.assign(ale_sum=ale_cents(combined["ale_sum"]))
+        .groupby(CUBE_DIMENSIONS, dropna=False, sort=False)[CUBE_MEASURES].sum()
+        .reset_index()
+    )
+    cube["ale_sum"] = cube["ale_sum"] / 100
+    return cube
+
+
+def write_risk_cube(cube: pd.DataFrame, cube_file: str, run_id: str = None):
+    with open(cube_file, "w") as f:
+        json.dump({
+            "run_id": run_id,
+            "dimensions": CUBE_DIMENSIONS,
+            "measures": CUBE_MEASURES,
+            "generated_at": datetime.now().isoformat(),
+            "cells": cube.to_dict(orient="list")
+        }, f, default=str)
+
+
+def load_risk_cube(cube_file: str) -> pd.DataFrame:
+    with open(cube_file, "r") as f:
+        data = json.load(f)
+    cube = pd.DataFrame(data["cells"], columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+    cube.attrs["run_id"] = data.get("run_id")
+    return cube
+
+
+def score_finding(finding: Dict, steampipe_assets: Dict, run_id: str) -> Dict[str, Any]:
+    """One normalized findings-table row -> one register record (RECORD_SCHEMA key order)"""
+    r_uid = finding["resource_uid"]
+    r_name = finding["resource_name"] or ""
+    r_type = finding["resource_type"] or ""
+    
+    if "<root_account>" in r_uid:
+        r_name = "Root Account"
+    
+    context = get_resource_context(
+        r_uid, r_name, r_type, finding, steampipe_assets
+    )
+    
+    severity = finding["severity"] or "High"
+    threat_frequency = THREAT_EVENT_FREQUENCY_DAYS.get(severity, 0.15)
+    loss_magnitude = LOSS_MAGNITUDE_MAP_DOLLARS.get(context["class"], 10_000)
+    control_effectiveness = calculate_control_effectiveness(finding)
+    
+    ale = calculate_ale(loss_magnitude, threat_frequency, control_effectiveness)
+    
+    compliance = dict(finding["compliance"] or [])
+    frameworks = list(compliance.keys())
+    
+    nist_controls = compliance.get("NIST-CSF-2.0", []) or \
+                  compliance.get("NIST-800-53-Revision-5", []) or \
+                  compliance.get("NIST-800-53-Revision-4", []) or \
+                  compliance.get("NIST-CSF-1.1", [])
+    
+    primary_control = nist_controls[0] if nist_controls else "SC-7"
+    
+    return {
+        "run_id": run_id,
+        "finding_id": finding["finding_id"],
+        "asset": r_name,
+        "asset_uid": r_uid,
+        "asset_type": r_type,
+        "service": context["service"],
+        "severity": severity,
+        "classification": context["class"],
+        "is_public": context["is_public"],
+        "is_active": context["is_active"],
+        "retention_days": context["retention"],
+        "soft_delete": context["soft_delete"],
+        "threat_frequency": threat_frequency,
+        "loss_magnitude": loss_magnitude,
+        "control_effectiveness": round(control_effectiveness, 2),
+        "ale": round(ale, 2),
+        "control": primary_control,
+        "compliance": ", ".join(frameworks),
+        "compliance_map": compliance,
+        "finding_code": finding["finding_code"] or "",
+        "risk_details": (finding["risk_details"] or "")[:200],
+        "remediation": (finding["remediation"] or "")[:200],
+        "region": finding["region"] or "unknown",
+        "cloud_provider": finding["cloud_provider"] or "aws",
+        "account_id": finding["account_id"] or "unknown",
+        "status": finding["status_code"] or "FAIL",
+        "created_time": finding["created_time"] or ""
+    }
+
+
+def json_array_chunk(records: List[Dict[str, Any]], first: bool) -> str:
+    """
+    A slice of json.dump(records, indent=2): chunks written in order (then "\\n]", or "[]" if none)
+    produce byte-identical output without holding the whole array
+    """
+    return "".join(("[\n  " if first and i == 0 else ",\n  ") +
+                   json.dumps(record, indent=2, default=str).replace("\n", "\n  ")
+                   for i, record in enumerate(records))
+
+
+def register_index_file(register_file: str) -> str:
+    return f"{register_file}.runs.json"
+
+
+def read_register_index(register_file: str) -> List[Dict[str, Any]]:
+    """[{"run_id", "offset", "bytes"}] per run in the register, oldest first; [] if missing or unreadable"""
+    try:
+        with open(register_index_file(register_file), "r") as f:
+            return json.load(f)["runs"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def _scan_register_runs(register_file: str) -> List[Dict[str, Any]]:
+    """Rebuild the run index of a register written before it was indexed (one full pass)"""
+    runs, offset = [], 0
+    with open(register_file, "rb") as f:
+        for line in f:
+            run_id = json.loads(line).get("run_id", "legacy") if line.strip() else None
+            if run_id is not None and (not runs or runs[-1]["run_id"] != run_id):
+                runs.append({"run_id": run_id, "offset": offset, "bytes": 0})
+            if runs:
+                runs[-1]["bytes"] = offset + len(line) - runs[-1]["offset"]
+            offset += len(line)
+    return runs
+
+
+def _write_register_index(register_file: str, runs: List[Dict[str, Any]]):
+    index_file = register_index_file(register_file)
+    with open(f"{index_file}.tmp", "w") as f:
+        json.dump({"runs": runs}, f)
+    os.replace(f"{index_file}.tmp", index_file)
+
+
+def append_to_register(run_file: str, register_file: str, run_id: str, keep: int = REGISTER_KEEP_RUNS):
+    """
+    Append one run's NDJSON lines (staged in run_file) to the register and record the byte offset it
+    starts at, so readers can seek straight to the latest run. Copied in one pass at the end of the run
+    so readers never see a run interleaved with another. Beyond `keep` runs the oldest are trimmed
+    """
+    size = os.path.getsize(register_file) if os.path.exists(register_file) else 0
+    runs = read_register_index(register_file)
+    if (runs[-1]["offset"] + runs[-1]["bytes"] if runs else 0) != size:
+        runs = _scan_register_runs(register_file) if size else []
+
+    with open(run_file, "rb") as src, open(register_file, "ab") as dst:
+        shutil.copyfileobj(src, dst, 16 << 20)
+    runs.append({"run_id": run_id, "offset": size, "bytes": os.path.getsize(run_file)})
+    os.remove(run_file)
+
+    if len(runs) > keep:
+        start = runs[-keep]["offset"]
+        with open(register_file, "rb") as src, open(f"{register_file}.tmp", "wb") as dst:
+            src.seek(start)
+            shutil.copyfileobj(src, dst, 16 << 20)
+        os.replace(f"{register_file}.tmp", register_file)
+        runs = [{**run, "offset": run["offset"] - start} for run in runs[-keep:]]
+    _write_register_index(register_file, runs)
+
+
+def prune_run_snapshots(runs_dir: str = RUNS_DIR, keep: int = RUNS_KEEP):
+    """Only the newest `keep` snapshots are kept (the NDJSON register keeps the same number of runs)"""
+    snapshots = sorted(name for name in os.listdir(runs_dir) if name.endswith(".parquet"))
+    for name in snapshots[:-keep]:
+        os.remove(os.path.join(runs_dir, name))
+
+
+def _compliance_dicts(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Arrow returns map columns as (key, value) pairs; the JSON outputs carry them as objects"""
+    for record in records:
+        record["compliance_map"] = dict(record["compliance_map"] or [])
+    return records
+
+
+def write_top_risks(top: pa.Table, top_file: str, run_id: str = None):
+    """The TOP_RISKS largest records by ALE (ties in register order), each with its register 'row'"""
+    with open(top_file, "w") as f:
+        json.dump({"run_id": run_id, "records": _compliance_dicts(top.to_pylist())}, f, indent=2, default=str)
+
+
+def load_top_risks(top_file: str) -> pd.DataFrame:
+    with open(top_file, "r") as f:
+        data = json.load(f)
+    top = pd.DataFrame(data["records"])
+    top.attrs["run_id"] = data.get("run_id")
+    return top
+
+
+def top_file_for(report_file: str) -> str:
+    return report_file.replace(".json", TOP_SUFFIX)
+
+
+def scoring_batch_rows(budget: Optional[int]) -> int:
+    """SCORING_BATCH_ROWS, or fewer so one scored batch stays within half the memory budget"""
+    if budget is None:
+        return SCORING_BATCH_ROWS
+    return max(1, min(SCORING_BATCH_ROWS, budget // 2 // SCORED_RECORD_BYTES))
+
+
 def generate_risk_quantification_report(prowler_file: str, steampipe_file: str, 
-                                       output_file: str = "risk_quantification_report.json"):
+                                       output_file: str = "risk_quantification_report.json",
+                                       register_file: str = "risk_register.ndjson",
+                                       runs_dir: str = RUNS_DIR, budget: str = None):
     """
     Generate GRC-ready risk quantification report
+    Records are also appended to register_file, tagged with this run's run_id, and snapshotted
+    column-wise into runs_dir for run-to-run drift.
+    Findings are scored in batches and every output is streamed or built from per-batch partial
+    aggregates (summary counts, risk cube, framework postings); the top-N is kept in a bounded heap.
+    Under a memory budget (budget or GRC_MEMORY_BUDGET, e.g. "2G") batches are sized to half of it and
+    framework postings beyond the other half spill to disk. Outputs are identical with or without a budget;
+    the Steampipe inventory is loaded whole either way
     """
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    budget = memory_budget(budget)
+    batch_rows = scoring_batch_rows(budget)
     print("GRC RISK ENGINE - Multi-Cloud Risk Quantification")
     print("Methodology: FAIR (Factor Analysis of Information Risk)")
+    if budget:
+        print(f"Memory budget: {budget / (1 << 20):,.0f} MiB ({batch_rows:,} findings per batch)")
     
     steampipe_assets = load_steampipe_tags(steampipe_file)
     
-    prowler_findings = extract_prowler_findings(prowler_file)
-    
-    risk_records = []
+    summary_file = output_file.replace(".json", "_summary.json")
+    cube_file = output_file.replace(".json", "_cube.json")
+    framework_file = index_file_for(output_file)
+    top_file = top_file_for(output_file)
+    snapshot_file = os.path.join(runs_dir, f"{run_id}.parquet") if runs_dir else None
+    run_file = f"{register_file}.{run_id}.tmp" if register_file else None
+    if runs_dir:
+        os.makedirs(runs_dir, exist_ok=True)
     
-    for idx, finding in enumerate(prowler_findings, 1):
-        try:
-            if idx % 50 == 0:
-                print(f"   → Processing {idx}/{len(prowler_findings)} findings...")
-            
-            resources = finding.get("resources", [])
-            if not resources:
+    source_rows, total_findings, total_cents = 0, 0, 0
+    severity_counts = Counter()
+    cube = build_risk_cube(pd.DataFrame())
+    top_risks = TopK(TOP_RISKS, "ale")
+    with ExitStack() as stack:
+        frameworks = stack.enter_context(FrameworkIndexBuilder(budget // 2 if budget else None))
+        report_out = stack.enter_context(open(f"{output_file}.tmp", "w"))
+        register_out = stack.enter_context(open(run_file, "w")) if run_file else None
+        snapshot = stack.enter_context(pq.ParquetWriter(f"{snapshot_file}.tmp", RECORD_SCHEMA)) if snapshot_file else None
+        
+        for findings in iter_findings(prowler_file, batch_rows=batch_rows):
+            source_rows += findings.num_rows
+            risk_records = []
+            for idx, finding in enumerate(select_scored_findings(findings).to_pylist(), total_findings + 1):
+                try:
+                    risk_records.append(score_finding(finding, steampipe_assets, run_id))
+                except Exception as e:
+                    print(f"Skipping finding {idx}: {str(e)[:80]}...")
+            if not risk_records:
                 continue
             
-            resource = resources[0]
-            r_uid = resource.get("uid", "unknown")
-            r_name = resource.get("name", "")
-            r_type = resource.get("type", "")
-            r_metadata = resource.get("data", {}).get("metadata", {})
-            
-            if "<root_account>" in r_uid:
-                r_name = "Root Account"
-            
-            context = get_resource_context(
-                r_uid, r_name, r_type, r_metadata,finding, steampipe_assets
-            )
-            
-            severity = finding.get("severity", "High")
-            threat_frequency = THREAT_EVENT_FREQUENCY_DAYS.get(severity, 0.15)
-            loss_magnitude = LOSS_MAGNITUDE_MAP_DOLLARS.get(context["class"], 10_000)
-            control_effectiveness = calculate_control_effectiveness(finding)
-            
-            ale = calculate_ale(loss_magnitude, threat_frequency, control_effectiveness)
-            
-            unmapped = finding.get("unmapped", {})
-            compliance = unmapped.get("compliance", {}) if isinstance(unmapped, dict) else {}
-            frameworks = list(compliance.keys()) if isinstance(compliance, dict) else []
+            df = pd.DataFrame(risk_records)
+            total_findings += len(risk_records)
+            total_cents += int(ale_cents(df["ale"]).sum())
+            severity_counts.update(df["severity"])
+            cube = merge_risk_cubes([cube, build_risk_cube(df)])
+            frameworks.add(df["compliance_map"], df["ale"])
             
-            nist_controls = []
-            if isinstance(compliance, dict):
-                nist_controls = compliance.get("NIST-CSF-2.0", []) or \
-                              compliance.get("NIST-800-53-Revision-5", []) or \
-                              compliance.get("NIST-800-53-Revision-4", []) or \
-                              compliance.get("NIST-CSF-1.1", [])
-            
-            primary_control = nist_controls[0] if nist_controls else "SC-7"
-            
-            record = {
-                "asset": r_name,
-                "asset_uid": r_uid,
-                "asset_type": r_type,
-                "service": context["service"],
-                "severity": severity,
-                "classification": context["class"],
-                "is_public": context["is_public"],
-                "is_active": context["is_active"],
-                "retention_days": context["retention"],
-                "soft_delete": context["soft_delete"],
-                "threat_frequency": threat_frequency,
-                "loss_magnitude": loss_magnitude,
-                "control_effectiveness": round(control_effectiveness, 2),
-                "ale": round(ale, 2),
-                "control": primary_control,
-                "compliance": ", ".join(frameworks[:5]),
-                "finding_code": finding.get("metadata", {}).get("event_code", ""),
-                "risk_details": finding.get("risk_details", "")[:200],
-                "remediation": finding.get("remediation", {}).get("desc", "")[:200],
-                "region": resource.get("region", "unknown"),
-                "cloud_provider": finding.get("cloud", {}).get("provider", "aws"),
-                "account_id": finding.get("cloud", {}).get("account", {}).get("uid", "unknown"),
-                "status": finding.get("status_code", "FAIL"),
-                "created_time": finding.get("finding_info", {}).get("created_time_dt", "")
-            }
-            
-            risk_records.append(record)
-            
-        except Exception as e:
-            print(f"Skipping finding {idx}: {str(e)[:80]}...")
-            continue
-    
-    df = pd.DataFrame(risk_records)
+            report_out.write(json_array_chunk(risk_records, first=total_findings == len(risk_records)))
+            batch = pa.Table.from_pylist(risk_records, schema=RECORD_SCHEMA)
+            if register_out:
+                register_out.write("".join(json.dumps(record, default=str) + "\n" for record in risk_records))
+            if snapshot:
+                snapshot.write_table(batch)
+            top_risks.append(batch)
+            print(f"   → Scored {total_findings} findings...")
+        
+        report_out.write("\n]" if total_findings else "[]")
+        # Built inside the stack: spilled postings are read back from disk and removed once saved
+        frameworks.build().save(f"{framework_file}.tmp.npz")
+        spills = frameworks.spills
     
     summary = {
-        "total_findings": len(risk_records),
-        "total_ale": round(df["ale"].sum(), 2) if not df.empty else 0,
-        "avg_ale": round(df["ale"].mean(), 2) if not df.empty else 0,
-        "critical_count": int((df["severity"] == "Critical").sum()) if not df.empty else 0,
-        "high_count": int((df["severity"] == "High").sum()) if not df.empty else 0,
-        "medium_count": int((df["severity"] == "Medium").sum()) if not df.empty else 0,
-        "low_count": int((df["severity"] == "Low").sum()) if not df.empty else 0,
+        "total_findings": total_findings,
+        "total_ale": round(total_cents / 100, 2) if total_findings else 0,
+        "avg_ale": round(total_cents / 100 / total_findings, 2) if total_findings else 0,
+        "critical_count": severity_counts["Critical"],
+        "high_count": severity_counts["High"],
+        "medium_count": severity_counts["Medium"],
+        "low_count": severity_counts["Low"],
+        "run_id": run_id,
         "generated_at": datetime.now().isoformat(),
         "methodology": "FAIR (Factor Analysis of Information Risk)",
         "sources": {
-            "prowler_findings": len(prowler_findings),
+            "prowler_findings": source_rows,
             "steampipe_assets": len(steampipe_assets)
-        }
+        },
+        "framework_spills": spills
     }
     
     print("\n" + "=" * 80)
@@ -399,21 +704,51 @@ def generate_risk_quantification_report(prowler_file: str, steampipe_file: str,
     print(f"Average ALE:        ${summary['avg_ale']:>12,.2f}")
     print("=" * 80)
     
-    with open(output_file, "w") as f:
-        json.dump(risk_records, f, indent=2, default=str)
+    os.replace(f"{output_file}.tmp", output_file)
     
-    summary_file = output_file.replace(".json", "_summary.json")
     with open(summary_file, "w") as f:
         json.dump(summary, f, indent=2, default=str)
     
+    write_risk_cube(cube, cube_file, run_id)
+    write_top_risks(top_risks.top_k(), top_file, run_id)
+    os.replace(f"{framework_file}.tmp.npz", framework_file)
+    
+    if register_file:
+        append_to_register(run_file, register_file, run_id)
+    
+    if snapshot_file:
+        os.replace(f"{snapshot_file}.tmp", snapshot_file)
+        prune_run_snapshots(runs_dir)
+    
     print(f"\nMain report saved: {output_file}")
     print(f"Summary statistics: {summary_file}")
+    print(f"Risk cube: {cube_file}")
+    print(f"Top risks: {top_file}")
+    print(f"Framework index: {framework_file}")
+    if register_file:
+        print(f"Appended run {run_id} to register: {register_file}")
+    if snapshot_file:
+        print(f"Run snapshot: {snapshot_file}")
+    if spills:
+        print(f"Framework postings spilled to disk {spills} times under the memory budget")
     
-    return risk_records, summary
+    return summary
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FAIR risk quantification over normalized Prowler findings")
+    parser.add_argument("--findings", default=FINDINGS_FILE)
+    parser.add_argument("--steampipe", default="steampipe_tags1.ndjson")
+    parser.add_argument("--output", default="risk_quantification_report.json")
+    parser.add_argument("--memory-budget", help="e.g. 2G; scoring batches are sized to half of it and framework "
+                                                "postings beyond the other half spill to disk (default: "
+                                                "$GRC_MEMORY_BUDGET, else unlimited). The Steampipe inventory "
+                                                "is still loaded whole")
+    args = parser.parse_args()
+
     generate_risk_quantification_report(
-        prowler_file="filtered_prowler_findings1.json",
-        steampipe_file="steampipe_tags1.json",
-        output_file="risk_quantification_report.json"
+        prowler_file=args.findings,
+        steampipe_file=args.steampipe,
+        output_file=args.output,
+        budget=args.memory_budget
     )
@@ -0,0 +1,340 @@
+import argparse
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from json_stream import iter_json_records
+
+REGISTER_TABLE = "risk_register"
+REGISTER_DATABASE = "GRC_RISK"
+CHUNK_SIZE = 5000
+POOL_SIZE = 4
+DEADLOCK_RETRIES = 3
+
+KEY_COLUMNS = ("run_id", "asset_uid", "finding_code")
+
+# (column, SQL Server type, SQLite type, max length for bounded text columns)
+# Key columns longer than their width are hashed, other bounded text is clipped; MAX columns are kept whole
+REGISTER_COLUMNS = [
+    ("run_id", "NVARCHAR(64) NOT NULL", "TEXT NOT NULL", 64),
+    ("asset_uid", "NVARCHAR(256) NOT NULL", "TEXT NOT NULL", 256),
+    ("finding_code", "NVARCHAR(128) NOT NULL", "TEXT NOT NULL", 128),
+    ("asset", "NVARCHAR(256)", "TEXT", 256),
+    ("asset_type", "NVARCHAR(128)", "TEXT", 128),
+    ("service", "NVARCHAR(64)", "TEXT", 64),
+    ("severity", "NVARCHAR(16)", "TEXT", 16),
+    ("classification", "NVARCHAR(64)", "TEXT", 64),
+    ("is_public", "BIT", "INTEGER", None),
+    ("is_active", "BIT", "INTEGER", None),
+    ("retention_days", "INT", "INTEGER", None),
+    ("soft_delete", "BIT", "INTEGER", None),
+    ("threat_frequency", "FLOAT", "REAL", None),
+    ("loss_magnitude", "FLOAT", "REAL", None),
+    ("control_effectiveness", "FLOAT", "REAL", None),
+    ("ale", "FLOAT", "REAL", None),
+    ("control", "NVARCHAR(64)", "TEXT", 64),
+    ("compliance", "NVARCHAR(MAX)", "TEXT", None),
+    ("compliance_map", "NVARCHAR(MAX)", "TEXT", None),
+    ("risk_details", "NVARCHAR(256)", "TEXT", 256),
+    ("remediation", "NVARCHAR(256)", "TEXT", 256),
+    ("region", "NVARCHAR(64)", "TEXT", 64),
+    ("cloud_provider", "NVARCHAR(32)", "TEXT", 32),
+    ("account_id", "NVARCHAR(64)", "TEXT", 64),
+    ("status", "NVARCHAR(16)", "TEXT", 16),
+    ("created_time", "NVARCHAR(64)", "TEXT", 64),
+]
+COLUMN_NAMES = [column[0] for column in REGISTER_COLUMNS]
+# Columns widened to NVARCHAR(MAX) after the register was first created
+WIDENED_COLUMNS = ("compliance",)
+
+# Secondary indexes for the BI queries: latest run by severity/ALE, drill-down by service and account
+REGISTER_INDEXES = {
+    "ix_risk_register_run_severity": ("run_id", "severity"),
+    "ix_risk_register_run_ale": ("run_id", "ale"),
+    "ix_risk_register_service": ("service", "classification"),
+    "ix_risk_register_account": ("account_id", "region"),
+}
+
+
+def key_value(value: str, max_len: int) -> str:
+    """
+    Key text that fits its column: long values keep a readable prefix plus the SHA-256 of the full value
+    In narrow columns (e.g. run_id, 64) the hex digest is cut to half the column so the prefix stays readable
+    """
+    if len(value) <= max_len:
+        return value
+    digest = hashlib.sha256(value.encode()).hexdigest()[:max_len // 2]
+    return f"{value[:max(0, max_len - len(digest) - 1)]}#{digest}"
+
+
+def record_to_row(record: Dict[str, Any], run_id: str) -> Tuple:
+    """
+    Risk record -> parameter tuple in REGISTER_COLUMNS order
+    Over-long key text is hashed (never clipped into another asset's key), other bounded text is clipped,
+    and JSON values such as compliance_map are stored as JSON text
+    """
+    row = []
+    for name, _, _, max_len in REGISTER_COLUMNS:
+        val = run_id if name == "run_id" else record.get(name)
+        if name in KEY_COLUMNS:
+            val = key_value("" if val is None else str(val), max_len)
+        elif max_len is not None:
+            val = "" if val is None else str(val)[:max_len]
+        elif isinstance(val, bool):
+            val = int(val)
+        elif isinstance(val, (dict, list)):
+            val = json.dumps(val, sort_keys=True)
+        row.append(val)
+    return tuple(row)
+
+
+def _dedupe(rows: List[Tuple]) -> List[Tuple]:
+    """Last row wins per (run_id, asset_uid, finding_code); MERGE rejects duplicate source keys"""
+    return list({row[:len(KEY_COLUMNS)]: row for row in rows}.values())
+
+
+class ConnectionPool:
+    """Small fixed-size pool; connections are created lazily and reused across chunks"""
+
+    def __init__(self, connect: Callable[[], Any], size: int):
+        self.connect = connect
+        self.size = size
+        self.idle: "queue.Queue" = queue.Queue()
+        self.all = []
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = len(self.all) < self.size
+                if create:
+                    self.all.append(None)
+            if not create:
+                return self.idle.get()
+            conn = self.connect()
+            with self.lock:
+                self.all[self.all.index(None)] = conn
+            return conn
+
+    def putconn(self, conn):
+        self.idle.put(conn)
+
+    def closeall(self):
+        for conn in self.all:
+            if conn is not None:
+                conn.close()
+
+
+class SQLiteRegister:
+    """Local DB-API stand-in: same schema and upsert semantics via INSERT ... ON CONFLICT"""
+
+    name = "sqlite"
+    pool_size = 1  # SQLite serializes writers
+
+    def __init__(self, path: str, table: str = REGISTER_TABLE):
+        self.path = path
+        self.table = table
+
+    def connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def create_schema(self, conn):
+        columns = ",\n    ".join(f'"{name}" {sqlite_type}' for name, _, sqlite_type, _ in REGISTER_COLUMNS)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{self.table}" (
+                {columns},
+                "loaded_at" TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY ({", ".join(KEY_COLUMNS)})
+            )""")
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{self.table}")')}
+        for name, _, sqlite_type, _ in REGISTER_COLUMNS:
+            if name not in existing:
+                conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{name}" {sqlite_type}')
+        for index, columns in REGISTER_INDEXES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{index}" ON "{self.table}" ({", ".join(columns)})')
+        conn.commit()
+
+    def upsert_chunk(self, conn, rows: List[Tuple]):
+        updates = ", ".join(f'"{name}" = excluded."{name}"' for name in COLUMN_NAMES if name not in KEY_COLUMNS)
+        conn.executemany(f"""
+            INSERT INTO "{self.table}" ({", ".join(f'"{name}"' for name in COLUMN_NAMES)})
+            VALUES ({", ".join("?" for _ in COLUMN_NAMES)})
+            ON CONFLICT ({", ".join(KEY_COLUMNS)}) DO UPDATE SET {updates}, "loaded_at" = CURRENT_TIMESTAMP
+        """, rows)
+        conn.commit()
+
+
+class SQLServerRegister:
+    """
+    SQL Server target: each chunk is bulk-bound into a session temp table with fast_executemany
+    (one parameter array per round trip), then MERGEd into the register in the same transaction
+    """
+
+    name = "mssql"
+    pool_size = POOL_SIZE
+
+    def __init__(self, database: str = REGISTER_DATABASE, table: str = REGISTER_TABLE):
+        self.database = database
+        self.table = table
+
+    def connect(self):
+        import pyodbc
+        from connection import build_connection_string
+
+        conn = pyodbc.connect(build_connection_string(self.database), autocommit=False)
+        cursor = conn.cursor()
+        columns = ", ".join(f"[{name}] {mssql_type}" for name, mssql_type, _, _ in REGISTER_COLUMNS)
+        cursor.execute(f"CREATE TABLE #{self.table}_stage ({columns})")
+        conn.commit()
+        return conn
+
+    def create_database(self):
+        import pyodbc
+        from connection import build_connection_string
+
+        conn = pyodbc.connect(build_connection_string(), autocommit=True)
+        conn.cursor().execute(f"IF DB_ID(N'{self.database}') IS NULL CREATE DATABASE [{self.database}]")
+        conn.close()
+
+    def create_schema(self, conn):
+        cursor = conn.cursor()
+        columns = ",\n    ".join(f"[{name}] {mssql_type}" for name, mssql_type, _, _ in REGISTER_COLUMNS)
+        cursor.execute(f"""
+            IF OBJECT_ID(N'dbo.{self.table}', N'U') IS NULL
+            CREATE TABLE dbo.[{self.table}] (
+                {columns},
+                [loaded_at] DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+                CONSTRAINT [pk_{self.table}] PRIMARY KEY CLUSTERED ({", ".join(KEY_COLUMNS)})
+            )""")
+        for name, mssql_type, _, _ in REGISTER_COLUMNS:
+            cursor.execute(f"""
+                IF COL_LENGTH(N'dbo.{self.table}', N'{name}') IS NULL
+                ALTER TABLE dbo.[{self.table}] ADD [{name}] {mssql_type}""")
+        for name in WIDENED_COLUMNS:
+            cursor.execute(f"""
+                IF COL_LENGTH(N'dbo.{self.table}', N'{name}') <> -1
+                ALTER TABLE dbo.[{self.table}] ALTER COLUMN [{name}] NVARCHAR(MAX)""")
+        for index, columns in REGISTER_INDEXES.items():
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{index}')
+                CREATE NONCLUSTERED INDEX [{index}] ON dbo.[{self.table}] ({", ".join(columns)})""")
+        conn.commit()
+
+    def upsert_chunk(self, conn, rows: List[Tuple]):
+        stage = f"#{self.table}_stage"
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        cursor.execute(f"TRUNCATE TABLE {stage}")
+        cursor.executemany(
+            f"INSERT INTO {stage} ({', '.join(f'[{name}]' for name in COLUMN_NAMES)}) "
+            f"VALUES ({', '.join('?' for _ in COLUMN_NAMES)})", rows)
+        on = " AND ".join(f"t.[{name}] = s.[{name}]" for name in KEY_COLUMNS)
+        updates = ", ".join(f"t.[{name}] = s.[{name}]" for name in COLUMN_NAMES if name not in KEY_COLUMNS)
+        cursor.execute(f"""
+            MERGE dbo.[{self.table}] WITH (HOLDLOCK) AS t
+            USING {stage} AS s ON {on}
+            WHEN MATCHED THEN UPDATE SET {updates}, t.[loaded_at] = SYSUTCDATETIME()
+            WHEN NOT MATCHED THEN INSERT ({", ".join(f"[{name}]" for name in COLUMN_NAMES)})
+                VALUES ({", ".join(f"s.[{name}]" for name in COLUMN_NAMES)});""")
+        conn.commit()
+
+
+def _chunks(rows: Iterable[Tuple], size: int) -> Iterator[List[Tuple]]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _is_deadlock(error: Exception) -> bool:
+    return bool(error.args) and (error.args[0] == "40001" or "deadlock" in str(error).lower())
+
+
+def load_risk_register(report_file: str, register, run_id: str = None,
+                       chunk_size: int = CHUNK_SIZE, pool_size: int = None) -> Dict[str, Any]:
+    """
+    Stream risk_quantification_report.json into the register, one transaction per chunk
+    Chunks are upserted on (run_id, asset_uid, finding_code) in parallel over a small connection pool,
+    so re-loading a run replaces its rows instead of duplicating them. Rows carry each record's own
+    run_id; `run_id` overrides it, and the load time is used only for records without one
+    """
+    fallback_run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    pool = ConnectionPool(register.connect, pool_size or register.pool_size)
+    started = time.time()
+    stats = {"run_ids": set(), "rows": 0, "chunks": 0, "retries": 0}
+
+    def to_row(record):
+        row_run_id = run_id or record.get("run_id") or fallback_run_id
+        stats["run_ids"].add(row_run_id)
+        return record_to_row(record, row_run_id)
+
+    def load_chunk(rows):
+        conn = pool.getconn()
+        try:
+            for attempt in range(DEADLOCK_RETRIES + 1):
+                try:
+                    register.upsert_chunk(conn, rows)
+                    return len(rows), attempt
+                except Exception as e:
+                    conn.rollback()
+                    if attempt == DEADLOCK_RETRIES or not _is_deadlock(e):
+                        raise
+        finally:
+            pool.putconn(conn)
+
+    try:
+        if hasattr(register, "create_database"):
+            register.create_database()
+        conn = pool.getconn()
+        register.create_schema(conn)
+        pool.putconn(conn)
+
+        rows = (to_row(record) for record in iter_json_records(report_file))
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            # Bounded in-flight window keeps memory at ~2 x pool size chunks
+            pending = []
+            for chunk in _chunks(rows, chunk_size):
+                pending.append(executor.submit(load_chunk, _dedupe(chunk)))
+                if len(pending) >= 2 * pool.size:
+                    loaded, retries = pending.pop(0).result()
+                    stats["rows"] += loaded
+                    stats["retries"] += retries
+                    stats["chunks"] += 1
+            for future in pending:
+                loaded, retries = future.result()
+                stats["rows"] += loaded
+                stats["retries"] += retries
+                stats["chunks"] += 1
+    finally:
+        pool.closeall()
+
+    stats["run_ids"] = sorted(stats["run_ids"])
+    stats["seconds"] = round(time.time() - started, 2)
+    print(f"Loaded {stats['rows']} risk records into {register.name}:{register.table} "
+          f"(run {', '.join(stats['run_ids']) or '-'}, {stats['chunks']} chunks, {stats['seconds']}s)")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load the risk register into SQL Server (or SQLite)")
+    parser.add_argument("report", nargs="?", default="risk_quantification_report.json")
+    parser.add_argument("--run-id", help="Override the records' run_id (records without one get the load timestamp)")
+    parser.add_argument("--database", default=REGISTER_DATABASE)
+    parser.add_argument("--sqlite", metavar="PATH", help="Load into a local SQLite file instead of SQL Server")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--pool-size", type=int)
+    args = parser.parse_args()
+
+    register = SQLiteRegister(args.sqlite) if args.sqlite else SQLServerRegister(args.database)
+    load_risk_register(args.report, register, args.run_id, args.chunk_size, args.pool_size)
@@ -1,56 +1,444 @@
 import psycopg2
-import json,time
+import yaml
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+import argparse,hashlib,json,os,time,threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from decimal import Decimal
 
-def fetch_multicloud_tags():
-    connection_params = {
-        "database": "steampipe",
-        "user": "steampipe",
-        "password": "", 
-        "host": "127.0.0.1",
-        "port": "9193"
-    }
+from json_stream import iter_json_records
+from normalize_findings import FINDINGS_FILE, load_findings
 
-    try:
-        conn = psycopg2.connect(**connection_params)
-        cursor = conn.cursor()
-
-        result = {}
-
-        queries = {
-            "AWS S3 Buckets": "SELECT name, tags FROM aws_s3_bucket WHERE name = 'grc-backup-legacy-vault';",
-            "AWS RDS Instances": "SELECT db_instance_identifier,publicly_accessible FROM aws_rds_db_instance;", 
-            "AWS CloudWatch Group": "SELECT arn, retention_in_days FROM aws_cloudwatch_log_group;",
-            "AWS IAM User":"SELECT arn,attached_policy_arns,create_date FROM aws_iam_user WHERE arn = 'arn:aws:iam::869935106430:user/Aws_backup_user';",
-            "AWS DataSync Task":"SELECT arn, status, source_location_arn, destination_location_arn FROM aws_datasync_task;",
-
-            "Azure Monitor":"SELECT id, retention_in_days FROM azure_log_analytics_workspace;",
-            "Azure Service Principal":"SELECT display_name, app_id, account_enabled, service_principal_type FROM azuread_service_principal WHERE app_id = '1a91fb94-6db9-4906-a3a2-bdb94ed93a78';",
-            "Azure Data Factory":"SELECT name, resource_group, provisioning_state, public_network_access FROM azure_data_factory;",
-            "Azure Storage Accounts": "SELECT name, allow_blob_public_access,blob_soft_delete_enabled FROM azure_storage_account WHERE name = 'grcmigrationdst';",
-            "Azure MSSQL Servers": "SELECT name, public_network_access FROM azure_sql_server WHERE name = 'grc-target-sql-server';"
+CONNECTION_PARAMS = {
+    "database": os.getenv("STEAMPIPE_DATABASE", "steampipe"),
+    "user": os.getenv("STEAMPIPE_USER", "steampipe"),
+    "password": os.getenv("STEAMPIPE_DATABASE_PASSWORD", ""),
+    "host": os.getenv("STEAMPIPE_HOST", "127.0.0.1"),
+    "port": os.getenv("STEAMPIPE_PORT", "9193")
+}
+MAX_CONNECTIONS = 5
+QUERY_TIMEOUT_SECONDS = 120
+FETCH_BATCH_SIZE = 2000
+TAGS_SCHEMA = "grc.steampipe.tags/v2"
+SNAPSHOT_DIR = ".grc_cache/steampipe_snapshot"
+SNAPSHOT_INDEX = "index.json"
+DELTA_FILE = "steampipe_tags_delta.json"
+CATALOGUE_FILE = "steampipe_queries.yaml"
+
+
+def load_catalogue(path=CATALOGUE_FILE):
+    """Read and validate the declarative query catalogue"""
+    with open(path, 'r') as f:
+        catalogue = yaml.safe_load(f) or {}
+    for resource_type, spec in catalogue.get("tables", {}).items():
+        missing = [field for field in ("table", "key", "columns") if not spec.get(field)]
+        if missing:
+            raise ValueError(f"Catalogue entry '{resource_type}' is missing {', '.join(missing)}")
+    return catalogue
+
+
+def collect_targets(prowler_file):
+    """Distinct resource UIDs referenced by the current Prowler findings (normalized table or raw JSON)"""
+    if prowler_file.endswith(".parquet"):
+        uids = load_findings(prowler_file, columns=["resource_uid"]).column("resource_uid").to_pylist()
+        return sorted(set(uid for uid in uids if uid))
+    targets = set()
+    for finding in iter_json_records(prowler_file):
+        for resource in finding.get("resources", []):
+            if resource.get("uid"):
+                targets.add(resource["uid"])
+    return sorted(targets)
+
+
+def _scope_values(resource_type, column, values):
+    """
+    Static scope filter values; a "$NAME" string is read from the environment as a comma-separated list
+    Returns None (table skipped) when the variable is unset, so deployment-specific IDs stay out of the repo
+    """
+    if isinstance(values, str) and values.startswith("$"):
+        variable = values[1:]
+        values = [value.strip() for value in os.getenv(variable, "").split(",") if value.strip()]
+        if not values:
+            print(f"Warning: {variable} is not set, skipping '{resource_type}' (scope on {column})")
+            return None
+    return list(values)
+
+
+def build_queries(catalogue, targets=None):
+    """
+    Compile catalogue entries into parameterized SQL, one statement per table
+    Returns {resource_type: {"sql", "params", "query_hash", "ttl_seconds"}}; with targets,
+    tables that have a match column only receive the UIDs meant for them and are left out if there are none
+    """
+    default_ttl = catalogue.get("defaults", {}).get("ttl_hours", 5)
+    queries = {}
+    for resource_type, spec in catalogue.get("tables", {}).items():
+        filters = {column: _scope_values(resource_type, column, values)
+                   for column, values in (spec.get("scope") or {}).items()}
+        if None in filters.values():
+            continue
+        lowered = set()
+        if spec.get("match") and targets is not None:
+            needle = spec.get("uid_contains", "").lower()
+            table_targets = [uid for uid in targets if needle in uid.lower()]
+            if not table_targets:
+                continue
+            if spec.get("ignore_case"):
+                table_targets = sorted(set(uid.lower() for uid in table_targets))
+                lowered.add(spec["match"])
+            filters[spec["match"]] = table_targets
+
+        statement = sql.SQL("SELECT {columns} FROM {table}").format(
+            columns=sql.SQL(", ").join(sql.Identifier(column) for column in [spec["key"], *spec["columns"]]),
+            table=sql.Identifier(spec["table"]))
+        if filters:
+            statement += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(
+                sql.SQL("lower({}) = ANY(%s)" if column in lowered else "{} = ANY(%s)").format(sql.Identifier(column))
+                for column in filters)
+        params = [list(values) for values in filters.values()]
+
+        queries[resource_type] = {
+            "sql": statement,
+            "params": params,
+            "query_hash": _content_hash({"table": spec["table"], "columns": [spec["key"], *spec["columns"]],
+                                         "filters": filters, "ignore_case": sorted(lowered)}),
+            "ttl_seconds": spec.get("ttl_hours", default_ttl) * 3600,
         }
+    return queries
+
+
+def _json_default(value):
+    """Keep Postgres types lossless in JSON: timestamps as ISO-8601, numerics as numbers"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+
+def _content_hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+class TableCollector:
+    """
+    Spills each table's rows to its own NDJSON file as every page arrives
+    Lines are [name, columns]; nothing is buffered beyond the page being written
+    """
+
+    def __init__(self, spill_dir):
+        self.spill_dir = spill_dir
+        self.files = {}
+        self.lock = threading.Lock()
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def path_for(self, resource_type):
+        return os.path.join(self.spill_dir, f"{_content_hash(resource_type)[:16]}.ndjson")
+
+    def write_rows(self, resource_type, columns, rows):
+        with self.lock:
+            handle = self.files.get(resource_type)
+            if handle is None:
+                handle = self.files[resource_type] = open(self.path_for(resource_type), "w")
+        # One query per table, so only its own worker thread ever writes to this handle
+        for row in rows:
+            handle.write(json.dumps([str(row[0]), dict(zip(columns[1:], row[1:]))], default=_json_default) + "\n")
+
+    def rows(self, resource_type):
+        """Spilled (name, columns) pairs of one table, in arrival order"""
+        handle = self.files.get(resource_type)
+        if handle is None:
+            return
+        handle.flush()
+        with open(self.path_for(resource_type), "r") as f:
+            for line in f:
+                name, columns = json.loads(line)
+                yield name, columns
+
+    def close(self):
+        for resource_type, handle in self.files.items():
+            handle.close()
+            os.remove(self.path_for(resource_type))
+        self.files.clear()
+
+
+class DeltaLog:
+    """Added/changed/removed resources spilled to NDJSON as they are found, then streamed into the delta file"""
+
+    KINDS = ("added", "changed", "removed")
+
+    def __init__(self, spill_dir):
+        os.makedirs(spill_dir, exist_ok=True)
+        self.paths = {kind: os.path.join(spill_dir, f"delta_{kind}.ndjson") for kind in self.KINDS}
+        self.files = {kind: open(path, "w") for kind, path in self.paths.items()}
+        self.counts = dict.fromkeys(self.KINDS, 0)
 
+    def record(self, kind, entry):
+        self.files[kind].write(json.dumps(entry, default=_json_default) + "\n")
+        self.counts[kind] += 1
 
-        for resource_type, sql in queries.items():
-            cursor.execute(sql)
-            results = cursor.fetchall()
-            
+    def write(self, output_file, header):
+        """Delta JSON document: header fields, then one array per kind, one entry per line"""
+        tmp_file = f"{output_file}.tmp"
+        with open(tmp_file, "w") as out:
+            out.write(json.dumps(header, default=_json_default)[:-1])
+            for kind in self.KINDS:
+                self.files[kind].flush()
+                out.write(f', "{kind}": [')
+                with open(self.paths[kind], "r") as f:
+                    for i, line in enumerate(f):
+                        out.write(("," if i else "") + "\n  " + line.rstrip("\n"))
+                out.write("\n]" if self.counts[kind] else "]")
+            out.write("}\n")
+        os.replace(tmp_file, output_file)
+
+    def close(self):
+        for kind, handle in self.files.items():
+            handle.close()
+            os.remove(self.paths[kind])
+
+
+class InventorySnapshot:
+    """
+    Last known inventory: an index.json of per-table refresh state plus one NDJSON file per table
+    with a {"name", "hash", "collected_at", "changed_at", "columns"} line per resource.
+    Tables are diffed and rewritten one at a time, so memory is bounded by the largest table's
+    name -> hash index rather than by the whole inventory
+    """
+
+    def __init__(self, path=SNAPSHOT_DIR):
+        self.path = path
+        self.tables = {}
+        try:
+            with open(os.path.join(path, SNAPSHOT_INDEX), 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: inventory snapshot unreadable, running full sync: {e}")
+            return
+        if data.get("schema") == TAGS_SCHEMA:
+            self.tables = {resource_type: table for resource_type, table in data.get("tables", {}).items()
+                           if os.path.exists(os.path.join(path, table["file"]))}
+
+    def is_fresh(self, resource_type, query_hash, ttl_seconds, now):
+        table = self.tables.get(resource_type)
+        return (table is not None and table["query_hash"] == query_hash
+                and now - table["refreshed_at"] < ttl_seconds)
+
+    def entries(self, resource_type):
+        """Stored resource entries of one table, streamed from its file"""
+        table = self.tables.get(resource_type)
+        if table is None:
+            return
+        with open(os.path.join(self.path, table["file"]), 'r') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def apply(self, resource_type, query_hash, records, now, delta):
+        """
+        Replace one table with freshly collected records, appending added/changed/removed to delta
+        `records` is a callable returning a fresh (name, columns) iterator; it is read twice and the
+        last row for a name wins
+        """
+        collected_at = datetime.fromtimestamp(now).isoformat()
+        latest = {name: _content_hash(columns) for name, columns in records()}
+        previous = {entry["name"]: (entry["hash"], entry["changed_at"]) for entry in self.entries(resource_type)}
+        changed = {name for name, digest in latest.items() if name in previous and previous[name][0] != digest}
+        removed = previous.keys() - latest.keys()
+        previous_columns = {entry["name"]: entry["columns"] for entry in self.entries(resource_type)
+                            if entry["name"] in changed}
+
+        os.makedirs(self.path, exist_ok=True)
+        filename = f"{_content_hash(resource_type)[:16]}-{int(now * 1000)}.ndjson"
+        written = 0
+        with open(os.path.join(self.path, filename), "w") as f:
+            for name, columns in records():
+                digest = _content_hash(columns)
+                if latest.get(name) != digest:
+                    continue
+                del latest[name]
+                if name not in previous:
+                    delta.record("added", {"resource_type": resource_type, "name": name, "columns": columns})
+                    changed_at = collected_at
+                elif name in changed:
+                    delta.record("changed", {"resource_type": resource_type, "name": name,
+                                             "columns": columns, "previous": previous_columns[name]})
+                    changed_at = collected_at
+                else:
+                    changed_at = previous[name][1]
+                f.write(json.dumps({"name": name, "hash": digest, "collected_at": collected_at,
+                                    "changed_at": changed_at, "columns": columns}) + "\n")
+                written += 1
+        for name in removed:
+            delta.record("removed", {"resource_type": resource_type, "name": name})
+        self.tables[resource_type] = {"query_hash": query_hash, "refreshed_at": now, "file": filename,
+                                      "resources": written}
+        return written
+
+    def drop_tables(self, keep, delta):
+        """Forget tables no longer queried; their resources count as removed"""
+        for resource_type in list(self.tables.keys() - set(keep)):
+            for entry in self.entries(resource_type):
+                delta.record("removed", {"resource_type": resource_type, "name": entry["name"]})
+            del self.tables[resource_type]
+
+    def save(self):
+        """Atomically publish the index, then delete table files it no longer references"""
+        os.makedirs(self.path, exist_ok=True)
+        index_path = os.path.join(self.path, SNAPSHOT_INDEX)
+        with open(f"{index_path}.tmp", "w") as f:
+            json.dump({"schema": TAGS_SCHEMA, "tables": self.tables}, f, indent=2)
+        os.replace(f"{index_path}.tmp", index_path)
+        live = {table["file"] for table in self.tables.values()}
+        for name in os.listdir(self.path):
+            if name.endswith(".ndjson") and name not in live:
+                os.remove(os.path.join(self.path, name))
+
+    def write_full_view(self, output_file):
+        """
+        Full inventory as typed NDJSON: a schema header, then one
+        {"resource_type", "name", "collected_at", "columns": {column: value}} line per resource
+        """
+        tmp_file = f"{output_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(json.dumps({"schema": TAGS_SCHEMA, "generated_at": datetime.now().isoformat()}) + "\n")
+            for resource_type in self.tables:
+                for entry in self.entries(resource_type):
+                    f.write(json.dumps({"resource_type": resource_type, "name": entry["name"],
+                                        "collected_at": entry["collected_at"], "columns": entry["columns"]}) + "\n")
+        os.replace(tmp_file, output_file)
+
+
+def run_query(pool, resource_type, query, params, writer, timeout_seconds, batch_size=FETCH_BATCH_SIZE):
+    """
+    Stream one query through a named (server-side) cursor on a pooled connection
+    Only batch_size rows are held client-side at a time; returns the row count
+    """
+    conn = pool.getconn()
+    broken = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET statement_timeout = %s", (int(timeout_seconds * 1000),))
+        row_count = 0
+        with conn.cursor(name=f"grc_tags_{threading.get_ident()}") as cursor:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                columns = [column.name for column in cursor.description]
+                writer.write_rows(resource_type, columns, rows)
+                row_count += len(rows)
+        conn.commit()
+        return row_count
+    except psycopg2.Error:
+        broken = conn.closed != 0
+        if not broken:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=broken)
+
+
+def fetch_multicloud_tags(output_file="steampipe_tags1.ndjson", connection_params=None, queries=None,
+                          catalogue_file=CATALOGUE_FILE, prowler_file=None,
+                          max_connections=MAX_CONNECTIONS, timeout_seconds=QUERY_TIMEOUT_SECONDS,
+                          batch_size=FETCH_BATCH_SIZE, snapshot_dir=SNAPSHOT_DIR, delta_file=DELTA_FILE,
+                          full_refresh=False):
+    """
+    Incrementally sync the Steampipe inventory into a local snapshot
+    Queries come from the catalogue, targeted at the resource UIDs in prowler_file when given.
+    Only tables whose TTL expired (or whose query changed) are re-queried, concurrently through a
+    connection pool; failed tables keep their last known rows. Writes the full typed view to
+    output_file and the added/changed/removed resources of this run to delta_file
+    Returns {resource_type: error} for every table that could not be refreshed
+    """
+    params = connection_params or CONNECTION_PARAMS
+    if queries is None:
+        targets = None
+        if prowler_file and os.path.exists(prowler_file):
+            targets = collect_targets(prowler_file)
+            print(f"Targeting {len(targets)} resources from {prowler_file}")
+        elif prowler_file:
+            print(f"Warning: {prowler_file} not found, running untargeted catalogue queries")
+        queries = build_queries(load_catalogue(catalogue_file), targets)
+
+    snapshot = InventorySnapshot(snapshot_dir)
+    now = time.time()
+    stale = {resource_type: query for resource_type, query in queries.items()
+             if full_refresh or not snapshot.is_fresh(resource_type, query["query_hash"], query["ttl_seconds"], now)}
+
+    pool = None
+    failures = {}
+    spill_dir = os.path.join(snapshot_dir, "spill")
+    collector = TableCollector(spill_dir)
+    delta = DeltaLog(spill_dir)
+
+    try:
+        started = time.time()
+        if stale:
+            pool = ThreadedConnectionPool(1, min(max_connections, len(stale)), **params)
+            with ThreadPoolExecutor(max_workers=max_connections) as executor:
+                futures = {executor.submit(run_query, pool, resource_type, query["sql"], query["params"], collector,
+                                           timeout_seconds, batch_size): resource_type
+                           for resource_type, query in stale.items()}
+                for future in as_completed(futures):
+                    resource_type = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failures[resource_type] = str(e).strip().splitlines()[0] if str(e).strip() else repr(e)
+
+        for resource_type in queries:
             print(f"[{resource_type}]")
-            if not results:
-                print("  No resource found.") #used for error handling 
-            for row in results:
-                name, tags = row[0],[str(item) for item in row[1:]]
-                result[name] = tags 
+            if resource_type not in stale:
+                print("  Fresh, skipped (within TTL)")
+            elif resource_type in failures:
+                print(f"  Query failed, keeping last snapshot: {failures[resource_type]}")
+            else:
+                count = snapshot.apply(resource_type, stale[resource_type]["query_hash"],
+                                       lambda: collector.rows(resource_type), now, delta)
+                print(f"  {count} resources" if count else "  No resource found.") #used for error handling
+        snapshot.drop_tables(queries, delta)
 
-        with open("steampipe_tags1.json","w") as f:
-            json.dump(result,f,indent=4)
+        snapshot.save()
+        snapshot.write_full_view(output_file)
+        delta.write(delta_file, {"schema": TAGS_SCHEMA, "generated_at": datetime.fromtimestamp(now).isoformat(),
+                                 "refreshed": sorted(stale.keys() - failures.keys()),
+                                 "skipped": sorted(queries.keys() - stale.keys()),
+                                 "failed": failures})
+
+        print(f"Refreshed {len(stale) - len(failures)}/{len(queries)} tables in {time.time() - started:.1f}s "
+              f"({len(queries) - len(stale)} within TTL)")
+        print(f"Delta: {delta.counts['added']} added, {delta.counts['changed']} changed, "
+              f"{delta.counts['removed']} removed")
+        if failures:
+            print(f"Partial collection: {len(failures)} queries failed: {', '.join(failures)}")
 
     except Exception as e:
         print(f"Error connecting to Steampipe: {e}")
+        for resource_type in stale or ["steampipe"]:
+            failures.setdefault(resource_type, str(e).strip() or repr(e))
     finally:
-        if conn:
-            cursor.close()
-            conn.close()
+        collector.close()
+        delta.close()
+        if pool:
+            pool.closeall()
+
+    return failures
 
 if __name__ == "__main__":
-    fetch_multicloud_tags()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Incrementally sync Steampipe asset tags")
+    parser.add_argument("--output", default="steampipe_tags1.ndjson")
+    parser.add_argument("--catalogue", default=CATALOGUE_FILE)
+    parser.add_argument("--findings", default=FINDINGS_FILE,
+                        help="Prowler findings whose resource UIDs scope the queries")
+    parser.add_argument("--full-refresh", action="store_true", help="Ignore table TTLs and re-query everything")
+    args = parser.parse_args()
+
+    failures = fetch_multicloud_tags(args.output, catalogue_file=args.catalogue, prowler_file=args.findings,
+                                     full_refresh=args.full_refresh)
+    if failures:
+        raise SystemExit(1)
@@ -1,9 +1,38 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import io
 import json
+import os
+import hashlib
+import threading
 from datetime import datetime
 
+from out_of_core import memory_budget
+from remediation_planner import DEFAULT_BUDGET_HOURS, FRONTIER_POINTS, OPTIONS_FILE, RemediationPlanner
+from risk_drift import DRIFT_FILE, load_drift
+from risk_engine import build_risk_cube, load_risk_cube, load_top_risks, read_register_index, top_file_for
+
+REPORT_FILE = "risk_quantification_report.json"
+REGISTER_FILE = "risk_register.ndjson"
+CUBE_FILE = "risk_quantification_report_cube.json"
+TOP_FILE = top_file_for(REPORT_FILE)
+RELOAD_CHECK_SECONDS = 30
+READ_BLOCK_BYTES = 64 << 20
+INGEST_CHUNK_ROWS = 100_000
+TAIL_CHECK_BYTES = 4096
+FILTER_COLUMNS = ["severity", "classification", "is_public"]
+REGISTER_COLUMNS = ['asset', 'finding_code', 'asset_type', 'service', 'severity', 'classification',
+                    'is_public', 'retention_days', 'soft_delete', 'ale', 'control', 'compliance']
+PAGE_SIZES = [25, 50, 100, 200]
+SCATTER_MAX_POINTS = 2000
+SCATTER_OUTLIERS = 500
+SCATTER_GRID = 40
+LORENZ_MAX_POINTS = 1000
+PARETO_PCT = 80
+PLANNER_PICK_OPTIONS = 500
+
 st.set_page_config(page_title="GRC Risk Analytics Dashboard", layout="wide")
 
 theme = st.sidebar.radio("Select Dashboard Theme", ["High-Contrast Dark", "Professional Light"])
@@ -33,59 +62,381 @@ st.markdown(f"""
     """, unsafe_allow_html=True)
 
 
-@st.cache_data
-def load_grc_data():
-    """Load and preprocess risk quantification data"""
-    try:
-        with open("risk_quantification_report.json", "r") as f:
-            data = json.load(f)
-        df = pd.DataFrame(data)
-        
-        df['is_public'] = df.get('is_public', False)
-        df['retention_days'] = df.get('retention_days', 30)
-        df['severity'] = df.get('severity', 'Medium')
-        df['classification'] = df.get('classification', 'Internal')
-        df['soft_delete'] = df.get('soft_delete', True)
-        df['is_active'] = df.get('is_active', True)
-        df['ale'] = df.get('ale', 0)
-        df['asset'] = df.get('asset', 'Unknown')
+def file_signature(path):
+    """(inode, size, mtime) - a stat-only change check"""
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def prepare_risk_frame(df):
+    """Fill defaults for columns older reports may lack"""
+    df['is_public'] = df.get('is_public', False)
+    df['retention_days'] = df.get('retention_days', 30)
+    df['severity'] = df.get('severity', 'Medium')
+    df['classification'] = df.get('classification', 'Internal')
+    df['soft_delete'] = df.get('soft_delete', True)
+    df['is_active'] = df.get('is_active', True)
+    df['ale'] = df.get('ale', 0)
+    df['asset'] = df.get('asset', 'Unknown')
+    df['service'] = df.get('service', 'unknown')
+    df['region'] = df.get('region', 'unknown')
+    df['account_id'] = df.get('account_id', 'unknown')
+    df['finding_code'] = df.get('finding_code', '')
+    return df
+
+class RiskDataLoader:
+    """
+    Holds the latest risk run in memory and reloads only what changed on disk
+    risk_register.ndjson (append-only, preferred): bytes past the last offset are parsed and appended,
+    switching to a newer run_id when one appears; a cold start seeks to the latest run via the run index
+    risk_quantification_report.json: re-parsed only when its content hash changes
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.source = None
+        self.signature = None
+        self.content_hash = None
+        self.offset = 0
+        self.tail = b""
+        self.run_id = None
+        self.frames = []
+        self.df = pd.DataFrame()
+        self.version = 0
+
+    def _source_file(self):
+        return REGISTER_FILE if os.path.exists(REGISTER_FILE) else REPORT_FILE
+
+    def source_bytes(self):
+        """On-disk bytes refresh() parses: the register from its newest indexed run on, or the whole report"""
+        path = self._source_file()
+        if not os.path.exists(path):
+            return 0
+        size = os.path.getsize(path)
+        if path != REGISTER_FILE:
+            return size
+        with open(REGISTER_FILE, "rb") as f:
+            return size - self._latest_run_offset(f, size)
+
+    def has_changes(self):
+        path = self._source_file()
+        if not os.path.exists(path):
+            return False
+        return path != self.source or file_signature(path) != self.signature
+
+    def refresh(self):
+        """Bring the in-memory run up to date; returns a consistent (df, run_id, version) snapshot"""
+        with self.lock:
+            if self.has_changes():
+                if self._source_file() == REGISTER_FILE:
+                    self._refresh_register()
+                else:
+                    self._refresh_report()
+            return self.df, self.run_id, self.version
+
+    def _publish(self, frames):
+        self.frames = [pd.concat(frames, ignore_index=True)] if len(frames) > 1 else frames
+        self.df = prepare_risk_frame(self.frames[0].copy()) if self.frames else pd.DataFrame()
+        self.version += 1
+
+    def _refresh_report(self):
+        signature = file_signature(REPORT_FILE)
+        digest = file_sha256(REPORT_FILE)
+        if self.source != REPORT_FILE or digest != self.content_hash:
+            with open(REPORT_FILE, "r") as f:
+                df = pd.DataFrame(json.load(f))
+            self.run_id = df['run_id'].iloc[-1] if 'run_id' in df and not df.empty else None
+            self._publish([df])
+        self.source, self.signature, self.content_hash = REPORT_FILE, signature, digest
+
+    def _refresh_register(self):
+        signature = file_signature(REGISTER_FILE)
+        with open(REGISTER_FILE, "rb") as f:
+            appended = (self.source == REGISTER_FILE and signature[0] == self.signature[0]
+                        and signature[1] >= self.offset and self._tail_matches(f))
+            if not appended:
+                self.offset, self.tail, self.run_id, self.frames = self._latest_run_offset(f, signature[1]), b"", None, []
+            
+            f.seek(self.offset)
+            carry = b""
+            for block in iter(lambda: f.read(READ_BLOCK_BYTES), b""):
+                buffer = carry + block
+                end = buffer.rfind(b"\n") + 1
+                if end:
+                    self._ingest(buffer[:end])
+                    self.offset += end
+                    self.tail = (self.tail + buffer[:end])[-TAIL_CHECK_BYTES:]
+                carry = buffer[end:]
+            # A half-written last line stays on disk until the next check
         
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+        self._publish(self.frames)
+        self.source, self.signature = REGISTER_FILE, signature
+
+    def _latest_run_offset(self, f, size):
+        """Where the newest indexed run starts, if the index agrees with the file; else 0 (full scan)"""
+        runs = read_register_index(REGISTER_FILE)
+        if not runs or not 0 < runs[-1]["offset"] < runs[-1]["offset"] + runs[-1]["bytes"] <= size:
+            return 0
+        f.seek(runs[-1]["offset"] - 1)
+        if f.read(1) != b"\n":
+            return 0
+        try:
+            first = json.loads(f.readline())
+        except ValueError:
+            return 0
+        return runs[-1]["offset"] if first.get("run_id", "legacy") == runs[-1]["run_id"] else 0
+
+    def _tail_matches(self, f):
+        f.seek(self.offset - len(self.tail))
+        return f.read(len(self.tail)) == self.tail
+
+    def _ingest(self, data):
+        for frame in pd.read_json(io.BytesIO(data), lines=True, chunksize=INGEST_CHUNK_ROWS, dtype=False):
+            if 'run_id' not in frame:
+                frame['run_id'] = "legacy"
+            for run_id, run_frame in frame.groupby('run_id', sort=False):
+                if run_id != self.run_id:
+                    self.run_id, self.frames = run_id, []
+                self.frames.append(run_frame)
+
+@st.cache_resource
+def get_data_loader():
+    return RiskDataLoader()
+
+@st.cache_data(max_entries=4)
+def load_risk_cube_data(_df, data_key, run_id):
+    """Pre-aggregated cube written by risk_engine.py; rebuilt from the register if it belongs to another run"""
+    if os.path.exists(CUBE_FILE):
+        try:
+            cube = load_risk_cube(CUBE_FILE)
+            if cube.attrs.get("run_id") == run_id:
+                return cube
+        except Exception as e:
+            st.warning(f"Risk cube unreadable, rebuilding from register: {e}")
+    return build_risk_cube(_df)
+
+@st.cache_data(max_entries=2)
+def load_run_summary(cube_signature, top_signature):
+    """
+    Risk cube plus the top findings by ALE of the latest run: all the dashboard loads when the run is
+    larger than the memory budget (GRC_MEMORY_BUDGET)
+    """
+    cube = load_risk_cube(CUBE_FILE)
+    top = load_top_risks(TOP_FILE)
+    if top.attrs.get("run_id") != cube.attrs.get("run_id"):
+        raise ValueError(f"{TOP_FILE} and {CUBE_FILE} belong to different runs; re-run risk_engine.py")
+    return cube, prepare_risk_frame(top)
 
-df = load_grc_data()
+@st.cache_data(max_entries=4)
+def load_drift_data(signature, run_id):
+    """risk_drift.py delta ending at the displayed run (None if missing, first run, or stale)"""
+    drift = load_drift(DRIFT_FILE)
+    if not drift or not drift.get("base_run") or drift["head_run"] != run_id:
+        return None
+    return drift
 
-if df.empty:
+@st.cache_resource(max_entries=2)
+def build_filter_index(_df, data_key):
+    """Categorical codes per filter column plus one packed row bitmap per distinct value"""
+    index = {"rows": len(_df)}
+    for column in FILTER_COLUMNS:
+        codes, categories = pd.factorize(_df[column], sort=True)
+        index[column] = {
+            "codes": codes.astype(np.int16),
+            "categories": categories.tolist(),
+            "bitmaps": {value: np.packbits(codes == code) for code, value in enumerate(categories.tolist())},
+        }
+    return index
+
+@st.cache_data(max_entries=64)
+def resolve_filter_rows(_index, data_key, severities, classifications, public_only):
+    """Row positions matching a filter tuple: OR of value bitmaps within a column, AND across columns"""
+    def union(column, values):
+        bitmaps = _index[column]["bitmaps"]
+        mask = np.zeros((_index["rows"] + 7) // 8, dtype=np.uint8)
+        for value in values:
+            if value in bitmaps:
+                mask |= bitmaps[value]
+        return mask
+    
+    mask = union("severity", severities) & union("classification", classifications)
+    if public_only:
+        mask &= union("is_public", [True])
+    return np.flatnonzero(np.unpackbits(mask, count=_index["rows"]))
+
+def filter_cube(cube, severities, classifications, public_only):
+    keep = cube['severity'].isin(severities) & cube['classification'].isin(classifications)
+    if public_only:
+        keep &= cube['is_public'] == True
+    return cube[keep]
+
+@st.cache_data(max_entries=16)
+def downsample_scatter(_df, data_key, filter_key):
+    """
+    Up to SCATTER_MAX_POINTS findings are plotted as-is. Beyond that the SCATTER_OUTLIERS highest-ALE
+    findings stay exact and the rest collapse into a SCATTER_GRID x SCATTER_GRID retention/ALE grid per exposure
+    """
+    points = _df[['retention_days', 'ale', 'is_public', 'asset']].reset_index(drop=True)
+    if len(points) <= SCATTER_MAX_POINTS:
+        return points.assign(findings=1)
+    
+    ale = points['ale'].to_numpy(dtype=float)
+    outlier_rows = np.argpartition(ale, -SCATTER_OUTLIERS)[-SCATTER_OUTLIERS:]
+    rest_mask = np.ones(len(points), dtype=bool)
+    rest_mask[outlier_rows] = False
+    rest = points[rest_mask]
+    
+    def grid_cell(values):
+        low, high = values.min(), values.max()
+        span = high - low if high > low else 1.0
+        return ((values - low) / span * SCATTER_GRID).astype(int).clip(0, SCATTER_GRID - 1)
+    
+    binned = (
+        rest.groupby([grid_cell(rest['retention_days'].to_numpy(dtype=float)),
+                      grid_cell(rest['ale'].to_numpy(dtype=float)), rest['is_public']])
+        .agg(retention_days=('retention_days', 'mean'), ale=('ale', 'mean'), findings=('ale', 'size'))
+        .reset_index(level='is_public').reset_index(drop=True)
+    )
+    binned['asset'] = binned['findings'].map(lambda count: f"{count:,} findings (binned)")
+    return pd.concat([points.iloc[outlier_rows].assign(findings=1), binned], ignore_index=True)
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of threshold points preserving the curve's visual shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    bucket = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        if end < next_end:
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+@st.cache_data(max_entries=16)
+def lorenz_curve(_df, data_key, filter_key):
+    """Cumulative ALE share by asset rank, LTTB-reduced with the PARETO_PCT crossing kept exact"""
+    ale = np.sort(_df['ale'].to_numpy(dtype=float))[::-1]
+    total = ale.sum()
+    cumulative = np.cumsum(ale) / total * 100 if total > 0 else np.zeros(len(ale))
+    rank = np.arange(1, len(ale) + 1, dtype=float)
+    
+    keep = lttb(rank, cumulative, LORENZ_MAX_POINTS)
+    pareto_index = int(np.searchsorted(cumulative, PARETO_PCT)) if total > 0 else len(ale)
+    pareto_rank = None
+    if pareto_index < len(ale):
+        keep = np.union1d(keep, [pareto_index])
+        pareto_rank = int(rank[pareto_index])
+    curve = pd.DataFrame({'asset_rank': rank[keep].astype(int), 'cumulative_risk_pct': cumulative[keep]})
+    return curve, pareto_rank
+
+loader = get_data_loader()
+# Runs above the memory budget are shown from risk_engine.py's cube and top findings only. The check sizes what
+# the loader would read: with a register that is only its latest run, not the register's whole history
+budget = memory_budget()
+summary_mode = budget is not None and loader.source_bytes() > budget
+summary_signatures = None
+try:
+    if summary_mode:
+        summary_signatures = (file_signature(CUBE_FILE), file_signature(TOP_FILE))
+        run_cube, all_df = load_run_summary(*summary_signatures)
+        run_id, data_version = run_cube.attrs.get("run_id"), summary_signatures
+    else:
+        all_df, run_id, data_version = loader.refresh()
+except Exception as e:
+    st.error(f"Error loading data: {e}")
+    all_df, run_id, data_version = pd.DataFrame(), None, None
+
+@st.fragment(run_every=RELOAD_CHECK_SECONDS)
+def watch_for_new_data():
+    """Polls the source file's signature; a change reruns the app, which ingests only the new rows"""
+    if summary_mode:
+        changed = (file_signature(CUBE_FILE), file_signature(TOP_FILE)) != summary_signatures
+    else:
+        changed = loader.has_changes()
+    if changed:
+        st.rerun()
+
+with st.sidebar:
+    watch_for_new_data()
+
+if all_df.empty:
     st.warning("No risk data available. Please run risk_engine.py first.")
     st.stop()
 
+if summary_mode:
+    data_key = (CUBE_FILE, data_version)
+    st.sidebar.caption(f"Run {run_id or 'n/a'} · {int(run_cube['count'].sum()):,} findings "
+                       f"(summary view: the run exceeds the memory budget)")
+    filter_options = {column: sorted(run_cube[column].unique().tolist()) for column in FILTER_COLUMNS}
+else:
+    data_key = (loader.source, data_version)
+    st.sidebar.caption(f"Run {run_id or 'n/a'} · {len(all_df):,} findings from {loader.source}")
+    filter_index = build_filter_index(all_df, data_key)
+    filter_options = {column: filter_index[column]['categories'] for column in FILTER_COLUMNS}
+
+st.sidebar.subheader("Quick Filters")
+severity_filter = st.sidebar.multiselect(
+    "Severity", 
+    options=filter_options['severity'],
+    default=filter_options['severity']
+)
+
+classification_filter = st.sidebar.multiselect(
+    "Classification",
+    options=filter_options['classification'],
+    default=filter_options['classification']
+)
+
+public_filter = st.sidebar.checkbox("Show only public assets", value=False)
+
+filter_key = (tuple(sorted(severity_filter)), tuple(sorted(classification_filter)), public_filter)
+if summary_mode:
+    cube = filter_cube(run_cube, *filter_key)
+    df = filter_cube(all_df, *filter_key)
+else:
+    rows = resolve_filter_rows(filter_index, data_key, *filter_key)
+    df = all_df if len(rows) == len(all_df) else all_df.iloc[rows]
+    cube = filter_cube(load_risk_cube_data(all_df, data_key, run_id), *filter_key)
+
+if cube['count'].sum() == 0:
+    st.warning("No findings match the selected filters.")
+    st.stop()
+
 st.title("Enterprise GRC Risk Analytics")
 st.markdown("**Domain:** `test-app.store` | **Scenario:** Multi-Cloud Data Migration (AWS ➔ Azure)")
 
-def calculate_compliance_score(df):
-    """Calculate compliance score based on risk factors"""
-    if df.empty:
+def calculate_compliance_score(cube):
+    """Calculate compliance score based on risk factors (risky counts come from the cube)"""
+    total_assets = cube['count'].sum()
+    if total_assets == 0:
         return 100.0
     
-    df['is_risky'] = (
-        (df['is_public'] == True) | 
-        (df['retention_days'] < 14) | 
-        (df['severity'] == 'Critical')
-    )
-    
-    total_assets = len(df)
-    risky_assets = df['is_risky'].sum()
+    risky_assets = cube['risky_count'].sum()
     
     score = max(0, 100 - (risky_assets / total_assets * 100))
     return round(score, 1)
 
-comp_score = calculate_compliance_score(df)
-total_ale = df['ale'].sum()
-avg_retention = df['retention_days'].mean()
-critical_count = len(df[df['severity'] == 'Critical'])
-highly_sensitive_count = len(df[df['classification'] == 'Highly Sensitive'])
+comp_score = calculate_compliance_score(cube)
+total_ale = cube['ale_sum'].sum()
+avg_retention = cube['retention_sum'].sum() / max(cube['count'].sum(), 1)
+critical_count = int(cube.loc[cube['severity'] == 'Critical', 'count'].sum())
+highly_sensitive_count = int(cube.loc[cube['classification'] == 'Highly Sensitive', 'count'].sum())
 
 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
 kpi1.metric("Total Risk (ALE)", f"${total_ale:,.0f}")
@@ -97,6 +448,27 @@ kpi5.metric("Compliance Score", f"{comp_score:.1f}%",
 
 st.divider()
 
+drift = load_drift_data(file_signature(DRIFT_FILE), run_id) if os.path.exists(DRIFT_FILE) else None
+if drift:
+    st.subheader(f"Change Since Previous Run ({drift['base_run']} → {drift['head_run']})")
+    drift_findings = drift['findings']
+    drift1, drift2, drift3, drift4, drift5 = st.columns(5)
+    drift1.metric("ALE Change", f"${drift['ale_delta']:+,.0f}", delta=f"{drift['ale_delta']:+,.0f}",
+                  delta_color="inverse")
+    drift2.metric("New Findings", f"{drift_findings['new']['count']:,}",
+                  delta=f"${drift_findings['new']['ale_delta']:+,.0f}", delta_color="inverse")
+    drift3.metric("Resolved Findings", f"{drift_findings['resolved']['count']:,}",
+                  delta=f"${drift_findings['resolved']['ale_delta']:+,.0f}", delta_color="inverse")
+    drift4.metric("Changed Findings", f"{drift_findings['changed']['count']:,}",
+                  delta=f"${drift_findings['changed']['ale_delta']:+,.0f}", delta_color="inverse")
+    drift5.metric("Assets Reclassified / Re-exposed", f"{drift['asset_changes']['count']:,}")
+    movers_tab, assets_tab = st.tabs(["Largest ALE Movers", "Asset Classification / Exposure Changes"])
+    with movers_tab:
+        st.dataframe(pd.DataFrame(drift['top_findings']), use_container_width=True, hide_index=True)
+    with assets_tab:
+        st.dataframe(pd.DataFrame(drift['top_assets']), use_container_width=True, hide_index=True)
+    st.divider()
+
 col_a, col_b = st.columns(2)
 
 with col_a:
@@ -117,9 +489,10 @@ with col_a:
 
 with col_b:
     st.subheader("Data Sensitivity vs Severity Distribution")
-    if not df.empty:
-        fig_sun = px.sunburst(df, path=['classification', 'severity'], values='ale',
-                              color='ale', color_continuous_scale='Reds')
+    if not cube.empty:
+        sun_data = cube.groupby(['classification', 'severity'], as_index=False)['ale_sum'].sum()
+        fig_sun = px.sunburst(sun_data, path=['classification', 'severity'], values='ale_sum',
+                              color='ale_sum', color_continuous_scale='Reds')
         st.plotly_chart(fig_sun, use_container_width=True)
 
 st.divider()
@@ -128,21 +501,25 @@ col_c, col_d = st.columns(2)
 
 with col_c:
     st.subheader("Risk Heatmap: Severity vs Classification")
-    z_data = df.pivot_table(index='severity', columns='classification', 
-                           values='ale', aggfunc='sum').fillna(0)
+    z_data = cube.pivot_table(index='severity', columns='classification', 
+                             values='ale_sum', aggfunc='sum').fillna(0)
     fig_heat = px.imshow(z_data, text_auto=True, color_continuous_scale='YlOrRd',
                          template=chart_template)
     st.plotly_chart(fig_heat, use_container_width=True)
 
 with col_d:
     st.subheader("Forensic Readiness (Retention vs ALE)")
-    fig_bubble = px.scatter(df, x="retention_days", y="ale", size="ale", 
-                           color="is_public",
-                           hover_name="asset", size_max=40,
-                           labels={"is_public": "Publicly Exposed"},
-                           color_discrete_map={True: '#EF4444', False: '#10B981'},
-                           template=chart_template)
-    st.plotly_chart(fig_bubble, use_container_width=True)
+    if summary_mode:
+        st.info("Per-finding retention is not loaded for runs above the memory budget.")
+    else:
+        scatter_data = downsample_scatter(df, data_key, filter_key)
+        fig_bubble = px.scatter(scatter_data, x="retention_days", y="ale", size="ale", 
+                               color="is_public",
+                               hover_name="asset", hover_data=["findings"], size_max=40,
+                               labels={"is_public": "Publicly Exposed"},
+                               color_discrete_map={True: '#EF4444', False: '#10B981'},
+                               template=chart_template)
+        st.plotly_chart(fig_bubble, use_container_width=True)
 
 st.divider()
 
@@ -150,7 +527,8 @@ col_e, col_f = st.columns(2)
 
 with col_e:
     st.subheader("Public Exposure Distribution")
-    fig_pie = px.pie(df, names='is_public', title="Public vs Private Assets",
+    pie_data = cube.groupby('is_public', as_index=False)['count'].sum()
+    fig_pie = px.pie(pie_data, names='is_public', values='count', title="Public vs Private Assets",
                      color='is_public', 
                      color_discrete_map={True: '#EF4444', False: '#10B981'},
                      hole=0.5,
@@ -160,45 +538,141 @@ with col_e:
 
 with col_f:
     st.subheader("Cumulative Risk Concentration")
-    df_sorted = df.sort_values('ale', ascending=False).reset_index(drop=True)
-    df_sorted['cumulative_risk_pct'] = df_sorted['ale'].cumsum() / df_sorted['ale'].sum() * 100
-    df_sorted['asset_rank'] = df_sorted.index + 1
+    if summary_mode:
+        st.info("The full ALE distribution is not loaded for runs above the memory budget.")
+    else:
+        lorenz_data, pareto_rank = lorenz_curve(df, data_key, filter_key)
     
-    fig_line = px.line(df_sorted, x='asset_rank', y='cumulative_risk_pct', 
-                       title="Lorenz Curve: Risk Concentration",
-                       labels={'asset_rank': 'Number of Assets', 
-                              'cumulative_risk_pct': '% of Total ALE'},
-                       template=chart_template)
-    fig_line.add_hline(y=80, line_dash="dash", line_color="red", 
-                       annotation_text="Pareto 80% Threshold")
-    st.plotly_chart(fig_line, use_container_width=True)
+        fig_line = px.line(lorenz_data, x='asset_rank', y='cumulative_risk_pct', 
+                           title="Lorenz Curve: Risk Concentration",
+                           labels={'asset_rank': 'Number of Assets', 
+                                  'cumulative_risk_pct': '% of Total ALE'},
+                           template=chart_template)
+        fig_line.add_hline(y=80, line_dash="dash", line_color="red", 
+                           annotation_text="Pareto 80% Threshold")
+        if pareto_rank:
+            fig_line.add_vline(x=pareto_rank, line_dash="dot", line_color="gray",
+                               annotation_text=f"{pareto_rank:,} assets")
+        st.plotly_chart(fig_line, use_container_width=True)
 
-st.subheader("Detailed Risk Register")
-st.dataframe(
-    df[['asset', 'asset_type', 'service', 'severity', 'classification', 
-        'is_public', 'retention_days', 'soft_delete', 'ale', 'control', 
-        'compliance']].style.background_gradient(subset=['ale'], cmap='Reds'),
-    use_container_width=True,
-    height=400
-)
+@st.cache_resource(max_entries=2)
+def load_remediation_planner(_df, data_key, run_id):
+    """remediation_planner.py options for the displayed run, else precomputed here from the loaded register"""
+    if os.path.exists(OPTIONS_FILE):
+        try:
+            planner = RemediationPlanner.load(OPTIONS_FILE)
+            if planner.run_id == run_id:
+                return planner
+        except Exception as e:
+            st.warning(f"Remediation options unreadable, rebuilding from register: {e}")
+    if _df is None:
+        return None
+    return RemediationPlanner.from_register(_df, run_id=run_id)
 
-st.sidebar.subheader("Quick Filters")
-severity_filter = st.sidebar.multiselect(
-    "Severity", 
-    options=df['severity'].unique(),
-    default=df['severity'].unique()
-)
+@st.cache_data(max_entries=16)
+def remediation_frontier(_planner, data_key, budget_hours):
+    """ALE reduction of the best plan at FRONTIER_POINTS budgets up to twice the chosen one"""
+    budgets = np.linspace(0, 2 * max(budget_hours, 1.0), FRONTIER_POINTS + 1)[1:]
+    return _planner.frontier(budgets)
 
-classification_filter = st.sidebar.multiselect(
-    "Classification",
-    options=df['classification'].unique(),
-    default=df['classification'].unique()
-)
+st.divider()
+st.subheader("What-If Remediation Planner")
+try:
+    planner = load_remediation_planner(None if summary_mode else all_df, data_key, run_id)
+except ValueError as e:
+    planner = None
+    st.info(f"Remediation planning unavailable: {e}")
+if planner is None or not len(planner):
+    st.info("No remediation options for this run. Run remediation_planner.py after risk_engine.py.")
+else:
+    budget_col, fix_col = st.columns([1, 3])
+    budget_hours = budget_col.number_input("Engineering hours", min_value=0.0, value=float(DEFAULT_BUDGET_HOURS),
+                                           step=8.0)
+    pick_options = planner.options.nlargest(PLANNER_PICK_OPTIONS, "reduction_cents")["remediation"].tolist()
+    fixes = fix_col.multiselect("Hypothetical fix set (replaces the optimized plan)", pick_options)
+    if fixes:
+        fix_mask, plan_label = planner.selection(fixes), "Hypothetical fix set"
+    else:
+        fix_mask, method = planner.plan(budget_hours)
+        plan_label = f"{'Optimal' if method == 'optimal' else 'Greedy'} plan within {budget_hours:,.0f}h"
+    totals = planner.evaluate(fix_mask)
+    
+    plan1, plan2, plan3, plan4 = st.columns(4)
+    plan1.metric("ALE Reduction", f"${totals['ale_reduction']:,.0f}",
+                 delta=f"{-totals['ale_reduction'] / max(totals['ale_before'], 1) * 100:.1f}%", delta_color="inverse")
+    plan2.metric("Residual ALE", f"${totals['ale_after']:,.0f}")
+    plan3.metric("Engineering Hours", f"{totals['hours']:,.1f}")
+    plan4.metric("Remediations / Findings", f"{totals['fixes']:,} / {totals['findings']:,}")
+    
+    selected_tab, frontier_tab = st.tabs([plan_label, "Reduction vs Hours"])
+    with selected_tab:
+        st.dataframe(planner.selected(fix_mask), use_container_width=True, hide_index=True)
+    with frontier_tab:
+        frontier = remediation_frontier(planner, data_key, budget_hours)
+        fig_frontier = px.line(frontier, x='budget_hours', y='ale_reduction', markers=True,
+                               labels={'budget_hours': 'Engineering Hours', 'ale_reduction': 'ALE Reduction ($)'},
+                               template=chart_template)
+        fig_frontier.add_vline(x=budget_hours, line_dash="dot", line_color="gray")
+        st.plotly_chart(fig_frontier, use_container_width=True)
+st.divider()
 
-public_filter = st.sidebar.checkbox("Show only public assets", value=False)
+@st.cache_data(max_entries=32)
+def search_register_rows(_df, data_key, search):
+    """Row positions whose asset or finding_code contains the search text (case-insensitive)"""
+    hits = (_df['asset'].astype(str).str.contains(search, case=False, regex=False) |
+            _df['finding_code'].astype(str).str.contains(search, case=False, regex=False))
+    return np.flatnonzero(hits.to_numpy())
+
+@st.cache_data(max_entries=32)
+def order_register_rows(_df, _rows, data_key, filter_key, search, sort_column, ascending):
+    """Filtered (and searched) row positions in display order; memoized so paging never re-sorts"""
+    rows = _rows
+    if search:
+        rows = np.intersect1d(rows, search_register_rows(_df, data_key, search), assume_unique=True)
+    values = _df[sort_column].to_numpy()[rows]
+    if values.dtype == object:
+        values = values.astype(str)
+    order = np.argsort(values, kind="stable")
+    return rows[order if ascending else order[::-1]]
+
+def ale_gradient(page_ale, low, high):
+    """Vectorized 'Reds' background + readable text colour for one page of ALE values"""
+    from matplotlib import colormaps
+    
+    span = high - low if high > low else 1.0
+    rgba = colormaps['Reds'](np.clip((page_ale - low) / span, 0, 1))
+    luminance = rgba[:, :3] @ np.array([0.2126, 0.7152, 0.0722])
+    hex_colors = ["#{:02x}{:02x}{:02x}".format(*(int(c * 255) for c in color[:3])) for color in rgba]
+    return [f"background-color: {bg}; color: {'#f1f1f1' if lum < 0.408 else '#000000'}"
+            for bg, lum in zip(hex_colors, luminance)]
+
+st.subheader("Detailed Risk Register")
+if summary_mode:
+    st.caption(f"Top {len(df):,} findings by ALE; the full register exceeds the dashboard's memory budget "
+               f"(see the report's evidence file)")
+    st.dataframe(df[REGISTER_COLUMNS], use_container_width=True, height=400, hide_index=True)
+else:
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    register_search = search_col.text_input("Search asset / finding code", "").strip()
+    sort_column = sort_col.selectbox("Sort by", REGISTER_COLUMNS, index=REGISTER_COLUMNS.index('ale'))
+    ascending = order_col.selectbox("Order", ["Descending", "Ascending"]) == "Ascending"
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1)
+
+    register_rows = order_register_rows(all_df, rows, data_key, filter_key, register_search, sort_column, ascending)
+    page_count = max(1, -(-len(register_rows) // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+
+    start = (page - 1) * page_size
+    page_df = all_df.iloc[register_rows[start:start + page_size]][REGISTER_COLUMNS]
+    page_styles = ale_gradient(page_df['ale'].to_numpy(dtype=float), df['ale'].min(), df['ale'].max())
+    st.dataframe(
+        page_df.style.apply(lambda _: page_styles, subset=['ale']),
+        use_container_width=True,
+        height=400
+    )
+    st.caption(f"Showing {start + 1 if len(page_df) else 0}-{start + len(page_df)} of {len(register_rows):,} findings")
 
 if st.sidebar.button("Refresh Data"):
-    st.cache_data.clear()
     st.rerun()
 
 st.caption(f"Dashboard generated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} UTC")
@@ -0,0 +1,156 @@
+import json
+import os
+
+import pytest
+
+from conftest import REPO_ROOT
+from consolidate_terraform import PLAN_INPUT_FILE, REPORT_FILE, TerraformConsolidator, \
+    consolidate_remediations, resource_group
+from generate_terraform_code import extract_remediations
+from hcl_parser import parse_hcl
+from policy_engine import PolicyEngine
+
+KMS_KEY = '''
+terraform {
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+  }
+}
+
+provider "aws" {
+  region = "us-east-1"
+}
+
+resource "aws_kms_key" "logs" {
+  description         = "GRC log encryption"
+  enable_key_rotation = true
+}
+'''
+SSE = '''
+# Default encryption with the customer managed key
+resource "aws_s3_bucket_server_side_encryption_configuration" "logs" {
+  bucket = "logs"
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm     = "aws:kms"
+      kms_master_key_id = aws_kms_key.logs.arn
+    }
+  }
+}
+'''
+RDS = '''
+resource "aws_db_instance" "main" {
+  allocated_storage   = 20
+  storage_encrypted   = true
+  publicly_accessible = true
+}
+'''
+RDS_CONFLICT = '''
+resource "aws_db_instance" "main" {
+  allocated_storage   = 20
+  storage_encrypted   = true
+  publicly_accessible = false
+}
+'''
+BUCKET_POLICY = '''
+resource "aws_s3_bucket_policy" "logs" {
+  bucket = "logs"
+  policy = <<EOF
+{"Statement": [{"Effect": "Deny", "Condition": {"Bool": {"aws:SecureTransport": "false"}}}]}
+EOF
+}
+'''
+
+
+def _analysis(*blocks):
+    return "Fix:\n" + "\n".join(f"```hcl\n{block}\n```" for block in blocks)
+
+
+@pytest.fixture
+def plan(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    items = [
+        {"resource": "arn:aws:s3:::logs", "analysis": _analysis(KMS_KEY, SSE)},
+        {"resource": "arn:aws:rds:us-east-1:123456789012:db:main", "analysis": _analysis(RDS)},
+        {"resource": "arn:aws:s3:::logs", "analysis": _analysis(SSE, BUCKET_POLICY)},
+        {"resource": "arn:aws:rds:us-east-1:123456789012:db:main", "analysis": _analysis(RDS_CONFLICT)},
+    ]
+    path = tmp_path / "grc_remediation_plan.json"
+    path.write_text(json.dumps(items))
+    return str(path)
+
+
+@pytest.mark.parametrize("resource_type, group", [
+    ("aws_s3_bucket", ("aws", "s3")),
+    ("aws_db_instance", ("aws", "rds")),
+    ("aws_cloudwatch_log_group", ("aws", "cloudwatch")),
+    ("azurerm_key_vault_key", ("azurerm", "keyvault")),
+    ("google", ("google", "misc")),
+])
+def test_resource_group(resource_type, group):
+    assert resource_group(resource_type) == group
+
+
+def test_duplicates_and_conflicts():
+    consolidator = TerraformConsolidator()
+    for digest, text in [("a", RDS), ("b", RDS), ("c", RDS_CONFLICT), ("d", KMS_KEY), ("e", KMS_KEY)]:
+        for block in parse_hcl(text):
+            consolidator.add_block(block, digest)
+
+    assert consolidator.duplicates == 4
+    assert consolidator.conflicts == [{"address": "aws_db_instance.main", "kept_from": "a", "dropped_from": "c"}]
+    assert consolidator.sources["aws_db_instance.main"] == "a"
+    rds = consolidator.groups[("aws", "rds")]["resource"]["aws_db_instance"]["main"]
+    assert rds["publicly_accessible"] is True
+    assert consolidator.terraform["required_providers"] == [
+        {"aws": {"source": "hashicorp/aws", "version": "~> 5.0"}}]
+
+
+def test_round_trip_from_tf_to_plan_input(plan, tmp_path):
+    extract_remediations(plan, "extracted", workers=1, policy_file="missing.rego")
+    report = consolidate_remediations("extracted", "consolidated")
+    out = tmp_path / "consolidated"
+
+    assert report["files"] == ["aws_kms.tf.json", "aws_rds.tf.json", "aws_s3.tf.json", "providers.tf.json"]
+    assert report["stats"] == {"fragments": 5, "files": 4, "addresses": 6, "duplicates_dropped": 0,
+                               "conflicts": 1, "parse_errors": 0}
+    assert json.loads((out / REPORT_FILE).read_text())["conflicts"][0]["address"] == "aws_db_instance.main"
+
+    # The per-service .tf.json files and plan_input.json describe the same root module
+    merged = {}
+    for filename in report["files"]:
+        for section, value in json.loads((out / filename).read_text()).items():
+            if section in ("resource", "data"):
+                for r_type, by_name in value.items():
+                    merged.setdefault(section, {}).setdefault(r_type, {}).update(by_name)
+            else:
+                merged[section] = value
+    plan_input = json.loads((out / PLAN_INPUT_FILE).read_text())
+    assert plan_input == merged
+
+    resources = plan_input["resource"]
+    sse = resources["aws_s3_bucket_server_side_encryption_configuration"]["logs"]
+    assert sse["rule"][0]["apply_server_side_encryption_by_default"][0] == {
+        "sse_algorithm": "aws:kms", "kms_master_key_id": "${aws_kms_key.logs.arn}"}
+    assert resources["aws_s3_bucket_policy"]["logs"]["policy"].startswith('{"Statement"')
+    assert resources["aws_db_instance"]["main"]["publicly_accessible"] is True
+    assert plan_input["provider"] == {"aws": [{"region": "us-east-1"}]}
+
+    engine = PolicyEngine.from_rego(os.path.join(REPO_ROOT, "policy", "security_policy.rego"))
+    assert engine.evaluate(plan_input) == [
+        "CRITICAL: AWS RDS Instance is set to 'publicly_accessible = true'. This violates CIS Benchmarks."]
+
+
+def test_unparseable_fragment_is_reported(plan, tmp_path):
+    broken = tmp_path / "broken.json"
+    broken.write_text(json.dumps([{"resource": "x", "analysis": _analysis('resource "aws_s3_bucket" {\n}')},
+                                  {"resource": "y", "analysis": _analysis(RDS)}]))
+    extract_remediations(str(broken), "extracted", workers=1, policy_file="missing.rego")
+    report = consolidate_remediations("extracted", "consolidated")
+
+    assert report["stats"]["parse_errors"] == 1
+    assert "expects 2 labels" in report["parse_errors"][0]["error"]
+    assert report["files"] == ["aws_rds.tf.json"]
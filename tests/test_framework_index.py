@@ -0,0 +1,164 @@
+import itertools
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from framework_index import FrameworkIndex, FrameworkIndexBuilder, index_file_for, parse_term
+
+FRAMEWORKS = {
+    "CIS-2.0": ["1.1", "1.4", "2.1.1", "3.4"],
+    "PCI-3.2.1": ["3.4", "8.2", "10.1"],
+    "NIST-800-53": ["ac_2", "au_2", "sc_13"],
+    "SOC2": ["cc_6_1"],
+}
+ROWS = 500
+
+
+def _maps(seed=11):
+    rng = random.Random(seed)
+    maps = []
+    for _ in range(ROWS):
+        roll = rng.random()
+        if roll < 0.1:
+            maps.append(None)
+            continue
+        mapping = {fw: rng.sample(reqs, rng.randint(0, len(reqs)))
+                   for fw in rng.sample(sorted(FRAMEWORKS), rng.randint(0, len(FRAMEWORKS)))
+                   for reqs in [FRAMEWORKS[fw]]}
+        if mapping and roll < 0.2:
+            # Repeated requirements and a bare string, as scanners sometimes emit them
+            fw = next(iter(mapping))
+            mapping[fw] = mapping[fw] * 2 if mapping[fw] else FRAMEWORKS[fw][0]
+        maps.append(mapping)
+    ale = [round(rng.uniform(0, 50_000), 2) for _ in range(ROWS)]
+    return maps, ale
+
+
+def _naive_rows(maps, terms):
+    """Per-row membership check, the reference for every index query"""
+    def matches(mapping, term):
+        if not isinstance(mapping, dict):
+            return False
+        if isinstance(term, str):
+            return mapping.get(term) is not None
+        requirements = mapping.get(term[0])
+        if isinstance(requirements, str):
+            requirements = [requirements]
+        return term[1] in (requirements or [])
+    return [row for row, mapping in enumerate(maps) if all(matches(mapping, term) for term in terms)]
+
+
+TERMS = [()] + [(fw,) for fw in FRAMEWORKS] + [((fw, req),) for fw, reqs in FRAMEWORKS.items() for req in reqs] + [
+    ("CIS-2.0", "PCI-3.2.1"),
+    (("PCI-3.2.1", "3.4"), ("CIS-2.0", "3.4")),
+    (("PCI-3.2.1", "3.4"), "NIST-800-53", ("NIST-800-53", "ac_2")),
+    ("SOC2", ("SOC2", "cc_6_1"), "CIS-2.0", "PCI-3.2.1"),
+    ("HIPAA",),
+    (("CIS-2.0", "9.9"),),
+    ("CIS-2.0", ("PCI-3.2.1", "1.1")),
+]
+
+
+def _assert_matches_naive(index, maps, ale):
+    for terms in TERMS:
+        expected = _naive_rows(maps, terms)
+        assert index.rows(*terms).tolist() == expected, terms
+        assert index.summary(*terms)["findings"] == len(expected)
+        assert index.summary(*terms)["ale"] == pytest.approx(sum(ale[row] for row in expected))
+
+
+def _build(maps, ale, batch, tmp_path, budget=None):
+    with FrameworkIndexBuilder(budget=budget, spill_dir=str(tmp_path / "spill")) as builder:
+        for start in range(0, len(maps), batch):
+            builder.add(maps[start:start + batch], ale[start:start + batch])
+        index = builder.build()
+        # Copy out of the spill files' memory maps before close() removes them
+        index = FrameworkIndex(index.frameworks, index.requirements, index.requirement_framework,
+                               np.array(index.framework_offsets), np.array(index.framework_rows),
+                               np.array(index.requirement_offsets), np.array(index.requirement_rows),
+                               np.array(index.ale))
+        return index, builder.spills
+
+
+def test_build_matches_naive_membership():
+    maps, ale = _maps()
+    _assert_matches_naive(FrameworkIndex.build(maps, ale), maps, ale)
+
+
+@pytest.mark.parametrize("batch, budget", [(1, None), (37, None), (37, 256), (ROWS, 1024)])
+def test_batched_builder_matches_single_build(tmp_path, batch, budget):
+    maps, ale = _maps()
+    reference = FrameworkIndex.build(maps, ale)
+    index, spills = _build(maps, ale, batch, tmp_path, budget)
+
+    assert (spills > 0) == (budget is not None)
+    if budget:
+        assert not list((tmp_path / "spill").iterdir())
+    assert index.frameworks == reference.frameworks and index.requirements == reference.requirements
+    for key in ("requirement_framework", "framework_offsets", "framework_rows", "requirement_offsets",
+                "requirement_rows", "ale"):
+        assert np.array_equal(getattr(index, key), getattr(reference, key)), key
+    _assert_matches_naive(index, maps, ale)
+
+
+def test_csr_postings_are_sorted_and_unique():
+    maps, ale = _maps()
+    index = FrameworkIndex.build(maps, ale)
+    for offsets, rows, count in [(index.framework_offsets, index.framework_rows, len(index.frameworks)),
+                                 (index.requirement_offsets, index.requirement_rows, len(index.requirements))]:
+        assert len(offsets) == count + 1 and offsets[0] == 0 and offsets[-1] == len(rows)
+        assert rows.dtype == np.int32
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            assert np.all(np.diff(rows[start:end]) > 0)
+
+
+def test_coverage_matches_naive_counts():
+    maps, ale = _maps()
+    index = FrameworkIndex.build(maps, ale)
+
+    coverage = index.coverage().set_index("framework")
+    for fw, reqs in FRAMEWORKS.items():
+        rows = _naive_rows(maps, (fw,))
+        seen = {req for req in reqs if _naive_rows(maps, ((fw, req),))}
+        assert coverage.loc[fw, "findings"] == len(rows)
+        assert coverage.loc[fw, "requirements"] == len(seen)
+        assert coverage.loc[fw, "ale"] == pytest.approx(sum(ale[row] for row in rows))
+    assert list(index.coverage()["findings"]) == sorted(coverage["findings"], reverse=True)
+
+    requirements = index.requirement_coverage("PCI-3.2.1").set_index("requirement")
+    for req in requirements.index:
+        rows = _naive_rows(maps, (("PCI-3.2.1", req),))
+        assert requirements.loc[req, "findings"] == len(rows)
+        assert requirements.loc[req, "ale"] == pytest.approx(sum(ale[row] for row in rows))
+    assert index.requirement_coverage("HIPAA").empty
+
+
+def test_save_load_round_trip(tmp_path):
+    maps, ale = _maps()
+    index = FrameworkIndex.build(maps, ale)
+    path = tmp_path / index_file_for("report.json")
+    index.save(str(path))
+    loaded = FrameworkIndex.load(str(path))
+
+    assert path.name == "report_frameworks.npz"
+    assert len(loaded) == ROWS
+    assert loaded.frameworks == index.frameworks and loaded.requirements == index.requirements
+    pd.testing.assert_frame_equal(loaded.coverage(), index.coverage())
+    _assert_matches_naive(loaded, maps, ale)
+    for a, b in itertools.combinations(sorted(FRAMEWORKS), 2):
+        assert loaded.rows(a, b).tolist() == _naive_rows(maps, (a, b))
+
+
+def test_from_register_legacy_compliance_column():
+    df = pd.DataFrame({"compliance": ["CIS-2.0, SOC2", None, "SOC2", ""], "ale": [1.0, 2.0, 4.0, 8.0]})
+    index = FrameworkIndex.from_register(df)
+    assert index.rows("SOC2").tolist() == [0, 2]
+    assert index.summary("CIS-2.0", "SOC2") == {"findings": 1, "ale": 1.0}
+    assert index.requirements == []
+
+
+def test_parse_term():
+    assert parse_term("PCI-3.2.1") == "PCI-3.2.1"
+    assert parse_term("PCI-3.2.1:3.4") == ("PCI-3.2.1", "3.4")
@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from generate_terraform_code import MANIFEST_FILE, extract_remediations, hcl_digest, normalize_hcl
+
+S3_FIX = '''resource "aws_s3_bucket_public_access_block" "logs" {
+  bucket            = "logs"
+  block_public_acls = true
+}'''
+RDS_FIX = '''resource "aws_db_instance" "main" {
+  storage_encrypted = true
+}'''
+
+
+def _item(resource, *blocks, crlf=False):
+    text = "Fix:\n" + "\n".join(f"```hcl\n{block}   \n```" for block in blocks)
+    return {"resource": resource, "analysis": text.replace("\n", "\r\n") if crlf else text}
+
+
+def _write_plan(path, items, jsonl=False):
+    path.write_text("\n".join(json.dumps(item) for item in items) if jsonl else json.dumps(items))
+    return str(path)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("jsonl", [False, True])
+def test_blocks_are_deduplicated_by_normalized_digest(workdir, jsonl):
+    plan = _write_plan(workdir / "plan.json", [
+        _item("arn:aws:s3:::logs", S3_FIX),
+        _item("arn:aws:s3:::audit", S3_FIX, crlf=True),
+        _item("arn:aws:rds:db/main", RDS_FIX, S3_FIX),
+        {"resource": "arn:aws:s3:::empty", "analysis": "no code here"},
+    ], jsonl=jsonl)
+    manifest = extract_remediations(plan, "out", workers=1, policy_file="missing.rego")
+
+    s3, rds = hcl_digest(S3_FIX), hcl_digest(RDS_FIX)
+    assert set(manifest["blocks"]) == {s3, rds}
+    assert manifest["blocks"][s3]["resources"] == ["arn:aws:s3:::logs", "arn:aws:s3:::audit", "arn:aws:rds:db/main"]
+    assert manifest["blocks"][s3]["items"] == [0, 1, 2]
+    assert manifest["blocks"][s3]["addresses"] == ["aws_s3_bucket_public_access_block.logs"]
+    assert manifest["resources"]["arn:aws:rds:db/main"] == [rds, s3]
+    assert manifest["stats"] == {"items": 4, "blocks_found": 4, "unique_blocks": 2, "files_written": 2,
+                                 "files_pruned": 0, "cached_verdicts": 0}
+    assert (workdir / "out" / f"{s3}.tf").read_text() == normalize_hcl(S3_FIX)
+    assert json.loads((workdir / "out" / MANIFEST_FILE).read_text()) == manifest
+
+
+def test_fragments_of_earlier_plans_are_pruned(workdir):
+    extract_remediations(_write_plan(workdir / "a.json", [_item("a", S3_FIX), _item("b", RDS_FIX)]), "out",
+                         workers=1, policy_file="missing.rego")
+    (workdir / "out" / "README.md").write_text("kept")
+
+    manifest = extract_remediations(_write_plan(workdir / "b.json", [_item("a", S3_FIX)]), "out",
+                                    workers=1, policy_file="missing.rego")
+
+    assert manifest["stats"]["files_written"] == 0 and manifest["stats"]["files_pruned"] == 1
+    assert sorted(os.listdir(workdir / "out")) == sorted([f"{hcl_digest(S3_FIX)}.tf", MANIFEST_FILE, "README.md"])
@@ -0,0 +1,131 @@
+import pytest
+
+from hcl_parser import HCLParseError, parse_hcl, to_terraform_json
+
+
+def test_literals_and_expressions():
+    [block] = parse_hcl('''
+resource "aws_s3_bucket" "logs" {
+  bucket        = "grc-logs"
+  force_destroy = false
+  count         = 2
+  ratio         = 0.5
+  tags          = { Owner = "grc", "cost-center" = 42 }
+  ports         = [80, 443]
+  arn           = aws_kms_key.logs.arn
+  name          = "${var.prefix}-logs"
+  depends_on    = [aws_kms_key.logs]
+}
+''')
+    assert block["type"] == "resource" and block["labels"] == ["aws_s3_bucket", "logs"]
+    assert block["body"] == {
+        "bucket": "grc-logs",
+        "force_destroy": False,
+        "count": 2,
+        "ratio": 0.5,
+        "tags": {"Owner": "grc", "cost-center": 42},
+        "ports": [80, 443],
+        "arn": "${aws_kms_key.logs.arn}",
+        "name": "${var.prefix}-logs",
+        "depends_on": ["aws_kms_key.logs"],
+    }
+
+
+def test_heredocs():
+    [block] = parse_hcl('''
+resource "aws_iam_policy" "deny" {
+  policy = <<EOF
+{
+  "Effect": "Deny"
+}
+EOF
+  description = <<-EOT
+    indented
+      keeps relative indent
+    EOT
+}
+''')
+    assert block["body"]["policy"] == '{\n  "Effect": "Deny"\n}\n'
+    assert block["body"]["description"] == "indented\n  keeps relative indent\n"
+
+
+def test_nested_blocks_are_lists():
+    [block] = parse_hcl('''
+resource "aws_s3_bucket_lifecycle_configuration" "logs" {
+  rule {
+    id = "expire"
+    expiration {
+      days = 90
+    }
+  }
+  rule {
+    id = "archive"
+  }
+  dynamic "tag" {
+    for_each = var.tags
+  }
+}
+''')
+    body = block["body"]
+    assert body["rule"] == [{"id": "expire", "expiration": [{"days": 90}]}, {"id": "archive"}]
+    assert body["dynamic"] == [{"tag": {"for_each": "${var.tags}"}}]
+
+
+def test_comments_are_ignored():
+    [block] = parse_hcl('''
+# leading comment
+resource "aws_db_instance" "main" { // trailing comment
+  /* block
+     comment */
+  storage_encrypted = true # after a literal
+  kms_key_id        = aws_kms_key.rds.arn // after an expression
+  name              = "not # a comment"
+}
+''')
+    assert block["body"] == {
+        "storage_encrypted": True,
+        "kms_key_id": "${aws_kms_key.rds.arn}",
+        "name": "not # a comment",
+    }
+
+
+def test_to_terraform_json():
+    doc = to_terraform_json(parse_hcl('''
+terraform {
+  required_version = ">= 1.5"
+}
+provider "aws" {
+  region = "us-east-1"
+}
+locals {
+  env = "prod"
+}
+variable "prefix" {
+  type = string
+}
+resource "aws_s3_bucket" "logs" {
+  bucket = "logs"
+}
+data "aws_caller_identity" "current" {}
+'''))
+    assert doc == {
+        "terraform": [{"required_version": ">= 1.5"}],
+        "provider": {"aws": [{"region": "us-east-1"}]},
+        "locals": {"env": "prod"},
+        "variable": {"prefix": {"type": "string"}},
+        "resource": {"aws_s3_bucket": {"logs": {"bucket": "logs"}}},
+        "data": {"aws_caller_identity": {"current": {}}},
+    }
+
+
+@pytest.mark.parametrize("text, message", [
+    ('bucket = "logs"', "top-level attribute"),
+    ('resource "aws_s3_bucket" {\n}', "expects 2 labels"),
+    ('resource "a" "b" {\n  name = "open\n}', "newline in string literal"),
+    ('resource "a" "b" {\n  policy = <<EOF\n{}\n}', "line 3"),
+    ('resource "a" "b" {\n  /* never closed\n}', "unterminated comment"),
+    ('resource "a" "b" {\n  name = "x"\n', "expected '}'"),
+])
+def test_parse_errors(text, message):
+    with pytest.raises(HCLParseError, match=message):
+        parse_hcl(text)
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import json_stream
+from json_stream import iter_json_records
+
+RECORDS = [
+    {"id": 1, "text": "brackets ] [ and, commas", "nested": {"list": [1, 2, [3]]}},
+    12345678,
+    -0.25,
+    "a string with \\\"escapes\\\" and ]",
+    [1, {"a": None}],
+    {"unicode": "ΔALE → €"},
+    True,
+    None,
+    9876543210,
+]
+
+
+@pytest.fixture(params=[1, 3, 7, 1 << 20])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(json_stream, "READ_CHUNK_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_array_records_survive_any_chunk_boundary(tmp_path, chunk_size, indent):
+    path = tmp_path / "records.json"
+    path.write_text("  \n" + json.dumps(RECORDS, indent=indent))
+    assert list(iter_json_records(str(path))) == RECORDS
+
+
+def test_jsonl(tmp_path, chunk_size):
+    path = tmp_path / "records.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in RECORDS if isinstance(record, dict)) + "\n\n")
+    assert list(iter_json_records(str(path))) == [record for record in RECORDS if isinstance(record, dict)]
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]"])
+def test_empty_array(tmp_path, chunk_size, text):
+    path = tmp_path / "empty.json"
+    path.write_text(text)
+    assert list(iter_json_records(str(path))) == []
+
+
+def test_truncated_array_raises(tmp_path, chunk_size):
+    path = tmp_path / "truncated.json"
+    path.write_text('[{"id": 1}, {"id": 2')
+    records = iter_json_records(str(path))
+    assert next(records) == {"id": 1}
+    with pytest.raises(json.JSONDecodeError):
+        next(records)
@@ -0,0 +1,92 @@
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+from normalize_findings import FINDINGS_SCHEMA, finding_id, iter_findings, load_findings, normalize_finding, \
+    write_findings
+
+
+def _finding(i, **overrides):
+    finding = {
+        "metadata": {"event_code": "s3_bucket_default_encryption" if i % 2 else "iam_avoid_root_usage"},
+        "severity": ["Critical", "High", "Medium"][i % 3],
+        "status_code": "FAIL",
+        "status": "New",
+        "finding_info": {"uid": f"prowler-{i}", "title": f"Finding {i}", "desc": "desc",
+                         "created_time_dt": "2026-10-01T00:00:00"},
+        "cloud": {"provider": "aws", "account": {"uid": 123456789012}, "region": "us-east-1"},
+        "resources": [
+            {"uid": f"arn:aws:s3:::bucket-{i}", "name": f"bucket-{i}", "type": "AwsS3Bucket",
+             "region": "eu-west-1", "data": {"metadata": {"state": "active"}}},
+            {"uid": "ignored-second-resource"},
+        ],
+        "remediation": {"desc": "Enable default encryption"},
+        "risk_details": "Data at rest is readable",
+        "unmapped": {"categories": ["encryption"], "compliance": {"CIS-2.0": ["2.1.1"], "SOC2": None}},
+    }
+    finding.update(overrides)
+    return finding
+
+
+def test_finding_id_is_stable_per_check_and_resource():
+    row = normalize_finding(_finding(1))
+    rescanned = normalize_finding(_finding(1, severity="Low", finding_info={"uid": "other-scan-uid"}))
+    assert row["finding_id"] == rescanned["finding_id"] == finding_id(row)
+    assert len(row["finding_id"]) == 32
+
+    for field, value in [("resource_uid", "arn:aws:s3:::other"), ("finding_code", "other_check"),
+                         ("account_id", "999999999999"), ("region", "us-east-1"), ("cloud_provider", "azure")]:
+        assert finding_id({**row, field: value}) != row["finding_id"], field
+    assert finding_id({**row, "title": "renamed", "severity": "Low"}) == row["finding_id"]
+
+
+def test_normalize_finding_flattens_first_resource():
+    row = normalize_finding(_finding(1), "scan.json")
+    assert set(row) == set(FINDINGS_SCHEMA.names)
+    assert row["account_id"] == "123456789012"
+    assert row["region"] == "eu-west-1"
+    assert row["resource_uid"] == "arn:aws:s3:::bucket-1"
+    assert row["resource_state"] == "active"
+    assert row["source_file"] == "scan.json"
+    assert row["categories"] == ["encryption"]
+    assert row["compliance"] == [("CIS-2.0", ["2.1.1"]), ("SOC2", [])]
+
+
+def test_normalize_sparse_finding():
+    row = normalize_finding({"unmapped": "not-a-dict", "remediation": "text", "resources": []})
+    assert row["resource_uid"] is None and row["remediation"] is None
+    assert row["categories"] == [] and row["compliance"] == []
+    assert row["finding_id"] == finding_id({})
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson"])
+def test_write_load_round_trip(tmp_path, fmt):
+    findings = [_finding(i) for i in range(7)]
+    raw = tmp_path / f"scan.{fmt}"
+    raw.write_text(json.dumps(findings) if fmt == "json" else "\n".join(map(json.dumps, findings)))
+    azure = _finding(100, cloud={"provider": "azure", "account": {"uid": "sub-1"}})
+    other = tmp_path / "azure.json"
+    other.write_text(json.dumps([azure]))
+    output = tmp_path / "findings.parquet"
+
+    assert write_findings([str(raw), str(other)], str(output), batch_rows=3) == 8
+    assert not (tmp_path / "findings.parquet.tmp").exists()
+    assert pq.read_schema(output).equals(FINDINGS_SCHEMA)
+
+    stored = load_findings(str(output))
+    on_the_fly = load_findings([str(raw), str(other)])
+    assert stored.equals(on_the_fly)
+    expected = [normalize_finding(f, str(raw)) for f in findings] + [normalize_finding(azure, str(other))]
+    for row, reference in zip(stored.to_pylist(), expected):
+        assert row == {**reference, "compliance": [tuple(pair) for pair in reference["compliance"]]}
+
+    columns = ["finding_id", "severity"]
+    assert load_findings(str(output), columns).column_names == columns
+    for source in (str(output), [str(raw), str(other)]):
+        batches = list(iter_findings(source, columns, batch_rows=3))
+        assert [batch.num_rows for batch in batches][:2] == [3, 3]
+        assert sum(batch.num_rows for batch in batches) == 8
+        assert all(batch.column_names == columns for batch in batches)
+        assert [v for batch in batches for v in batch.column("finding_id").to_pylist()] == \
+            stored.column("finding_id").to_pylist()
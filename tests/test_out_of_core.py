@@ -0,0 +1,32 @@
+import random
+
+import pyarrow as pa
+
+from out_of_core import TopK
+
+
+def _batches(seed, count=6, rows=200):
+    rng = random.Random(seed)
+    return [pa.table({"ale": [float(rng.randint(0, 20)) for _ in range(rows)],
+                      "asset": [f"a{batch}-{i}" for i in range(rows)]})
+            for batch in range(count)]
+
+
+def test_matches_full_sort_with_ties():
+    batches = _batches(0)
+    top = TopK(100, "ale")
+    for batch in batches:
+        top.append(batch)
+
+    records = [dict(record, row=row) for row, record in enumerate(pa.concat_tables(batches).to_pylist())]
+    expected = sorted(records, key=lambda record: (-record["ale"], record["row"]))[:100]
+    assert top.top_k().to_pylist() == expected
+    assert top.rows == 1200
+    assert len(top._heap) == 100
+
+
+def test_fewer_rows_than_k_and_empty():
+    top = TopK(100)
+    assert top.top_k().num_rows == 0
+    top.append(pa.table({"ale": [1.0, 3.0, 3.0]}))
+    assert top.top_k().to_pylist() == [{"ale": 3.0, "row": 1}, {"ale": 3.0, "row": 2}, {"ale": 1.0, "row": 0}]
@@ -0,0 +1,174 @@
+import json
+import os
+
+import pytest
+import yaml
+
+from pipeline import MANIFEST_FILE, ContentStore, Pipeline
+
+# Upper-cases its input into its output and records that it ran
+STEP = '''
+import os, sys
+src, dst, name = sys.argv[1:]
+with open("ran.log", "a") as log:
+    log.write(name + "\\n")
+if src.endswith("_dir"):
+    src = os.path.join(src, "nested", "out.txt")
+with open(src) as f:
+    text = f.read().upper()
+if dst.endswith("_dir"):
+    os.makedirs(os.path.join(dst, "nested"), exist_ok=True)
+    with open(os.path.join(dst, "nested", "out.txt"), "w") as f:
+        f.write(text)
+else:
+    with open(dst, "w") as f:
+        f.write(text)
+'''
+
+
+def _stage(src, dst, name, **extra):
+    return {"command": ["python", "step.py", src, dst, name], "inputs": ["step.py", src], "outputs": [dst],
+            **extra}
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "step.py").write_text(STEP)
+    (tmp_path / "source.txt").write_text("findings")
+    return tmp_path
+
+
+def _write_pipeline(workspace, stages):
+    path = workspace / "pipeline.yaml"
+    path.write_text(yaml.safe_dump({"stages": stages}, sort_keys=False))
+    return str(path)
+
+
+def _ran(workspace):
+    log = workspace / "ran.log"
+    names = log.read_text().split() if log.exists() else []
+    log.unlink(missing_ok=True)
+    return names
+
+
+CHAIN = {
+    "normalize": _stage("source.txt", "normalized.txt", "normalize"),
+    "score": _stage("normalized.txt", "scored_dir", "score"),
+    "report": _stage("scored_dir", "report.txt", "report"),
+}
+
+
+def test_unchanged_inputs_skip(workspace):
+    pipeline_file = _write_pipeline(workspace, CHAIN)
+    assert Pipeline.from_yaml(pipeline_file).run() == {"normalize": "ran", "score": "ran", "report": "ran"}
+    assert _ran(workspace) == ["normalize", "score", "report"]
+
+    assert Pipeline.from_yaml(pipeline_file).run() == {"normalize": "skipped", "score": "skipped",
+                                                       "report": "skipped"}
+    assert _ran(workspace) == []
+    assert set(json.loads((workspace / MANIFEST_FILE).read_text())["stages"]) == set(CHAIN)
+
+
+def test_unchanged_output_stops_reruns_downstream(workspace):
+    pipeline_file = _write_pipeline(workspace, CHAIN)
+    Pipeline.from_yaml(pipeline_file).run()
+    _ran(workspace)
+
+    # Same upper-cased output, so only the first stage re-runs
+    (workspace / "source.txt").write_text("FINDINGS")
+    assert Pipeline.from_yaml(pipeline_file).run() == {"normalize": "ran", "score": "skipped", "report": "skipped"}
+    assert _ran(workspace) == ["normalize"]
+
+    (workspace / "source.txt").write_text("new findings")
+    assert Pipeline.from_yaml(pipeline_file).run() == {"normalize": "ran", "score": "ran", "report": "ran"}
+    assert (workspace / "report.txt").read_text() == "NEW FINDINGS"
+
+
+def test_deleted_outputs_are_restored_from_store(workspace):
+    pipeline_file = _write_pipeline(workspace, CHAIN)
+    Pipeline.from_yaml(pipeline_file).run()
+    _ran(workspace)
+
+    (workspace / "normalized.txt").unlink()
+    (workspace / "scored_dir" / "nested" / "out.txt").write_text("tampered")
+    assert Pipeline.from_yaml(pipeline_file).run() == {"normalize": "restored", "score": "restored",
+                                                       "report": "skipped"}
+    assert _ran(workspace) == []
+    assert (workspace / "normalized.txt").read_text() == "FINDINGS"
+    assert (workspace / "scored_dir" / "nested" / "out.txt").read_text() == "FINDINGS"
+
+
+def test_force_and_volatile_stages_run(workspace):
+    stages = {**CHAIN, "normalize": {**CHAIN["normalize"], "volatile": True}}
+    pipeline_file = _write_pipeline(workspace, stages)
+    Pipeline.from_yaml(pipeline_file).run()
+    _ran(workspace)
+
+    assert Pipeline.from_yaml(pipeline_file).run()["normalize"] == "ran"
+    assert _ran(workspace) == ["normalize"]
+    Pipeline.from_yaml(pipeline_file).run(["score"], force=True)
+    assert _ran(workspace) == ["normalize", "score"]
+
+
+def test_targets_select_upstream_stages(workspace):
+    pipeline = Pipeline.from_yaml(_write_pipeline(workspace, CHAIN))
+    assert pipeline.upstream(["score"]) == ["normalize", "score"]
+    assert pipeline.run(["score"]) == {"normalize": "ran", "score": "ran"}
+    assert not (workspace / "report.txt").exists()
+    with pytest.raises(ValueError, match="Unknown stage"):
+        pipeline.upstream(["publish"])
+
+
+def test_failed_stage_blocks_downstream(workspace):
+    stages = {
+        "normalize": {"command": ["python", "-c", "import sys; sys.exit(3)"], "inputs": ["source.txt"],
+                      "outputs": ["normalized.txt"]},
+        "score": _stage("normalized.txt", "scored.txt", "score"),
+        "report": _stage("scored.txt", "report.txt", "report"),
+        "inventory": _stage("source.txt", "inventory.txt", "inventory"),
+        "no_output": {"command": ["python", "-c", "pass"], "inputs": [], "outputs": ["never_written.txt"]},
+    }
+    status = Pipeline.from_yaml(_write_pipeline(workspace, stages)).run()
+    assert status == {"normalize": "failed", "score": "blocked", "report": "blocked", "inventory": "ran",
+                      "no_output": "failed"}
+    assert _ran(workspace) == ["inventory"]
+    assert "normalize" not in json.loads((workspace / MANIFEST_FILE).read_text())["stages"]
+
+
+def test_missing_input_fails_stage(workspace):
+    pipeline = Pipeline.from_yaml(_write_pipeline(workspace, {"score": _stage("absent.txt", "scored.txt", "score")}))
+    assert pipeline.run() == {"score": "failed"}
+
+
+def test_cycles_and_duplicate_producers_are_rejected():
+    with pytest.raises(ValueError, match="Pipeline cycle: a -> b -> a|Pipeline cycle: b -> a -> b"):
+        Pipeline({"stages": {"a": _stage("b.txt", "a.txt", "a"), "b": _stage("a.txt", "b.txt", "b")}},
+                 manifest_file="unused.json")
+    with pytest.raises(ValueError, match="produced by both"):
+        Pipeline({"stages": {"a": _stage("x.txt", "out.txt", "a"), "b": _stage("y.txt", "out.txt", "b")}},
+                 manifest_file="unused.json")
+
+
+def test_content_store_round_trip(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    tree = tmp_path / "tree"
+    (tree / "sub").mkdir(parents=True)
+    (tree / "a.txt").write_text("a")
+    (tree / "sub" / "b.txt").write_text("b")
+    (tree / "sub" / "copy.txt").write_text("a")
+
+    ref = store.put(str(tree))
+    assert ref.startswith("tree:") and store.has(ref)
+    assert store.put(str(tree)) == ref
+    assert store.put(str(tree / "a.txt")) == store.put(str(tree / "sub" / "copy.txt"))
+
+    restored = tmp_path / "restored"
+    store.restore(ref, str(restored))
+    files = sorted(p.relative_to(restored).as_posix() for p in restored.rglob("*") if p.is_file())
+    assert files == ["a.txt", "sub/b.txt", "sub/copy.txt"]
+    assert (restored / "sub" / "b.txt").read_text() == "b"
+
+    blob = store.put(str(tree / "sub" / "b.txt"))
+    os.remove(store._blob_path(blob))
+    assert not store.has(ref)
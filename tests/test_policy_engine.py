@@ -0,0 +1,205 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import REPO_ROOT
+from hcl_parser import parse_hcl, to_terraform_json
+from generate_terraform_code import MANIFEST_FILE, hcl_digest, normalize_hcl
+from policy_engine import PolicyEngine, validate_documents, validate_remediations
+from verdict_cache import VerdictCache
+
+POLICY = os.path.join(REPO_ROOT, "policy", "security_policy.rego")
+
+# name -> (HCL remediation, expected deny messages)
+FIXTURES = {
+    "s3_sse_kms": ('''
+resource "aws_s3_bucket_server_side_encryption_configuration" "logs" {
+  bucket = aws_s3_bucket.logs.id
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm     = "aws:kms"
+      kms_master_key_id = aws_kms_key.logs.arn
+    }
+    bucket_key_enabled = true
+  }
+}
+''', []),
+    "s3_sse_missing_default": ('''
+resource "aws_s3_bucket_server_side_encryption_configuration" "logs" {
+  bucket = "logs"
+  rule {
+    bucket_key_enabled = true
+  }
+}
+''', ["CRITICAL: S3 Bucket encryption missing for resource 'logs'"]),
+    "s3_sse_mixed_rules": ('''
+resource "aws_s3_bucket_server_side_encryption_configuration" "logs" {
+  bucket = "logs"
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+  rule {
+    bucket_key_enabled = true
+  }
+}
+''', ["CRITICAL: S3 Bucket encryption missing for resource 'logs'"]),
+    "s3_sse_no_rules": ('''
+resource "aws_s3_bucket_server_side_encryption_configuration" "logs" {
+  bucket = "logs"
+}
+''', []),
+    "s3_public_access_blocked": ('''
+resource "aws_s3_bucket_public_access_block" "logs" {
+  bucket                  = "logs"
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+''', []),
+    "s3_public_access_open": ('''
+resource "aws_s3_bucket_public_access_block" "logs" {
+  bucket              = "logs"
+  block_public_acls   = false
+  block_public_policy = false
+}
+''', ["HIGH: S3 Bucket 'logs' allows public ACLs or Policies"]),
+    "rds_encrypted_private": ('''
+resource "aws_db_instance" "main" {
+  allocated_storage   = 20
+  storage_encrypted   = true
+  publicly_accessible = false
+}
+''', []),
+    "rds_public_unencrypted": ('''
+resource "aws_db_instance" "main" {
+  allocated_storage   = 20
+  publicly_accessible = true
+}
+''', [
+        "CRITICAL: AWS RDS Instance '20' is not encrypted",
+        "CRITICAL: AWS RDS Instance is set to 'publicly_accessible = true'. This violates CIS Benchmarks.",
+    ]),
+    "azure_mixed": ('''
+resource "azurerm_mssql_server" "sql" {
+  name                = "grc-sql"
+  minimum_tls_version = "1.0"
+}
+
+resource "azurerm_key_vault" "kv" {
+  name                     = "grc-kv"
+  purge_protection_enabled = true
+}
+
+resource "azurerm_storage_account" "sa" {
+  name                      = "grcsa"
+  enable_https_traffic_only = false
+}
+''', [
+        "HIGH: Azure Storage Account 'grcsa' allows HTTP traffic",
+        "MEDIUM: Azure SQL Server 'grc-sql' is using an old TLS version",
+    ]),
+    "datasync_logging": ('''
+resource "aws_datasync_task" "sync" {
+  name                     = "nightly"
+  cloudwatch_log_group_arn = aws_cloudwatch_log_group.sync.arn
+}
+''', []),
+}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return PolicyEngine.from_rego(POLICY)
+
+
+def _doc(name):
+    return to_terraform_json(parse_hcl(FIXTURES[name][0]))
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_native_verdicts(engine, name):
+    assert engine.evaluate(_doc(name)) == sorted(FIXTURES[name][1])
+
+
+def test_evaluate_many_matches_single(engine):
+    docs = {name: _doc(name) for name in FIXTURES}
+    assert engine.evaluate_many(docs) == {name: engine.evaluate(doc) for name, doc in docs.items()}
+
+
+def test_nested_block_shape():
+    doc = _doc("s3_sse_kms")
+    rule = doc["resource"]["aws_s3_bucket_server_side_encryption_configuration"]["logs"]["rule"]
+    assert rule[0]["apply_server_side_encryption_by_default"][0]["sse_algorithm"] == "aws:kms"
+
+
+def _extracted(tmp_path, names):
+    extracted = tmp_path / "extracted_remediations"
+    extracted.mkdir()
+    blocks = {}
+    for name in names:
+        code = normalize_hcl(FIXTURES[name][0])
+        digest = hcl_digest(code)
+        (extracted / f"{digest}.tf").write_text(code)
+        blocks[digest] = {"file": f"{digest}.tf", "addresses": [], "resources": [], "items": [0]}
+    (extracted / MANIFEST_FILE).write_text(json.dumps({"blocks": blocks, "resources": {}}))
+    return str(extracted)
+
+
+class CountingEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.evaluated = []
+
+    def evaluate_many(self, docs):
+        self.evaluated.extend(docs)
+        return self.engine.evaluate_many(docs)
+
+
+def test_second_run_is_served_from_cache(engine, tmp_path):
+    names = ["s3_sse_kms", "s3_sse_missing_default", "azure_mixed"]
+    extracted = _extracted(tmp_path, names)
+    plan_input = tmp_path / "plan_input.json"
+    plan_input.write_text(json.dumps(_doc("rds_public_unencrypted")))
+    cache_file = str(tmp_path / "policy_verdicts.json")
+
+    runs = []
+    for _ in range(2):
+        counting = CountingEngine(engine)
+        cache = VerdictCache(engine.policy_hash, cache_file)
+        results, _, errors = validate_remediations(counting, extracted, cache)
+        input_results, _ = validate_documents(counting, [str(plan_input)], cache)
+        runs.append((counting.evaluated, cache.hits, {**results, **input_results}))
+
+    assert len(runs[0][0]) == 4 and runs[0][1] == 0
+    assert runs[1][0] == [] and runs[1][1] == 4
+    assert runs[0][2] == runs[1][2]
+    assert runs[1][2][str(plan_input)] == sorted(FIXTURES["rds_public_unencrypted"][1])
+    assert not errors
+
+
+def test_policy_change_invalidates_cache(engine, tmp_path):
+    extracted = _extracted(tmp_path, ["s3_sse_kms"])
+    cache_file = str(tmp_path / "policy_verdicts.json")
+    validate_remediations(engine, extracted, VerdictCache(engine.policy_hash, cache_file))
+
+    cache = VerdictCache("other-policy", cache_file)
+    validate_remediations(engine, extracted, cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+@pytest.mark.skipif(shutil.which("opa") is None, reason="opa binary not installed")
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_matches_opa(engine, name, tmp_path):
+    doc = _doc(name)
+    input_path = tmp_path / "input.json"
+    input_path.write_text(json.dumps(doc))
+    out = subprocess.run(["opa", "eval", "--format", "json", "-d", POLICY, "-i", str(input_path),
+                          f"data.{engine.package}.deny"], capture_output=True, text=True, check=True)
+    opa_result = sorted(json.loads(out.stdout)["result"][0]["expressions"][0]["value"])
+    assert engine.evaluate(doc) == opa_result
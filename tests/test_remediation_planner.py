@@ -0,0 +1,15 @@
+import pytest
+
+from remediation_planner import CHECK_REMEDIATED, remediation_profile
+
+
+@pytest.mark.parametrize("finding_code, control", [
+    ("iam_no_root_access_key", "root_account_restricted"),
+    ("iam_avoid_root_usage", "root_account_restricted"),
+    ("iam_root_hardware_mfa_enabled", "mfa_enabled"),
+    ("iam_root_mfa_enabled", "mfa_enabled"),
+    ("s3_bucket_default_encryption", "encryption_enabled"),
+    ("ec2_instance_imdsv2_enabled", CHECK_REMEDIATED),
+])
+def test_remediation_profile(finding_code, control):
+    assert remediation_profile(finding_code)[0] == control
@@ -0,0 +1,123 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from risk_drift import build_drift, compare, load_drift, load_runs, write_drift
+
+BASE_RUN, HEAD_RUN = "2026-10-01T00:00:00", "2026-10-01T06:00:00"
+
+
+def _row(run_id, asset_uid, finding_code, ale, severity="High", classification="Internal", is_public=False,
+         retention_days=30):
+    return {"run_id": run_id, "asset_uid": asset_uid, "finding_code": finding_code,
+            "asset": asset_uid.split(":")[-1], "service": "s3", "severity": severity,
+            "classification": classification, "is_public": is_public, "retention_days": retention_days,
+            "ale": ale, "title": "ignored by the drift reader"}
+
+
+BASE = [
+    _row(BASE_RUN, "arn:a", "s3_bucket_default_encryption", 1000.0),
+    _row(BASE_RUN, "arn:a", "s3_bucket_public_access", 500.0),
+    _row(BASE_RUN, "arn:b", "rds_instance_storage_encrypted", 2000.0, severity="Medium"),
+    _row(BASE_RUN, "arn:c", "iam_avoid_root_usage", 100.0),
+    _row(BASE_RUN, "arn:d", "ec2_instance_public_ip", 50.0),
+]
+HEAD = [
+    # unchanged
+    _row(HEAD_RUN, "arn:a", "s3_bucket_default_encryption", 1000.0),
+    # arn:a s3_bucket_public_access resolved
+    _row(HEAD_RUN, "arn:b", "rds_instance_storage_encrypted", 3000.0, retention_days=90),
+    _row(HEAD_RUN, "arn:c", "iam_avoid_root_usage", 100.0, classification="Confidential"),
+    # ALE moved by float noise only; exposure changed
+    _row(HEAD_RUN, "arn:d", "ec2_instance_public_ip", 50.004, is_public=True),
+    _row(HEAD_RUN, "arn:e", "kms_cmk_rotation_enabled", 700.0),
+    # duplicate rows of one finding are summed
+    _row(HEAD_RUN, "arn:f", "cloudtrail_multi_region_enabled", 10.0),
+    _row(HEAD_RUN, "arn:f", "cloudtrail_multi_region_enabled", 20.0),
+]
+
+
+@pytest.fixture
+def register(tmp_path):
+    path = tmp_path / "risk_register.ndjson"
+    older = [_row("2026-09-30T18:00:00", "arn:z", "old_check", 1.0)]
+    path.write_text("\n".join(json.dumps(row) for row in older + BASE + HEAD) + "\n")
+    return str(path)
+
+
+def _check_drift(drift, findings):
+    assert (drift["base_run"], drift["head_run"]) == (BASE_RUN, HEAD_RUN)
+    assert (drift["base_findings"], drift["head_findings"]) == (5, 7)
+    assert (drift["base_ale"], drift["head_ale"], drift["ale_delta"]) == (3650.0, 4880.0, 1230.0)
+    assert drift["findings"] == {
+        "new": {"count": 2, "ale_delta": 730.0},
+        "resolved": {"count": 1, "ale_delta": -500.0},
+        "changed": {"count": 3, "ale_delta": 1000.0},
+    }
+    assert drift["asset_changes"] == {"count": 3, "classification": 1, "is_public": 1, "retention_days": 1}
+
+    ranked = [(row["change"], row["asset_uid"], row["ale_delta"], row["changed_fields"])
+              for row in drift["top_findings"]]
+    assert ranked == [
+        ("changed", "arn:b", 1000.0, "ale, severity, retention_days"),
+        ("new", "arn:e", 700.0, ""),
+        ("resolved", "arn:a", -500.0, ""),
+        ("new", "arn:f", 30.0, ""),
+        ("changed", "arn:c", 0.0, "classification"),
+        ("changed", "arn:d", 0.0, "is_public"),
+    ]
+    assert len(findings) == 6
+    resolved = findings[findings["change"] == "resolved"].iloc[0]
+    assert resolved["finding_code"] == "s3_bucket_public_access" and pd.isna(resolved["ale_head"])
+    assert findings.loc[findings["asset_uid"] == "arn:b", ["severity_base", "severity_head"]].values.tolist() == \
+        [["Medium", "High"]]
+
+    assets = {row["asset_uid"]: row for row in drift["top_assets"]}
+    assert set(assets) == {"arn:b", "arn:c", "arn:d"}
+    assert assets["arn:b"]["changed_fields"] == "retention_days" and assets["arn:b"]["ale_delta"] == 1000.0
+    assert (assets["arn:c"]["classification_base"], assets["arn:c"]["classification_head"]) == \
+        ("Internal", "Confidential")
+    assert (assets["arn:d"]["is_public_base"], assets["arn:d"]["is_public_head"]) == (False, True)
+
+
+def test_register_last_two_runs(register):
+    assert list(load_runs(register)) == [BASE_RUN, HEAD_RUN]
+    _check_drift(*build_drift(*compare([register])))
+
+
+def test_named_runs_and_separate_files(register, tmp_path):
+    _check_drift(*build_drift(*compare([register], BASE_RUN, HEAD_RUN)))
+
+    base_file, head_file = tmp_path / "base.parquet", tmp_path / "head_report.json"
+    pq.write_table(pa.Table.from_pylist(BASE), base_file)
+    head_file.write_text(json.dumps(HEAD))
+    _check_drift(*build_drift(*compare([str(base_file), str(head_file)])))
+
+
+def test_single_run_has_no_drift(tmp_path):
+    path = tmp_path / "risk_register.ndjson"
+    path.write_text("\n".join(json.dumps(row) for row in HEAD))
+    base, head = compare([str(path)])
+    drift, findings = build_drift(base, head)
+
+    assert base is None and drift["base_run"] is None and drift["head_run"] == HEAD_RUN
+    assert drift["ale_delta"] == 0.0 and findings.empty
+    assert drift["findings"]["new"] == {"count": 0, "ale_delta": 0.0}
+
+
+def test_missing_run_is_reported(register):
+    with pytest.raises(ValueError, match="not both found"):
+        compare([register], "2020-01-01T00:00:00")
+
+
+def test_write_and_load_drift(register, tmp_path):
+    drift, findings = build_drift(*compare([register]))
+    drift_file, table_file = tmp_path / "risk_drift.json", tmp_path / "risk_drift.parquet"
+    write_drift(drift, findings, str(drift_file), str(table_file))
+
+    assert load_drift(str(drift_file))["findings"] == drift["findings"]
+    assert pq.read_table(table_file).num_rows == len(findings)
+    assert load_drift(str(tmp_path / "absent.json")) is None
@@ -0,0 +1,63 @@
+import json
+import random
+
+import numpy as np
+
+from normalize_findings import write_findings
+from risk_engine import generate_risk_quantification_report, scoring_batch_rows
+
+CHECKS = ["iam_avoid_root_usage", "s3_bucket_default_encryption", "rds_instance_storage_encrypted",
+          "ec2_securitygroup_allow_ingress_from_internet_to_all_ports", "cloudtrail_multi_region_enabled"]
+FRAMEWORKS = {"CIS-2.0": ["1.1", "2.1.1", "3.4"], "PCI-3.2.1": ["8.2", "10.1"], "SOC2": ["cc_6_1"]}
+
+
+def _prowler_finding(rng, i):
+    compliance = {fw: rng.sample(reqs, rng.randint(1, len(reqs)))
+                  for fw in rng.sample(sorted(FRAMEWORKS), rng.randint(0, 3)) for reqs in [FRAMEWORKS[fw]]}
+    return {
+        "metadata": {"event_code": rng.choice(CHECKS)},
+        "severity": rng.choice(["Critical", "High", "Medium", "Low"]),
+        "status_code": "FAIL",
+        "finding_info": {"uid": f"f{i}", "title": f"finding {i}"},
+        "cloud": {"provider": "aws", "account": {"uid": "123456789012"}, "region": "us-east-1"},
+        "resources": [{"uid": f"arn:aws:s3:::bucket-{i % 97}", "name": f"bucket-{i % 97}", "type": "AwsS3Bucket"}],
+        "unmapped": {"compliance": compliance},
+    }
+
+
+def _run(tmp_path, name, findings, budget):
+    out = tmp_path / name
+    out.mkdir()
+    summary = generate_risk_quantification_report(
+        str(findings), str(tmp_path / "missing_steampipe.ndjson"), output_file=str(out / "report.json"),
+        register_file=None, runs_dir=None, budget=budget)
+    return out, summary
+
+
+def test_small_budget_spills_and_matches_unbudgeted_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(7)
+    raw = tmp_path / "scan.json"
+    raw.write_text(json.dumps([_prowler_finding(rng, i) for i in range(600)]))
+    findings = tmp_path / "findings.parquet"
+    write_findings([str(raw)], str(findings))
+
+    plain, plain_summary = _run(tmp_path, "plain", findings, None)
+    capped, capped_summary = _run(tmp_path, "capped", findings, "64K")
+
+    assert scoring_batch_rows(64 << 10) == 4
+    assert plain_summary["framework_spills"] == 0 and capped_summary["framework_spills"] > 0
+    for key in ("total_findings", "total_ale", "critical_count", "high_count"):
+        assert plain_summary[key] == capped_summary[key]
+
+    def records(directory, name):
+        data = json.loads((directory / name).read_text())
+        records = data["records"] if isinstance(data, dict) else data
+        return [{k: v for k, v in record.items() if k not in ("run_id", "timestamp")} for record in records]
+
+    assert records(plain, "report.json") == records(capped, "report.json")
+    assert records(plain, "report_top.json") == records(capped, "report_top.json")
+    with np.load(plain / "report_frameworks.npz") as a, np.load(capped / "report_frameworks.npz") as b:
+        assert sorted(a.files) == sorted(b.files)
+        assert all(np.array_equal(a[key], b[key]) for key in a.files)
+    assert not list((tmp_path / ".grc_cache" / "spill").iterdir())
@@ -0,0 +1,46 @@
+import json
+import os
+
+from risk_engine import _scan_register_runs, append_to_register, read_register_index
+
+
+def _append(tmp_path, register, run_id, rows, keep=3):
+    run_file = tmp_path / f"{run_id}.tmp"
+    run_file.write_text("".join(json.dumps({"run_id": run_id, "row": i}) + "\n" for i in range(rows)))
+    append_to_register(str(run_file), register, run_id, keep=keep)
+    assert not run_file.exists()
+
+
+def _run_ids(register):
+    with open(register) as f:
+        return [json.loads(line)["run_id"] for line in f]
+
+
+def test_offsets_point_at_each_run(tmp_path):
+    register = str(tmp_path / "risk_register.ndjson")
+    for run_id, rows in [("r1", 2), ("r2", 3)]:
+        _append(tmp_path, register, run_id, rows)
+
+    runs = read_register_index(register)
+    assert [(run["run_id"], run["offset"]) for run in runs] == [("r1", 0), ("r2", runs[0]["bytes"])]
+    with open(register, "rb") as f:
+        f.seek(runs[-1]["offset"])
+        assert json.loads(f.readline()) == {"run_id": "r2", "row": 0}
+    assert runs[-1]["offset"] + runs[-1]["bytes"] == os.path.getsize(register)
+
+
+def test_oldest_runs_are_trimmed(tmp_path):
+    register = str(tmp_path / "risk_register.ndjson")
+    for i in range(5):
+        _append(tmp_path, register, f"r{i}", 2, keep=3)
+
+    assert _run_ids(register) == ["r2", "r2", "r3", "r3", "r4", "r4"]
+    assert read_register_index(register) == _scan_register_runs(register)
+
+
+def test_unindexed_register_is_indexed_on_append(tmp_path):
+    register = tmp_path / "risk_register.ndjson"
+    register.write_text('{"finding_code": "legacy_row"}\n' + json.dumps({"run_id": "r0"}) + "\n")
+    _append(tmp_path, str(register), "r1", 1)
+
+    assert [run["run_id"] for run in read_register_index(str(register))] == ["legacy", "r0", "r1"]
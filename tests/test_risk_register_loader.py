@@ -0,0 +1,111 @@
+import json
+import sqlite3
+
+import pytest
+
+from risk_register_loader import REGISTER_COLUMNS, REGISTER_TABLE, SQLiteRegister, key_value, load_risk_register
+
+
+def _record(asset_uid, finding_code="s3_bucket_public_access", run_id="20261019T020000", **fields):
+    record = {"run_id": run_id, "asset": asset_uid.rsplit(":", 1)[-1], "asset_uid": asset_uid,
+              "finding_code": finding_code, "severity": "High", "is_public": True, "ale": 1250.5,
+              "compliance": "CIS-2.1.5, NIST-AC-3", "compliance_map": {"CIS": ["2.1.5"], "NIST": ["AC-3"]}}
+    record.update(fields)
+    return record
+
+
+def _write_report(path, records):
+    path.write_text(json.dumps(records))
+    return str(path)
+
+
+def _rows(db, columns="run_id, asset_uid, finding_code"):
+    with sqlite3.connect(db) as conn:
+        return sorted(conn.execute(f'SELECT {columns} FROM "{REGISTER_TABLE}"').fetchall())
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "register.db")
+
+
+def test_reload_is_idempotent(tmp_path, db):
+    report = _write_report(tmp_path / "report.json",
+                           [_record(f"arn:aws:s3:::bucket-{i}") for i in range(7)])
+    first = load_risk_register(report, SQLiteRegister(db), chunk_size=3)
+    second = load_risk_register(report, SQLiteRegister(db), chunk_size=3)
+
+    assert first["run_ids"] == second["run_ids"] == ["20261019T020000"]
+    assert _rows(db, "run_id, count(*)")[0] == ("20261019T020000", 7)
+
+
+def test_merge_updates_existing_rows(tmp_path, db):
+    load_risk_register(_write_report(tmp_path / "a.json", [_record("arn:aws:s3:::logs")]), SQLiteRegister(db))
+    load_risk_register(_write_report(tmp_path / "b.json", [_record("arn:aws:s3:::logs", ale=99.0),
+                                                           _record("arn:aws:s3:::logs", run_id="20261019T080000")]),
+                       SQLiteRegister(db))
+    assert _rows(db, "run_id, ale") == [("20261019T020000", 99.0), ("20261019T080000", 1250.5)]
+
+
+def test_duplicate_keys_in_chunk_last_wins(tmp_path, db):
+    report = _write_report(tmp_path / "report.json",
+                           [_record("arn:aws:s3:::logs", ale=1.0), _record("arn:aws:s3:::logs", ale=2.0)])
+    stats = load_risk_register(report, SQLiteRegister(db))
+    assert stats["rows"] == 1
+    assert _rows(db, "ale") == [(2.0,)]
+
+
+def test_run_id_override_and_fallback(tmp_path, db):
+    record = _record("arn:aws:s3:::logs")
+    del record["run_id"]
+    stats = load_risk_register(_write_report(tmp_path / "legacy.json", [record]), SQLiteRegister(db))
+    assert stats["run_ids"][0] != "20261019T020000" and len(stats["run_ids"]) == 1
+
+    load_risk_register(_write_report(tmp_path / "report.json", [_record("arn:aws:s3:::logs")]),
+                       SQLiteRegister(db), run_id="manual")
+    assert {run_id for run_id, *_ in _rows(db)} == {stats["run_ids"][0], "manual"}
+
+
+def test_long_keys_do_not_collide(tmp_path, db):
+    prefix = "/subscriptions/1/resourceGroups/" + "rg" * 150
+    uids = [f"{prefix}/providers/Microsoft.Storage/storageAccounts/{name}" for name in ("alpha", "beta")]
+    load_risk_register(_write_report(tmp_path / "report.json", [_record(uid) for uid in uids]), SQLiteRegister(db))
+
+    keys = [asset_uid for _, asset_uid, _ in _rows(db)]
+    assert len(set(keys)) == 2
+    assert all(len(key) == 256 and key.startswith("/subscriptions/1/") for key in keys)
+
+
+def test_long_run_ids_fit_their_column(tmp_path, db):
+    run_ids = ["nightly-" + "r" * 100 + suffix for suffix in ("a", "b")]
+    load_risk_register(_write_report(tmp_path / "report.json",
+                                     [_record("arn:aws:s3:::logs", run_id=run_id) for run_id in run_ids]),
+                       SQLiteRegister(db))
+
+    width = next(max_len for name, _, _, max_len in REGISTER_COLUMNS if name == "run_id")
+    keys = [run_id for run_id, _, _ in _rows(db)]
+    assert len(set(keys)) == 2
+    assert all(len(key) == width == 64 and key.startswith("nightly-") for key in keys)
+
+
+@pytest.mark.parametrize("max_len", [2, 16, 64, 65, 256])
+def test_key_value_never_exceeds_column(max_len):
+    assert len(key_value("x" * 1000, max_len)) == max_len
+    assert key_value("x" * max_len, max_len) == "x" * max_len
+
+
+def test_compliance_is_kept_whole(tmp_path, db):
+    compliance = ", ".join(f"CIS-{i}.{j}" for i in range(1, 20) for j in range(1, 10))
+    load_risk_register(_write_report(tmp_path / "report.json", [_record("arn:aws:s3:::logs", compliance=compliance)]),
+                       SQLiteRegister(db))
+    [(stored, compliance_map)] = _rows(db, "compliance, compliance_map")
+    assert stored == compliance
+    assert json.loads(compliance_map) == {"CIS": ["2.1.5"], "NIST": ["AC-3"]}
+
+
+def test_existing_register_gains_new_columns(tmp_path, db):
+    with sqlite3.connect(db) as conn:
+        conn.execute(f'CREATE TABLE "{REGISTER_TABLE}" (run_id TEXT NOT NULL, asset_uid TEXT NOT NULL, '
+                     'finding_code TEXT NOT NULL, loaded_at TEXT, PRIMARY KEY (run_id, asset_uid, finding_code))')
+    load_risk_register(_write_report(tmp_path / "report.json", [_record("arn:aws:s3:::logs")]), SQLiteRegister(db))
+    assert _rows(db, "severity, compliance_map") == [("High", '{"CIS": ["2.1.5"], "NIST": ["AC-3"]}')]
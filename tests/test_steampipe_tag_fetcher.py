@@ -0,0 +1,249 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+
+import steampipe_tag_fetcher as fetcher
+from conftest import REPO_ROOT
+
+
+class FakeColumn:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeCursor:
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.description = None
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((self.name, query, params))
+        if self.name is None:
+            return
+        table = self.conn.tables[_table_of(query)]
+        self.description = [FakeColumn(column) for column in table["columns"]]
+        self.rows = list(table["rows"])
+
+    def fetchmany(self, size):
+        self.conn.fetch_sizes.append(size)
+        page, self.rows = self.rows[:size], self.rows[size:]
+        return page
+
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.executed = []
+        self.fetch_sizes = []
+
+    def cursor(self, name=None):
+        return FakeCursor(self, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    """Stands in for ThreadedConnectionPool: one shared connection serving canned Steampipe tables"""
+
+    def __init__(self, tables):
+        self.conn = FakeConnection(tables)
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        pass
+
+    def closeall(self):
+        pass
+
+
+def _render(query):
+    """psycopg2.sql composition as text without a live connection"""
+    if isinstance(query, fetcher.sql.Composed):
+        return "".join(_render(part) for part in query.seq)
+    if isinstance(query, fetcher.sql.Identifier):
+        return ".".join(f'"{s}"' for s in query.strings)
+    if isinstance(query, fetcher.sql.SQL):
+        return query.string
+    return str(query)
+
+
+def _table_of(query):
+    return _render(query).split(" FROM ", 1)[1].split(" ", 1)[0].strip('"')
+
+
+CATALOGUE = {
+    "tables": {
+        "AWS S3 Buckets": {"table": "aws_s3_bucket", "key": "name", "columns": ["tags"],
+                           "match": "arn", "uid_contains": ":s3:::"},
+        "Azure Storage Accounts": {"table": "azure_storage_account", "key": "name",
+                                   "columns": ["allow_blob_public_access"], "match": "id",
+                                   "uid_contains": "/microsoft.storage/storageaccounts/", "ignore_case": True},
+    }
+}
+
+
+def _sync(tmp_path, monkeypatch, tables, **kwargs):
+    pool = FakePool(tables)
+    monkeypatch.setattr(fetcher, "ThreadedConnectionPool", lambda *a, **kw: pool)
+    queries = fetcher.build_queries(CATALOGUE)
+    failures = fetcher.fetch_multicloud_tags(
+        str(tmp_path / "tags.ndjson"), connection_params={}, queries=queries,
+        snapshot_dir=str(tmp_path / "snapshot"), delta_file=str(tmp_path / "delta.json"), **kwargs)
+    return pool, failures
+
+
+def _read_view(tmp_path):
+    with open(tmp_path / "tags.ndjson") as f:
+        header, *lines = [json.loads(line) for line in f]
+    return header, {(r["resource_type"], r["name"]): r["columns"] for r in lines}
+
+
+def _buckets(*names, tag="prod"):
+    return {"columns": ["name", "tags"], "rows": [(name, {"env": tag}) for name in names]}
+
+
+def test_snapshot_is_written_per_table(tmp_path, monkeypatch):
+    tables = {"aws_s3_bucket": _buckets("logs", "data"),
+              "azure_storage_account": {"columns": ["name", "allow_blob_public_access"], "rows": [("sa1", False)]}}
+    _, failures = _sync(tmp_path, monkeypatch, tables)
+    assert failures == {}
+
+    header, view = _read_view(tmp_path)
+    assert header["schema"] == fetcher.TAGS_SCHEMA
+    assert view == {("AWS S3 Buckets", "logs"): {"tags": {"env": "prod"}},
+                    ("AWS S3 Buckets", "data"): {"tags": {"env": "prod"}},
+                    ("Azure Storage Accounts", "sa1"): {"allow_blob_public_access": False}}
+
+    snapshot_dir = tmp_path / "snapshot"
+    index = json.loads((snapshot_dir / fetcher.SNAPSHOT_INDEX).read_text())
+    files = sorted(table["file"] for table in index["tables"].values())
+    assert sorted(p.name for p in snapshot_dir.glob("*.ndjson")) == files
+    assert not list((snapshot_dir / "spill").iterdir())
+
+
+def test_delta_between_syncs(tmp_path, monkeypatch):
+    _sync(tmp_path, monkeypatch, {"aws_s3_bucket": _buckets("logs", "data", "old"),
+                                  "azure_storage_account": {"columns": ["name", "allow_blob_public_access"],
+                                                            "rows": []}})
+    tables = {"aws_s3_bucket": {"columns": ["name", "tags"],
+                                "rows": [("logs", {"env": "prod"}), ("data", {"env": "dev"}), ("new", {})]},
+              "azure_storage_account": {"columns": ["name", "allow_blob_public_access"], "rows": []}}
+    _sync(tmp_path, monkeypatch, tables, full_refresh=True)
+
+    delta = json.loads((tmp_path / "delta.json").read_text())
+    assert [r["name"] for r in delta["added"]] == ["new"]
+    assert [(r["name"], r["columns"], r["previous"]) for r in delta["changed"]] == \
+        [("data", {"tags": {"env": "dev"}}, {"tags": {"env": "prod"}})]
+    assert [r["name"] for r in delta["removed"]] == ["old"]
+    assert sorted(delta["refreshed"]) == sorted(CATALOGUE["tables"])
+
+
+def test_fresh_tables_are_not_requeried(tmp_path, monkeypatch):
+    tables = {"aws_s3_bucket": _buckets("logs"),
+              "azure_storage_account": {"columns": ["name", "allow_blob_public_access"], "rows": []}}
+    _sync(tmp_path, monkeypatch, tables)
+    pool, _ = _sync(tmp_path, monkeypatch, tables)
+    assert pool.conn.executed == []
+    assert _read_view(tmp_path)[1] == {("AWS S3 Buckets", "logs"): {"tags": {"env": "prod"}}}
+
+
+def test_targeted_sql():
+    targets = ["arn:aws:s3:::logs", "arn:aws:s3:::data",
+               "/subscriptions/1/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/sa1"]
+    queries = fetcher.build_queries(CATALOGUE, targets)
+
+    s3 = queries["AWS S3 Buckets"]
+    assert _render(s3["sql"]) == 'SELECT "name", "tags" FROM "aws_s3_bucket" WHERE "arn" = ANY(%s)'
+    assert s3["params"] == [["arn:aws:s3:::logs", "arn:aws:s3:::data"]]
+    azure = queries["Azure Storage Accounts"]
+    assert _render(azure["sql"]).endswith(' WHERE lower("id") = ANY(%s)')
+    assert azure["params"] == [[targets[2].lower()]]
+
+    assert "AWS S3 Buckets" not in fetcher.build_queries(CATALOGUE, targets[2:])
+    assert fetcher.build_queries(CATALOGUE, targets[:1])["AWS S3 Buckets"]["query_hash"] != s3["query_hash"]
+
+
+def test_scope_from_environment(monkeypatch):
+    catalogue = {"tables": {"Azure Service Principal": {
+        "table": "azuread_service_principal", "key": "display_name", "columns": ["app_id"],
+        "scope": {"app_id": "$GRC_TEST_APP_IDS"}}}}
+    monkeypatch.delenv("GRC_TEST_APP_IDS", raising=False)
+    assert fetcher.build_queries(catalogue) == {}
+
+    monkeypatch.setenv("GRC_TEST_APP_IDS", "app-1, app-2")
+    query = fetcher.build_queries(catalogue)["Azure Service Principal"]
+    assert _render(query["sql"]).endswith(' WHERE "app_id" = ANY(%s)')
+    assert query["params"] == [["app-1", "app-2"]]
+
+
+def test_untargeted_sql_has_no_filter():
+    queries = fetcher.build_queries(CATALOGUE)
+    assert _render(queries["AWS S3 Buckets"]["sql"]) == 'SELECT "name", "tags" FROM "aws_s3_bucket"'
+    assert queries["AWS S3 Buckets"]["params"] == []
+
+
+def test_pagination_uses_named_cursor_and_batches(tmp_path, monkeypatch):
+    tables = {"aws_s3_bucket": _buckets(*[f"b{i}" for i in range(5)]),
+              "azure_storage_account": {"columns": ["name", "allow_blob_public_access"], "rows": []}}
+    pool, _ = _sync(tmp_path, monkeypatch, tables, batch_size=2, max_connections=1)
+
+    conn = pool.conn
+    timeouts = [params for name, query, params in conn.executed if name is None]
+    assert timeouts == [(fetcher.QUERY_TIMEOUT_SECONDS * 1000,)] * 2
+    named = [name for name, query, params in conn.executed if name is not None]
+    assert len(named) == 2 and all(name.startswith("grc_tags_") for name in named)
+    assert conn.fetch_sizes == [2, 2, 2, 2, 2]  # 5 rows: pages of 2, 2, 1, then an empty page; empty table: 1
+    assert len(_read_view(tmp_path)[1]) == 5
+
+
+def test_failed_table_keeps_last_snapshot(tmp_path, monkeypatch):
+    tables = {"aws_s3_bucket": _buckets("logs"),
+              "azure_storage_account": {"columns": ["name", "allow_blob_public_access"], "rows": [("sa1", True)]}}
+    _sync(tmp_path, monkeypatch, tables)
+    del tables["azure_storage_account"]
+    _, failures = _sync(tmp_path, monkeypatch, tables, full_refresh=True)
+
+    assert list(failures) == ["Azure Storage Accounts"]
+    assert ("Azure Storage Accounts", "sa1") in _read_view(tmp_path)[1]
+    assert json.loads((tmp_path / "delta.json").read_text())["failed"] == failures
+
+
+def test_connection_error_is_reported(tmp_path, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise fetcher.psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(fetcher, "ThreadedConnectionPool", refuse)
+    failures = fetcher.fetch_multicloud_tags(
+        str(tmp_path / "tags.ndjson"), connection_params={}, queries=fetcher.build_queries(CATALOGUE),
+        snapshot_dir=str(tmp_path / "snapshot"), delta_file=str(tmp_path / "delta.json"))
+    assert set(failures) == set(CATALOGUE["tables"])
+
+
+def test_cli_exits_non_zero_on_failure(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # closed again before the CLI connects, so nothing listens there
+    env = {**os.environ, "STEAMPIPE_HOST": "127.0.0.1", "STEAMPIPE_PORT": str(port)}
+    result = subprocess.run([sys.executable, fetcher.__file__, "--findings", "missing.parquet",
+                             "--catalogue", os.path.join(REPO_ROOT, fetcher.CATALOGUE_FILE)],
+                            cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 1, result.stdout + result.stderr
+    assert "Error connecting to Steampipe" in result.stdout
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+CACHE_FILE = ".grc_cache/policy_verdicts.json"
+POLICY_FILE = "policy/security_policy.rego"
+
+
+def policy_bundle_hash(policy_file: str) -> str:
+    """SHA-256 of the raw policy bytes; any edit to the .rego invalidates cached verdicts"""
+    with open(policy_file, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class VerdictCache:
+    """
+    Persistent policy verdicts keyed by (normalized HCL block hash, policy bundle hash)
+    Block hashes are the content addresses written by generate_terraform_code.py
+    """
+
+    def __init__(self, policy_hash: str, path: str = CACHE_FILE):
+        self.path = path
+        self.policy_hash = policy_hash
+        self.verdicts: Dict[str, List[str]] = {}
+        self.hits = self.misses = 0
+        self._dirty = False
+
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: policy verdict cache unreadable, starting empty: {e}")
+            return
+
+        if data.get("policy_hash") == policy_hash:
+            self.verdicts = data.get("verdicts", {})
+        else:
+            print("Policy changed since last run: cached verdicts invalidated")
+            self._dirty = True
+
+    def get(self, block_hash: str) -> Optional[List[str]]:
+        verdict = self.verdicts.get(block_hash)
+        if verdict is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return verdict
+
+    def put(self, block_hash: str, deny: List[str]):
+        self.verdicts[block_hash] = deny
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"policy_hash": self.policy_hash, "verdicts": self.verdicts}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False